@@ -5,7 +5,11 @@
 from __future__ import absolute_import, division, print_function
 __metaclass__ = type
 
+import os
+import time
 
+from ansible.errors import AnsibleError
+from ansible.module_utils._text import to_text
 from ansible_collections.ansible.netcommon.plugins.action.network import (
     ActionModule as ActionNetworkModule,
 )
@@ -18,5 +22,63 @@ class ActionModule(ActionNetworkModule):
         module_name = self._task.action.split(".")[-1]
         self._config_module = True if module_name == "acos_config" else False
 
+        if self._config_module and isinstance(self._task.args.get("partitions"), dict):
+            try:
+                self._handle_partitions_src_option()
+            except AnsibleError as exc:
+                return dict(failed=True, msg=to_text(exc))
+
+        backup_options = self._task.args.get("backup_options") or {}
+        if self._config_module and self._task.args.get("backup") and \
+                (backup_options.get("stream") or backup_options.get("compress")):
+            self._handle_backup_stream_option(task_vars)
+
         result = super(ActionModule, self).run(task_vars=task_vars)
         return result
+
+    def _handle_backup_stream_option(self, task_vars):
+        """ Resolves the backup file the module streams the backup to,
+        like _handle_backup_option does for backups written here
+        """
+        backup_options = dict(self._task.args["backup_options"])
+        self._backup_tstamp = time.strftime("%Y-%m-%d@%H:%M:%S", time.localtime(time.time()))
+        self._backup_filename = backup_options.get("filename")
+        if not backup_options.get("dir_path"):
+            backup_options["dir_path"] = os.path.join(self._get_working_path(), "backup")
+        backup_options["dir_path"] = os.path.abspath(backup_options["dir_path"])
+        if not backup_options.get("filename"):
+            backup_options["filename"] = "%s_config.%s%s" % (
+                task_vars["inventory_hostname"], self._backup_tstamp,
+                ".gz" if backup_options.get("compress") else "")
+        self._task.args["backup_options"] = backup_options
+
+    def _handle_backup_option(self, result, task_vars, backup_options):
+        if not (backup_options and (backup_options.get("stream") or backup_options.get("compress"))):
+            return super(ActionModule, self)._handle_backup_option(result, task_vars, backup_options)
+
+        # the module wrote the file, result has backup_path and backup_checksum
+        result["changed"] = result.pop("__backup_changed__", False)
+        result["date"], result["time"] = self._backup_tstamp.split("@")
+        if not self._backup_filename:
+            path = result["backup_path"]
+            if path.endswith(".gz"):
+                path = path[:-len(".gz")]
+            result["filename"] = os.path.basename(result["backup_path"])
+            result["shortname"] = os.path.splitext(path)[0]
+
+    def _handle_partitions_src_option(self):
+        """ Renders the src of every partition like the src option """
+        src = self._task.args.pop("src", None)
+        partitions = dict()
+        try:
+            for name, spec in self._task.args["partitions"].items():
+                if isinstance(spec, dict) and spec.get("src"):
+                    self._task.args["src"] = spec["src"]
+                    self._handle_src_option()
+                    spec = dict(spec, src=self._task.args["src"])
+                partitions[name] = spec
+        finally:
+            self._task.args.pop("src", None)
+            if src is not None:
+                self._task.args["src"] = src
+        self._task.args["partitions"] = partitions
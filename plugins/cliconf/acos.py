@@ -16,17 +16,349 @@ description:
 
 import json
 import re
+import socket
+import threading
+import time
+import uuid
+from functools import wraps
 
 from ansible.errors import AnsibleConnectionFailure
-from ansible.module_utils._text import to_text
+from ansible.module_utils._text import to_bytes, to_text
 from ansible.module_utils.common._collections_compat import Mapping
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.acos import is_read_only
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.config import (
+    config_difference, config_fingerprint)
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.output import OutputCapture
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.parsers import parse_output
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.perf import PerfRecorder
 from ansible_collections.ansible.netcommon.plugins.module_utils.network.common.config import NetworkConfig, dumps
 from ansible_collections.ansible.netcommon.plugins.module_utils.network.common.utils import to_list
 from ansible.plugins.cliconf import CliconfBase, enable_mode
 
 
+PROMPT_RE = re.compile(r'^[\w\+\-\.:\/\[\]]+(?:\([^\)]+\)){0,3}[>#] ?')
+
+VERSION_RE = re.compile(r'Version (\S+)')
+
+MODEL_RES = (re.compile(r'^ACOS (.+) \(revision', re.M),
+             re.compile(r'^ACOS (\S+).+bytes of .*memory', re.M))
+
+HOSTNAME_RE = re.compile(r'^(.+) uptime', re.M)
+
+IMAGE_RE = re.compile(r'image file is "(.+)"')
+
+MAX_SESSIONS = 8
+
+PROGRESS_LINES = 5
+
+STREAM_BLOCK = 64 * 1024
+
+
+def instrumented(func):
+    """ Records the call when perf recording is started """
+    @wraps(func)
+    def wrapped(self, *args, **kwargs):
+        if self._perf is None:
+            return func(self, *args, **kwargs)
+        with self._perf.call(func.__name__):
+            return func(self, *args, **kwargs)
+    return wrapped
+
+
+class CliSession(object):
+    """ Additional CLI shell to the device
+
+    Used to run read-only commands next to the persistent session.  Prompt
+    and error detection reuse the regexes of the terminal plugin.
+    """
+
+    def __init__(self, connection):
+        ssh_type = getattr(connection, 'ssh_type', 'paramiko')
+        if ssh_type != 'paramiko':
+            raise AnsibleConnectionFailure(
+                'Additional CLI sessions require ansible_network_cli_ssh_type=paramiko, '
+                'the connection uses %s' % ssh_type)
+        self._terminal = connection._terminal
+        self._client = connection.paramiko_conn._connect_uncached()
+        self._shell = self._client.invoke_shell()
+        self._shell.settimeout(connection.get_option('persistent_command_timeout'))
+        self._buffer_read_timeout = connection.get_option('persistent_buffer_read_timeout')
+        self._unread = b''
+        self.partition = 'shared'
+        self.received = b''
+
+        prompt = self._receive()
+        if not prompt.rstrip().endswith(b'#'):
+            self.send(b'enable', prompt=b'Password:',
+                      answer=to_bytes(connection._play_context.become_pass or ''))
+        self.send(b'terminal length 0')
+
+    def _strip(self, data):
+        for regex in self._terminal.ansi_re:
+            data = regex.sub(b'', data)
+        return data
+
+    def _recv(self):
+        if self._unread:
+            data, self._unread = self._unread, b''
+        else:
+            data = self._shell.recv(4096)
+        if not data:
+            raise AnsibleConnectionFailure('CLI session closed by the device')
+        return self._strip(data)
+
+    def _at_prompt(self, resp):
+        """ Whether the last line received starts with the prompt """
+        line = resp[max(resp.rfind(b'\n'), resp.rfind(b'\r')) + 1:]
+        return any(regex.match(line) for regex in self._terminal.terminal_stdout_re)
+
+    def _settled(self):
+        """ Whether nothing more arrives within buffer_read_timeout of a
+        matched prompt, output that only looks like the prompt would
+        otherwise end the command early.  What arrives is read next.
+        """
+        if not self._buffer_read_timeout:
+            return True
+        timeout = self._shell.gettimeout()
+        self._shell.settimeout(self._buffer_read_timeout)
+        try:
+            self._unread = self._shell.recv(4096)
+        except socket.timeout:
+            return True
+        finally:
+            self._shell.settimeout(timeout)
+        return False
+
+    def _receive(self, prompt=None, answer=None, check_all=False):
+        prompts = [re.compile(to_bytes(item), re.I) for item in to_list(prompt)]
+        answers = [to_bytes(item) for item in to_list(answer)] or [b'']
+        self.received = resp = b''
+        start = 0
+        while True:
+            resp += self._recv()
+            self.received = resp
+            # output up to an answered prompt is not searched again
+            window = resp[max(start, len(resp) - 256):]
+            matched = [index for index, regex in enumerate(prompts) if regex.search(window)]
+            if matched:
+                index = matched[0]
+                self._shell.sendall(answers[min(index, len(answers) - 1)] + b'\r')
+                if check_all:
+                    del prompts[index]
+                    if index < len(answers) - 1:
+                        del answers[index]
+                else:
+                    prompts = []
+                start = len(resp)
+                continue
+            if self._at_prompt(resp) and self._settled():
+                return resp
+
+    def send(self, command, prompt=None, answer=None, check_all=False):
+        """ Sends command, answering prompt with answer, and returns the
+        output.  prompt and answer may be lists, with check_all every
+        prompt is answered once, otherwise only the first one matched.
+        """
+        self._shell.sendall(command + b'\r')
+        resp = self._receive(prompt, answer, check_all)
+        for regex in self._terminal.terminal_stderr_re:
+            if regex.search(resp):
+                raise AnsibleConnectionFailure(to_text(resp, errors='surrogate_then_replace'))
+
+        cleaned = []
+        lines = resp.splitlines()
+        for line in lines[:-1]:
+            if line.strip() != command.strip():
+                cleaned.append(line)
+        return to_text(b'\n'.join(cleaned).strip(), errors='surrogate_then_replace')
+
+    def stream(self, command, capture):
+        """ Sends command and writes its output to capture, an
+        OutputCapture, while it is received.  Only the last lines, which
+        the prompt may be in, are held back.  Returns what capture.close()
+        returns.
+        """
+        self._shell.sendall(command + b'\r')
+        first = None
+        resp = b''
+        try:
+            while True:
+                resp += self._recv()
+                if self._at_prompt(resp) and self._settled():
+                    break
+                if len(resp) > STREAM_BLOCK:
+                    cut = resp.rfind(b'\n', 0, len(resp) - 256) + 1
+                    if cut:
+                        lines = resp[:cut].splitlines()
+                        if first is None:
+                            # errors of the device are looked for in the
+                            # first block and the last lines
+                            first = resp[:cut]
+                            lines = [line for line in lines if line.strip() != command.strip()]
+                        capture.write(b'\n'.join(lines) + b'\n')
+                        resp = resp[cut:]
+
+            checked = (first or b'') + resp
+            for regex in self._terminal.terminal_stderr_re:
+                if regex.search(checked):
+                    raise AnsibleConnectionFailure(to_text(checked, errors='surrogate_then_replace'))
+
+            lines = resp.splitlines()[:-1]
+            if first is None:
+                lines = [line for line in lines if line.strip() != command.strip()]
+            capture.write(b'\n'.join(lines))
+        except Exception:
+            capture.reset()
+            raise
+        return capture.close()
+
+    def progress(self, lines=PROGRESS_LINES):
+        """ Last lines received for the command being sent """
+        received = to_text(self.received, errors='surrogate_then_replace').replace('\r', '\n')
+        return [line for line in received.split('\n') if line.strip()][-lines:]
+
+    def settimeout(self, timeout):
+        self._shell.settimeout(timeout)
+
+    def set_partition(self, partition):
+        if partition != self.partition:
+            self.send(to_bytes('active-partition %s' % partition))
+            self.partition = partition
+
+    def close(self):
+        self._client.close()
+
+
+class Operation(object):
+    """ Commands sent one after the other on their own CLI session by a
+    background thread, for operations such as upgrades that run longer
+    than a task should wait for.  The session is closed when the last
+    command returns or one fails.
+    """
+
+    def __init__(self, session, commands):
+        self.session = session
+        self.commands = commands
+        self.responses = []
+        self.error = None
+        self.started = time.time()
+        self.finished = None
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        try:
+            for cmd in self.commands:
+                self.responses.append(self.session.send(
+                    to_bytes(cmd['command']), prompt=cmd.get('prompt'),
+                    answer=cmd.get('answer'), check_all=cmd.get('check_all', False)))
+        except Exception as exc:
+            self.error = to_text(exc)
+        finally:
+            self.finished = time.time()
+            try:
+                self.session.close()
+            except Exception:
+                pass
+
+    def status(self):
+        return dict(
+            commands=[to_text(cmd['command']) for cmd in self.commands],
+            finished=self.finished is not None,
+            elapsed=round((self.finished or time.time()) - self.started, 3),
+            responses=list(self.responses),
+            progress=[] if self.finished else self.session.progress(),
+            error=self.error,
+        )
+
+
 class Cliconf(CliconfBase):
 
+    def __init__(self, *args, **kwargs):
+        super(Cliconf, self).__init__(*args, **kwargs)
+        self._sessions = []
+        self._partition = 'shared'
+        self._partitions = None
+        self._perf = None
+        self._startup_fingerprints = {}
+        self._operations = {}
+
+    def start_perf(self):
+        """ Starts recording the timings of calls and round trips,
+        dropping the ones recorded so far.
+        """
+        self._perf = PerfRecorder()
+
+    def get_perf(self):
+        """ Stops recording and returns the recorded timings """
+        perf, self._perf = self._perf, None
+        return perf.report() if perf else {}
+
+    @instrumented
+    def send_command(self, command=None, **kwargs):
+        if self._perf is None:
+            return super(Cliconf, self).send_command(command=command, **kwargs)
+
+        start = time.time()
+        resp = None
+        try:
+            resp = super(Cliconf, self).send_command(command=command, **kwargs)
+            return resp
+        finally:
+            self._perf.round_trip(to_text(command, errors='surrogate_then_replace'),
+                                  time.time() - start, len(resp or ''))
+
+    def set_partition(self, partition='shared'):
+        """ Makes partition the active partition of the session
+
+        Nothing is sent when the session already is in the partition.
+        Partitions missing from the partitions of the device, read once
+        with show partition and again after partitions are created or
+        deleted, fail without a round trip.
+        """
+        if partition == self._partition:
+            return 'Current active partition: %s' % partition
+
+        if partition != 'shared':
+            partitions = self._get_partitions()
+            if partitions is not None and partition not in partitions:
+                raise ValueError("Partition '%s' does not exist" % partition)
+
+        out = to_text(self.send_command('active-partition %s' % partition),
+                      errors='surrogate_then_replace')
+        if 'does not exist' in out:
+            self._partitions = None
+            raise ValueError(out)
+        self._partition = partition
+        return out
+
+    def _get_partitions(self):
+        """ Names of the partitions of the device, None when show partition
+        fails or its output cannot be parsed.
+        """
+        if self._partitions is None:
+            try:
+                parsed = parse_output('show partition', self.send_command('show partition'))
+            except AnsibleConnectionFailure:
+                return None
+            if parsed is None:
+                return None
+            self._partitions = set(item['name'] for item in parsed['partitions'])
+        return self._partitions
+
+    def reset_session(self):
+        """ Forgets what is known of the session and closes the additional
+        CLI sessions, for when network_cli opened a new shell, which
+        starts in the shared partition.
+        """
+        self._partition = 'shared'
+        self._partitions = None
+        self._startup_fingerprints = {}
+        for session in list(self._sessions):
+            self._drop_session(session)
+
+    @instrumented
     @enable_mode
     def get_config(self, source='running', flags=None, format=None):
         if source not in ('running', 'startup'):
@@ -49,9 +381,30 @@ class Cliconf(CliconfBase):
 
         return self.send_command(cmd)
 
+    @enable_mode
+    def get_startup_fingerprint(self, ignore_lines=None, saved=None):
+        """ Returns the sha1 hex digest of the startup-config of the active
+        partition, as NetworkConfig computes it with ignore_lines.
+
+        The digest is kept for the partition until write memory runs on
+        the session, and while saved, the "Configuration last saved" stamp
+        of the running-config, stays the same.  Without saved the
+        startup-config is always read.
+        """
+        key = (self._partition, tuple(to_list(ignore_lines)))
+        cached = self._startup_fingerprints.get(key)
+        if saved is not None and cached and cached[0] == saved:
+            return cached[1]
+
+        fingerprint = config_fingerprint(self.get_config(source='startup'), ignore_lines)
+        if saved is not None:
+            self._startup_fingerprints[key] = (saved, fingerprint)
+        return fingerprint
+
+    @instrumented
     @enable_mode
     def edit_config(self, candidate=None, commit=True,
-                    replace=None, comment=None):
+                    replace=None, comment=None, batch_size=None):
         resp = {}
         operations = self.get_device_operations()
         self.check_edit_config_capability(operations, candidate,
@@ -67,14 +420,23 @@ class Cliconf(CliconfBase):
                 raise ValueError("Unable to enter in config mode. If there is another config session running"
                                  " on device, close it before running the playbook.")
 
+            lines = []
             for line in to_list(candidate):
                 if not isinstance(line, Mapping):
                     line = {'command': line}
 
                 cmd = line['command']
                 if cmd != 'end' and cmd[0] != '!':
-                    results.append(self.send_command(**line))
+                    lines.append(line)
                     requests.append(cmd)
+                    if self._changes_partitions(cmd):
+                        self._partitions = None
+
+            if batch_size and batch_size > 1:
+                results = self._send_config_batched(lines, batch_size)
+            else:
+                for line in lines:
+                    results.append(self.send_command(**line))
 
             self.send_command('end')
         else:
@@ -84,6 +446,119 @@ class Cliconf(CliconfBase):
         resp['response'] = results
         return resp
 
+    def _send_config_batched(self, lines, batch_size):
+        results = []
+        block = []
+        for line in lines:
+            if set(line) - set(['command']):
+                # lines answering a prompt need their own round trip
+                results.extend(self._send_config_block(block))
+                block = []
+                results.append(self.send_command(**line))
+                continue
+
+            block.append(line['command'])
+            if len(block) == batch_size:
+                results.extend(self._send_config_block(block))
+                block = []
+
+        results.extend(self._send_config_block(block))
+        return results
+
+    def _send_config_block(self, block):
+        """Writes a block of config lines in one go and splits the echoed
+        output back into one response per line. Errors are still detected
+        by the terminal_stderr_re of the terminal plugin.
+        """
+        if len(block) < 2:
+            return [self.send_command(command=cmd) for cmd in block]
+
+        payload = to_bytes('\r'.join(block), errors='surrogate_or_strict')
+        start = time.time()
+        out = ''
+        try:
+            out = to_text(self._connection.send(command=payload, strip_prompt=False),
+                          errors='surrogate_then_replace')
+            while not self._batch_complete(out, block):
+                more = self._connection.receive(strip_prompt=False)
+                out += '\n' + to_text(more, errors='surrogate_then_replace')
+        except AnsibleConnectionFailure as exc:
+            err = to_text(exc)
+            out = self._drain_batch(out + '\n' + err, block)
+            raise AnsibleConnectionFailure(self._batch_error(block, out, err))
+        finally:
+            if self._perf is not None:
+                self._perf.round_trip('%s (+%d lines)' % (block[0], len(block) - 1),
+                                      time.time() - start, len(out))
+
+        if not self.response_logging:
+            self.history.append(('*****', '*****'))
+        else:
+            self.history.append((payload, out))
+
+        return self._split_batch_response(out, block)
+
+    def _batch_complete(self, out, block):
+        """ Whether out holds the echoes of the lines of block, matched in
+        order like _split_batch_response() does, and a prompt after the
+        echo of the last line.
+        """
+        index = -1
+        for line in out.splitlines():
+            match = PROMPT_RE.match(line)
+            if not match:
+                continue
+            if index == len(block) - 1:
+                return True
+            echoed = line[match.end():].strip()
+            for pos in range(index + 1, len(block)):
+                if echoed == block[pos].strip():
+                    index = pos
+                    break
+        return False
+
+    def _split_batch_response(self, out, block):
+        responses = [[] for cmd in block]
+        index = -1
+        for line in out.splitlines():
+            match = PROMPT_RE.match(line)
+            if match:
+                echoed = line[match.end():].strip()
+                for pos in range(index + 1, len(block)):
+                    if echoed == block[pos].strip():
+                        index = pos
+                        break
+                continue
+            if index >= 0:
+                responses[index].append(line)
+        return ['\n'.join(resp).strip() for resp in responses]
+
+    def _drain_batch(self, out, block):
+        """ Reads what the device still sends after a line of the block
+        failed, up to the echo of the last line and the prompt after it,
+        so that the next command does not receive it.
+        """
+        while not self._batch_complete(out, block):
+            try:
+                more = to_text(self._connection.receive(strip_prompt=False),
+                               errors='surrogate_then_replace')
+            except AnsibleConnectionFailure as exc:
+                more = to_text(exc)
+                if not any(PROMPT_RE.match(line) for line in more.splitlines()):
+                    # timed out, the device sends nothing more
+                    break
+            out += '\n' + more
+        return out
+
+    def _batch_error(self, block, out, err):
+        stderr_re = self._connection._terminal.terminal_stderr_re
+        for cmd, resp in zip(block, self._split_batch_response(out, block)):
+            data = to_bytes(resp, errors='surrogate_or_strict')
+            if any(regex.search(data) for regex in stderr_re):
+                return "%s\nError while applying configuration line: %s" % (err, cmd)
+        return err
+
+    @instrumented
     def get_diff(self, candidate=None, running=None, diff_match=None, diff_ignore_lines=None):
         diff = {}
         device_operations = self.get_device_operations()
@@ -101,10 +576,9 @@ class Cliconf(CliconfBase):
         candidate_obj.load(candidate)
 
         if running and diff_match != 'none':
-            running_obj = NetworkConfig(
-                indent=1, contents=running, ignore_lines=diff_ignore_lines)
-            config_diff_objs = candidate_obj.difference(
-                running_obj, match=diff_match)
+            config_diff_objs = config_difference(
+                candidate_obj, running, match=diff_match,
+                ignore_lines=diff_ignore_lines)
 
         else:
             config_diff_objs = candidate_obj.items
@@ -132,24 +606,22 @@ class Cliconf(CliconfBase):
         reply = self.get(command='show version')
         data = to_text(reply, errors='surrogate_or_strict').strip()
 
-        match = re.search(r'Version (\S+)', data)
+        match = VERSION_RE.search(data)
         if match:
             device_info['network_os_version'] = match.group(1).strip(',')
 
-        model_search_strs = [
-            r'^ACOS (.+) \(revision', r'^ACOS (\S+).+bytes of .*memory']
-        for item in model_search_strs:
-            match = re.search(item, data, re.M)
+        for regex in MODEL_RES:
+            match = regex.search(data)
             if match:
                 version = match.group(1).split(' ')
                 device_info['network_os_model'] = version[0]
                 break
 
-        match = re.search(r'^(.+) uptime', data, re.M)
+        match = HOSTNAME_RE.search(data)
         if match:
             device_info['network_os_hostname'] = match.group(1)
 
-        match = re.search(r'image file is "(.+)"', data)
+        match = IMAGE_RE.search(data)
         if match:
             device_info['network_os_image'] = match.group(1)
 
@@ -181,16 +653,26 @@ class Cliconf(CliconfBase):
     def get_capabilities(self):
         result = super(Cliconf, self).get_capabilities()
         result['rpc'] += ['get_diff', 'run_commands',
-                          'get_defaults_flag']
+                          'get_defaults_flag', 'set_partition', 'start_perf', 'get_perf',
+                          'get_startup_fingerprint', 'start_operation', 'get_operation']
         result['device_operations'] = self.get_device_operations()
         result.update(self.get_option_values())
         return json.dumps(result)
 
-    def run_commands(self, commands=None, check_rc=True):
+    @instrumented
+    def run_commands(self, commands=None, check_rc=True, concurrency=None, capture=None):
+        """ Runs commands and returns their responses.
+
+        With capture, a list of dicts with the limit, keep and path
+        arguments of an OutputCapture for every command, every response is
+        the dict returned by OutputCapture.close().  Read-only commands are
+        then streamed over additional CLI sessions, so that no more than
+        the kept output of a command is held in memory.
+        """
         if commands is None:
             raise ValueError("'commands' value is required")
 
-        responses = []
+        cmds = []
         for cmd in to_list(commands):
             if not isinstance(cmd, Mapping):
                 cmd = {'command': cmd}
@@ -199,7 +681,22 @@ class Cliconf(CliconfBase):
             if output:
                 raise ValueError("'output' value %s is not supported for"
                                  "run_commands" % output)
+            cmds.append(cmd)
 
+        captures = None
+        if capture is not None:
+            if len(capture) != len(cmds):
+                raise ValueError("'capture' needs one entry for every command")
+            captures = [OutputCapture(**(item or {})) for item in capture]
+
+        read_only = all(self._is_parallel(cmd) for cmd in cmds)
+        if read_only and captures:
+            return self._run_commands_parallel(cmds, check_rc, max(concurrency or 1, 2), captures)
+        if concurrency and concurrency > 1 and len(cmds) > 1 and read_only:
+            return self._run_commands_parallel(cmds, check_rc, concurrency)
+
+        responses = []
+        for index, cmd in enumerate(cmds):
             try:
                 out = self.send_command(**cmd)
             except AnsibleConnectionFailure as e:
@@ -207,5 +704,180 @@ class Cliconf(CliconfBase):
                     raise
                 out = getattr(e, 'err', to_text(e))
 
-            responses.append(out)
+            self._track_command(cmd['command'], out)
+            responses.append(self._captured(captures, index, out))
         return responses
+
+    def _captured(self, captures, index, out):
+        if captures is None:
+            return out
+        captures[index].write(out)
+        return captures[index].close()
+
+    def start_operation(self, commands=None, timeout=None):
+        """ Starts sending commands on a new CLI session in the active
+        partition and returns the handle of the operation.
+
+        The commands run in the background, timeout is the number of
+        seconds the device may stay silent before the operation fails,
+        by default it waits as long as the device keeps the session open.
+        """
+        if not commands:
+            raise ValueError("'commands' value is required")
+        running = [op for op in self._operations.values() if op.finished is None]
+        if len(running) + len(self._sessions) >= MAX_SESSIONS - 1:
+            raise ValueError('Too many CLI sessions open to the device to start '
+                             'another operation, %d operations are running' % len(running))
+
+        cmds = [cmd if isinstance(cmd, Mapping) else {'command': cmd} for cmd in to_list(commands)]
+        session = CliSession(self._connection)
+        try:
+            session.set_partition(self._partition)
+        except Exception:
+            session.close()
+            raise
+        session.settimeout(timeout)
+
+        handle = uuid.uuid4().hex[:12]
+        self._operations[handle] = Operation(session, cmds)
+        if not all(is_read_only(cmd) for cmd in cmds):
+            # the operation runs on its own session, only what it may
+            # change on the device is forgotten
+            if any(self._changes_partitions(cmd['command']) for cmd in cmds):
+                self._partitions = None
+            self._startup_fingerprints = {}
+        return handle
+
+    def get_operation(self, handle=None, collect=False):
+        """ Returns the state of the operation, with the responses of the
+        commands completed so far and the last lines of output of the one
+        running.  With collect a finished operation is forgotten.
+        """
+        if handle not in self._operations:
+            raise ValueError("No operation with handle '%s' on this connection" % handle)
+        status = self._operations[handle].status()
+        if collect and status['finished']:
+            del self._operations[handle]
+        return status
+
+    def _is_parallel(self, cmd):
+        # active-partition would switch the additional session it runs on
+        return is_read_only(cmd) and not to_text(cmd['command']).strip().startswith('active-partition')
+
+    def _changes_partitions(self, command):
+        return to_text(command).strip().startswith(('partition ', 'no partition '))
+
+    def _track_command(self, command, out):
+        if self._changes_partitions(command):
+            self._partitions = None
+        command = to_text(command).split()
+        if not command or command[0] == 'show':
+            return
+        if command[0] == 'active-partition':
+            if len(command) == 2 and 'does not exist' not in to_text(out):
+                self._partition = command[1]
+        elif command[0] == 'write':
+            self._startup_fingerprints = {}
+
+    def _get_sessions(self, count):
+        """ Returns up to count additional CLI sessions, opening the
+        missing ones.  Sessions that cannot be opened are skipped.
+        """
+        while len(self._sessions) < min(count, MAX_SESSIONS - 1):
+            try:
+                self._sessions.append(CliSession(self._connection))
+            except Exception as exc:
+                self._connection.queue_message(
+                    'warning', 'Unable to open additional CLI session, running '
+                    'commands on fewer sessions: %s' % to_text(exc))
+                break
+        return self._sessions[:count]
+
+    def _run_commands_parallel(self, cmds, check_rc, concurrency, captures=None):
+        """ Spreads read-only commands over the persistent session and a
+        pool of additional sessions.  Responses keep the command order.
+
+        Commands with captures are streamed by the additional sessions,
+        the persistent session only runs the ones left when no additional
+        session could be opened.
+        """
+        pending = list(range(len(cmds)))
+        results = [None] * len(cmds)
+        errors = {}
+        lock = threading.Lock()
+
+        def next_index():
+            with lock:
+                return pending.pop(0) if pending else None
+
+        def worker(session, number):
+            try:
+                session.set_partition(self._partition)
+            except Exception:
+                self._drop_session(session)
+                return
+
+            index = next_index()
+            while index is not None:
+                start = time.time()
+                try:
+                    if captures:
+                        results[index] = session.stream(to_bytes(cmds[index]['command']),
+                                                        captures[index])
+                    else:
+                        results[index] = session.send(to_bytes(cmds[index]['command']))
+                except AnsibleConnectionFailure as exc:
+                    errors[index] = exc
+                except Exception:
+                    # broken session, hand the command back to the pool
+                    with lock:
+                        pending.insert(0, index)
+                    self._drop_session(session)
+                    return
+                if self._perf is not None:
+                    size = results[index]['bytes'] if captures and results[index] else \
+                        len(results[index] or '')
+                    self._perf.round_trip(to_text(cmds[index]['command']), time.time() - start,
+                                          size, session=number)
+                index = next_index()
+
+        threads = []
+        for number, session in enumerate(self._get_sessions(concurrency - 1), 1):
+            thread = threading.Thread(target=worker, args=(session, number))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        if captures:
+            for thread in threads:
+                thread.join()
+
+        # the persistent session relies on signals, so it only runs
+        # from the main thread
+        while True:
+            index = next_index()
+            if index is None:
+                for thread in threads:
+                    thread.join()
+                index = next_index()
+                if index is None:
+                    break
+            try:
+                results[index] = self._captured(captures, index, self.send_command(**cmds[index]))
+            except AnsibleConnectionFailure as exc:
+                errors[index] = exc
+
+        for index in sorted(errors):
+            if check_rc:
+                raise errors[index]
+            out = getattr(errors[index], 'err', to_text(errors[index]))
+            results[index] = self._captured(captures, index, out)
+        return results
+
+    def _drop_session(self, session):
+        if session in self._sessions:
+            self._sessions.remove(session)
+        try:
+            session.close()
+        except Exception:
+            pass
@@ -15,3 +15,41 @@ notes:
     - For more information please see the L(ACOS Platform Options guide,
       ../network/user_guide/platform_acos.html).
 '''
+
+    PERF = r'''
+options:
+  perf:
+    description:
+      - Return the timings of the task in C(perf). Recorded are the wall
+        time of the calls made to the cliconf plugin, and for every round
+        trip to the device the command, wall time and bytes received.
+        Round trip time is time waiting for the device prompt, including
+        device latency and the network_cli buffer read timeout.
+    type: bool
+    default: false
+  perf_trace:
+    description:
+      - Path of a file the timings of the task, including every round
+        trip, are appended to as one line of JSON. Implies I(perf). Use
+        one file per host, e.g. with C({{ inventory_hostname }}) in the
+        path, when many hosts are run in parallel.
+    type: path
+'''
+
+    CONFIG_CACHE = r'''
+options:
+  config_cache:
+    description:
+      - Directory on the controller the running-config of the device is
+        kept in between runs, gzip compressed with one file per host,
+        partition and show flags. A kept running-config is reused as
+        long as the device reports the same C(Configuration last updated)
+        stamp, checked with one C(show running-config | include) command,
+        instead of transferring the whole running-config again. Can be
+        set for all tasks with the C(ACOS_CONFIG_CACHE) environment
+        variable.
+      - Hosts are told apart by the address connected to. The stamp has a
+        resolution of one second, changes made within the second a
+        running-config was kept may go unnoticed.
+    type: path
+'''
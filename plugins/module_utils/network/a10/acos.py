@@ -6,12 +6,77 @@ from __future__ import (absolute_import, division, print_function)
 __metaclass__ = type
 
 import json
+import time
+from collections import OrderedDict
 
 from ansible.module_utils._text import to_text
+from ansible.module_utils.basic import env_fallback
+from ansible.module_utils.common._collections_compat import Mapping
 from ansible_collections.ansible.netcommon.plugins.module_utils.network.common.utils import to_list
 from ansible.module_utils.connection import Connection, ConnectionError
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.config_store import ConfigStore
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.perf import TimedConnection
 
-_DEVICE_CONFIGS = {}
+
+class ConfigCache(object):
+    """ LRU cache of device configurations
+
+    Entries are keyed by (partition, source, flags) and evicted once
+    either the number of entries or their total size exceeds the budget.
+    """
+
+    def __init__(self, max_entries=8, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        try:
+            value = self._entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        self._entries[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key))
+        if len(value) > self.max_bytes:
+            return
+        self._entries[key] = value
+        self._size += len(value)
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            self._size -= len(self._entries.popitem(last=False)[1])
+
+    def invalidate(self):
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+        self._size = 0
+
+    def stats(self):
+        return dict(hits=self.hits, misses=self.misses,
+                    invalidations=self.invalidations,
+                    entries=len(self._entries), bytes=self._size)
+
+
+_DEVICE_CONFIGS = ConfigCache()
+CONFIG_REVISION_MARKER = 'Configuration last updated'
+
+perf_argument_spec = dict(
+    perf=dict(default=False, type='bool'),
+    perf_trace=dict(type='path'),
+)
+
+config_cache_argument_spec = dict(
+    config_cache=dict(type='path', fallback=(env_fallback, ['ACOS_CONFIG_CACHE'])),
+)
 
 
 def get_connection(module):
@@ -48,46 +113,247 @@ def get_defaults_flag(module):
     return to_text(out, errors='surrogate_then_replace').strip()
 
 
-def get_config(module, flags=None):
+def get_active_partition(module):
+    return getattr(module, '_acos_partition', None) or \
+        module.params.get('partition') or 'shared'
+
+
+def set_active_partition(module, partition=None):
+    """ Makes partition, by default the partition option or shared, the
+    active partition of the session.  Fails the module when the partition
+    does not exist.
+    """
+    partition = partition or module.params.get('partition') or 'shared'
+    if partition.lower() == 'shared':
+        partition = 'shared'
+
+    connection = get_connection(module)
+    try:
+        connection.set_partition(partition=partition)
+    except ConnectionError as exc:
+        if 'does not exist' in to_text(exc):
+            module.fail_json(msg="Provided partition does not exist")
+        module.fail_json(msg=to_text(exc, errors='surrogate_then_replace'))
+    module._acos_partition = partition
+
+
+def get_config(module, flags=None, source='running'):
     flags = to_list(flags)
 
     section_filter = False
     if flags and 'section' in flags[-1]:
         section_filter = True
 
-    flag_str = ' '.join(flags)
+    key = (get_active_partition(module), source, ' '.join(flags))
 
-    try:
-        return _DEVICE_CONFIGS[flag_str]
-    except KeyError:
-        connection = get_connection(module)
+    cfg = _DEVICE_CONFIGS.get(key)
+    if cfg is None:
+        store = stored_key = revision = None
+        if source == 'running' and not section_filter:
+            store, stored_key = get_config_store(module, key)
+        if store:
+            revision = get_config_revision(module)
+            if revision:
+                cfg = store.load(stored_key, revision)
+
+        if cfg is None:
+            connection = get_connection(module)
+            try:
+                out = connection.get_config(source=source, flags=flags)
+            except ConnectionError as exc:
+                if section_filter:
+                    out = get_config(module, flags=flags[:-1], source=source)
+                else:
+                    module.fail_json(
+                        msg=to_text(
+                            exc, errors='surrogate_then_replace'))
+            cfg = to_text(out, errors='surrogate_then_replace').strip()
+            if store and revision:
+                try:
+                    store.save(stored_key, revision, cfg)
+                except (IOError, OSError) as exc:
+                    module.warn('Unable to write the config cache %s: %s' % (store.path, to_text(exc)))
+        _DEVICE_CONFIGS.put(key, cfg)
+    return cfg
+
+
+def get_config_store(module, key):
+    """ Returns the ConfigStore of the config_cache option and the key of
+    the configuration in it, or (None, None) without config_cache or when
+    the connection does not tell the host.
+    """
+    path = module.params.get('config_cache')
+    if not path:
+        return None, None
+    if not hasattr(module, '_acos_config_store'):
         try:
-            out = connection.get_config(flags=flags)
-        except ConnectionError as exc:
-            if section_filter:
-                out = get_config(module, flags=flags[:-1])
-            else:
-                module.fail_json(
-                    msg=to_text(
-                        exc, errors='surrogate_then_replace'))
-        cfg = to_text(out, errors='surrogate_then_replace').strip()
-        _DEVICE_CONFIGS[flag_str] = cfg
-        return cfg
-
-
-def run_commands(module, commands, check_rc=True):
+            host = get_connection(module).get_option('host')
+        except ConnectionError:
+            host = None
+        module._acos_config_store = ConfigStore(path) if host else None
+        module._acos_config_host = host
+    if module._acos_config_store is None:
+        return None, None
+    partition, source, flags = key
+    return module._acos_config_store, (module._acos_config_host, partition, flags)
+
+
+def invalidate_config():
+    _DEVICE_CONFIGS.invalidate()
+
+
+def config_cache_stats():
+    return _DEVICE_CONFIGS.stats()
+
+
+def _command_text(command):
+    if isinstance(command, Mapping):
+        command = command['command']
+    return to_text(command).strip()
+
+
+def is_read_only(command):
+    """ True for commands that cannot change the device configuration,
+    show and active-partition commands that answer no prompt.  Shared by
+    the modules and the cliconf plugin.
+    """
+    # modules send commands with the defaults of transform_commands
+    if isinstance(command, Mapping) and (command.get('prompt') or command.get('answer') or
+                                         command.get('sendonly') or not command.get('newline', True)):
+        return False
+    return _command_text(command).split(' ', 1)[0] in ('show', 'active-partition')
+
+
+def get_config_revision(module):
+    """ Returns the "Configuration last updated" stamp of the running
+    config, or None when the device does not report one.
+    """
+    out = run_commands(module, 'show running-config | include %s' % CONFIG_REVISION_MARKER,
+                       check_rc=False)
+    for line in to_text(out[0]).splitlines():
+        if CONFIG_REVISION_MARKER in line:
+            return line.strip()
+    return None
+
+
+def run_commands(module, commands, check_rc=True, concurrency=None, capture=None):
+    """ Runs commands on the device and returns their responses, with
+    capture the dicts of stdout, bytes, truncated and path described by
+    the run_commands method of the cliconf plugin.
+    """
     connection = get_connection(module)
+    kwargs = dict(commands=commands, check_rc=check_rc)
+    if concurrency and concurrency > 1:
+        kwargs['concurrency'] = concurrency
+    if capture is not None:
+        kwargs['capture'] = capture
     try:
-        return connection.run_commands(commands=commands, check_rc=check_rc)
+        responses = connection.run_commands(**kwargs)
     except ConnectionError as exc:
         module.fail_json(msg=to_text(exc))
 
+    for command, out in zip(to_list(commands), responses):
+        command = _command_text(command)
+        if capture is not None:
+            out = out['stdout']
+        if command.startswith('active-partition'):
+            if 'does not exist' not in to_text(out):
+                module._acos_partition = command.split()[-1]
+        elif not is_read_only(command):
+            invalidate_config()
+    return responses
+
 
-def load_config(module, commands):
+def start_operation(module, commands, timeout=None):
+    """ Starts the commands on their own CLI session in the background and
+    returns the handle of the operation.
+    """
     connection = get_connection(module)
+    try:
+        handle = connection.start_operation(commands=commands, timeout=timeout)
+    except ConnectionError as exc:
+        module.fail_json(msg=to_text(exc, errors='surrogate_then_replace'))
+    if not all(is_read_only(command) for command in to_list(commands)):
+        invalidate_config()
+    return handle
+
 
+def get_operation(module, handle, collect=False):
+    """ Returns the state of the operation started with start_operation,
+    forgetting it on the connection when collect is set and it finished.
+    """
+    connection = get_connection(module)
     try:
-        resp = connection.edit_config(commands)
+        return connection.get_operation(handle=handle, collect=collect)
+    except ConnectionError as exc:
+        module.fail_json(msg=to_text(exc, errors='surrogate_then_replace'))
+
+
+def load_config(module, commands, batch_size=None):
+    connection = get_connection(module)
+
+    try:
+        resp = connection.edit_config(candidate=commands, batch_size=batch_size)
         return resp.get('response')
     except ConnectionError as exc:
         module.fail_json(msg=to_text(exc))
+    finally:
+        invalidate_config()
+
+
+def start_perf(module):
+    """ Starts recording the timings of the module run when the perf or
+    perf_trace options are set.
+    """
+    if not (module.params.get('perf') or module.params.get('perf_trace')):
+        return
+    module._acos_perf_started = time.time()
+    module._acos_connection = TimedConnection(get_connection(module))
+    try:
+        module._acos_connection.start_perf()
+    except ConnectionError as exc:
+        module.fail_json(msg=to_text(exc, errors='surrogate_then_replace'))
+
+
+def collect_perf(module, slowest=10):
+    """ Returns the timings of the module run, or None when they are not
+    recorded, and appends them with every round trip to perf_trace.
+    """
+    connection = getattr(module, '_acos_connection', None)
+    if not isinstance(connection, TimedConnection):
+        return None
+    try:
+        recorded = connection.connection.get_perf()
+    except ConnectionError as exc:
+        module.warn('Unable to collect timings: %s' % to_text(exc))
+        recorded = {}
+
+    commands = recorded.get('commands', [])
+    perf = dict(
+        seconds=round(time.time() - module._acos_perf_started, 6),
+        rpc=connection.report(),
+        calls=recorded.get('calls', {}),
+        round_trips=recorded.get('round_trips', len(commands)),
+        bytes=recorded.get('bytes', sum(item['bytes'] for item in commands)),
+        prompt_wait=recorded.get('prompt_wait', round(sum(item['seconds'] for item in commands), 6)),
+        slowest=sorted(commands, key=lambda item: item['seconds'], reverse=True)[:slowest],
+        config_cache=config_cache_stats(),
+    )
+    store = getattr(module, '_acos_config_store', None)
+    if store:
+        perf['config_store'] = store.stats()
+
+    path = module.params.get('perf_trace')
+    if path:
+        try:
+            host = connection.connection.get_option('host')
+        except ConnectionError:
+            host = None
+        trace = dict(perf, module=module._name, time=module._acos_perf_started, host=host,
+                     partition=get_active_partition(module), commands=commands)
+        try:
+            with open(path, 'a') as f:
+                f.write(json.dumps(trace) + '\n')
+        except (IOError, OSError) as exc:
+            module.warn('Unable to write timings to %s: %s' % (path, to_text(exc)))
+    return perf
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: ©2024 A10 Networks, Inc. All rights reserved.
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import errno
+import gzip
+import hashlib
+import os
+import re
+import tempfile
+
+from ansible.module_utils._text import to_bytes
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _file_checksum(path):
+    digest = hashlib.sha1()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(block)
+    except (IOError, OSError):
+        return None
+    return digest.hexdigest()
+
+
+class _HashingWriter(object):
+    """ File object writing to f and hashing what is written """
+
+    def __init__(self, f):
+        self.f = f
+        self.digest = hashlib.sha1()
+
+    def write(self, data):
+        self.digest.update(data)
+        return self.f.write(data)
+
+    def flush(self):
+        self.f.flush()
+
+
+def sanitize_contents(contents, filters=None):
+    """ Removes what the regexes of filters match from contents and strips
+    it, like the netcommon action plugin does for the backups it writes.
+    """
+    for regex in filters or []:
+        contents = re.sub(regex, '', contents)
+    return contents.strip()
+
+
+def write_backup(dest, contents, compress=False, filters=None):
+    """ Writes contents, sanitized with filters, to dest in chunks of
+    CHUNK_SIZE characters, gzip compressed with compress, and returns
+    (checksum, changed).  contents is held in memory, only the writing is
+    chunked.
+
+    The file is written next to dest and renamed, dest is left alone when
+    its checksum, the sha1 of the file as written, is the same.
+    Compressed files carry no timestamp so that the checksum only depends
+    on contents.  Raises IOError or OSError when dest cannot be written.
+    """
+    contents = sanitize_contents(contents, filters)
+    directory = os.path.dirname(dest) or '.'
+    try:
+        os.makedirs(directory)
+    except OSError as exc:
+        if exc.errno != errno.EEXIST:
+            raise
+
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.%s.' % os.path.basename(dest))
+    try:
+        with os.fdopen(fd, 'wb') as raw:
+            writer = _HashingWriter(raw)
+            out = gzip.GzipFile(filename='', fileobj=writer, mode='wb', mtime=0) if compress else writer
+            for start in range(0, len(contents), CHUNK_SIZE):
+                out.write(to_bytes(contents[start:start + CHUNK_SIZE], errors='surrogate_or_strict'))
+            if compress:
+                out.close()
+        checksum = writer.digest.hexdigest()
+        if _file_checksum(dest) == checksum:
+            os.remove(tmp)
+            return checksum, False
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp, 0o666 & ~umask)
+        os.rename(tmp, dest)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return checksum, True
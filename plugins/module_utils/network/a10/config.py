@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: ©2024 A10 Networks, Inc. All rights reserved.
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import hashlib
+import re
+
+from ansible.module_utils._text import to_bytes, to_native
+from ansible_collections.ansible.netcommon.plugins.module_utils.network.common.config import (
+    DEFAULT_COMMENT_TOKENS, DEFAULT_IGNORE_LINES_RE, NetworkConfig, ignore_line)
+
+TOPLEVEL_RE = re.compile(r'\S')
+ENTRY_RE = re.compile(r'([{};])')
+SAVED_STAMP_RE = re.compile(r'^!Configuration last saved at (.+)$')
+
+
+def ignore_line_func(comment_tokens=None):
+    """ Equivalent of netcommon's ignore_line() with the comment tokens
+    and ignore regexes folded into one check each.
+    """
+    regexes = list(DEFAULT_IGNORE_LINES_RE)
+    if any(regex.flags != re.compile('').flags for regex in regexes):
+        return lambda text: ignore_line(text, comment_tokens)
+
+    tokens = tuple(comment_tokens or DEFAULT_COMMENT_TOKENS)
+    ignore_re = re.compile('|'.join('(?:%s)' % regex.pattern for regex in regexes))
+    return lambda text: text.startswith(tokens) or ignore_re.match(text) is not None
+
+
+def config_fingerprint(contents, ignore_lines=None, comment_tokens=None):
+    """ Returns the hex digest of NetworkConfig(indent=1, contents=contents,
+    ignore_lines=ignore_lines).sha1, hashing the kept lines one at a time
+    without building the config tree.
+    """
+    # registers ignore_lines the same way NetworkConfig does
+    NetworkConfig(indent=1, ignore_lines=ignore_lines)
+    is_ignored = ignore_line_func(comment_tokens)
+    sha1 = hashlib.sha1()
+    separator = b''
+    for line in to_native(contents, errors='surrogate_or_strict').split('\n'):
+        text = line
+        if '{' in text or '}' in text or ';' in text:
+            text = ENTRY_RE.sub('', text)
+        text = text.strip()
+        if not text or is_ignored(text):
+            continue
+        sha1.update(separator + to_bytes(line, errors='surrogate_or_strict'))
+        separator = b'\n'
+    return sha1.hexdigest()
+
+
+def config_saved_stamp(contents):
+    """ Returns the "Configuration last saved" stamp from the header of a
+    running-config, None when it has none.
+    """
+    for line in contents.lstrip().split('\n', 8)[:8]:
+        if not line.startswith('!'):
+            break
+        match = SAVED_STAMP_RE.match(line.strip())
+        if match:
+            return match.group(1)
+    return None
+
+
+class RunningConfigIndex(object):
+    """ Index of a running-config by top-level object
+
+    A single pass over the raw text records the line ranges of every
+    top-level block, keyed by the block's top-level line, without building
+    a NetworkConfig tree.  Lines are skipped and grouped exactly like
+    NetworkConfig.parse() does, so parsing a subset of the blocks gives the
+    same ConfigLine objects as parsing the whole config.
+    """
+
+    def __init__(self, contents, ignore_lines=None, comment_tokens=None):
+        # registers ignore_lines the same way NetworkConfig does
+        NetworkConfig(indent=1, ignore_lines=ignore_lines)
+        is_ignored = ignore_line_func(comment_tokens)
+        self.lines = contents.split('\n')
+        self.blocks = {}
+        self.count = 0
+        self._kept = []
+
+        key = None
+        start = 0
+        for index, line in enumerate(self.lines):
+            text = line
+            if '{' in text or '}' in text or ';' in text:
+                text = ENTRY_RE.sub('', text)
+            text = text.strip()
+            if not text or is_ignored(text):
+                continue
+
+            self.count += 1
+            self._kept.append(index)
+            if TOPLEVEL_RE.match(line):
+                self.blocks.setdefault(key, []).append((start, index))
+                key = line.strip()
+                start = index
+        self.blocks.setdefault(key, []).append((start, len(self.lines)))
+
+    def keys_for(self, line):
+        """ Top-level keys of the blocks that may hold a ConfigLine whose
+        ``line`` is the given text.
+        """
+        keys = []
+        pos = line.find(' ')
+        while pos != -1:
+            if line[:pos] in self.blocks:
+                keys.append(line[:pos])
+            pos = line.find(' ', pos + 1)
+        if line in self.blocks:
+            keys.append(line)
+        return keys
+
+    def subset(self, keys, header=True):
+        """ Text of the blocks of keys, with the lines before the first
+        top-level block unless header is False.
+        """
+        ranges = []
+        for key in set(keys) | (set([None]) if header else set()):
+            ranges.extend(self.blocks.get(key, []))
+        return '\n'.join('\n'.join(self.lines[start:end])
+                         for start, end in sorted(ranges) if start < end)
+
+    def prefix(self, count):
+        """ Text holding the first count lines kept by NetworkConfig """
+        if count >= self.count:
+            return '\n'.join(self.lines)
+        if count <= 0:
+            return ''
+        return '\n'.join(self.lines[:self._kept[count - 1] + 1])
+
+
+def config_difference(candidate_obj, running, match='line', ignore_lines=None):
+    """ Same result as candidate_obj.difference() against the full running
+    config, computed against the indexed part of it that can match.
+    """
+    running = to_native(running, errors='surrogate_or_strict')
+    index = RunningConfigIndex(running, ignore_lines=ignore_lines)
+
+    if match == 'line':
+        keys = set()
+        for item in candidate_obj.items:
+            keys.update(index.keys_for(item.line))
+        contents = index.subset(keys)
+    elif match == 'strict':
+        contents = index.prefix(len(candidate_obj.items))
+    elif match == 'exact' and index.count != len(candidate_obj.items):
+        contents = ''
+    else:
+        contents = running
+
+    running_obj = NetworkConfig(indent=1, contents=contents,
+                                ignore_lines=ignore_lines)
+    return candidate_obj.difference(running_obj, match=match)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: ©2024 A10 Networks, Inc. All rights reserved.
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import errno
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import zlib
+
+from ansible.module_utils._text import to_bytes, to_text
+
+UNSAFE_FILENAME_RE = re.compile(r'[^\w.-]')
+
+
+class ConfigStore(object):
+    """ Device configurations kept on the controller between runs
+
+    Every configuration is stored gzip compressed in its own file, keyed
+    by (host, partition, flags), together with the revision of the device
+    it was fetched at.  load() only returns a configuration while the
+    device still reports the same revision.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def filename(self, key):
+        host, partition = [UNSAFE_FILENAME_RE.sub('_', to_text(item)) for item in key[:2]]
+        digest = hashlib.sha1(to_bytes(json.dumps(list(key)))).hexdigest()[:12]
+        return os.path.join(self.path, '%s_%s_%s.json.gz' % (host, partition, digest))
+
+    def load(self, key, revision):
+        try:
+            with gzip.open(self.filename(key), 'rb') as f:
+                entry = json.loads(to_text(f.read()))
+        except (IOError, OSError, EOFError, ValueError, zlib.error):
+            entry = None
+        if not entry or entry.get('key') != list(key) or entry.get('revision') != revision:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry['config']
+
+    def save(self, key, revision, config):
+        """ Stores config atomically, raises IOError or OSError when the
+        directory cannot be written.
+        """
+        try:
+            os.makedirs(self.path)
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+        entry = dict(key=list(key), revision=revision, config=config)
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as raw:
+                with gzip.GzipFile(fileobj=raw, mode='wb') as f:
+                    f.write(to_bytes(json.dumps(entry)))
+            os.rename(tmp, self.filename(key))
+        except Exception:
+            os.remove(tmp)
+            raise
+        self.writes += 1
+
+    def stats(self):
+        return dict(hits=self.hits, misses=self.misses, writes=self.writes)
@@ -5,22 +5,75 @@
 from __future__ import absolute_import, division, print_function
 __metaclass__ = type
 
-import json
+import binascii
 import platform
 import re
+import socket
 
-from ansible.module_utils.six import iteritems
+from ansible.module_utils._text import to_native, to_text
 from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.acos import (
-    run_commands, get_capabilities)
+    get_capabilities, get_config, run_commands)
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.parsers import (
+    InterfacesParser, parse_output)
+
+
+class CommandPlanner(object):
+    """ Runs the show commands of all fact subsets of a module run once
+
+    Subsets declare the unfiltered commands they parse when they are
+    created.  The first output() runs every declared command that did not
+    run yet in one run_commands call, and the subsets share the output of
+    each command and what its parser makes of it.
+    """
+
+    def __init__(self, module):
+        self.module = module
+        self.pending = []
+        self.outputs = {}
+        self.parsed_outputs = {}
+
+    def add(self, commands):
+        for command in commands:
+            if command not in self.outputs and command not in self.pending:
+                self.pending.append(command)
+
+    def output(self, command):
+        if command not in self.outputs:
+            self.add([command])
+            self.run()
+        return self.outputs[command]
+
+    def parsed(self, command):
+        """ The output of command as returned by parse_output() """
+        if command not in self.parsed_outputs:
+            self.parsed_outputs[command] = parse_output(command, self.output(command))
+        return self.parsed_outputs[command]
+
+    def run(self):
+        commands, self.pending = self.pending, []
+        responses = run_commands(self.module, commands=commands, check_rc=False,
+                                 concurrency=self.module.params.get('concurrency'))
+        self.outputs.update(zip(commands, responses))
+
+
+def get_planner(module):
+    if not hasattr(module, '_acos_fact_planner'):
+        module._acos_fact_planner = CommandPlanner(module)
+    return module._acos_fact_planner
 
 
 class FactsBase(object):
 
+    COMMANDS = ()
+
     def __init__(self, module):
         self.module = module
         self.warnings = []
         self.facts = {}
         self.capabilities = get_capabilities(self.module)
+        self.concurrency = module.params.get('concurrency')
+        self.planner = get_planner(module)
+        self.planner.add(self.COMMANDS)
 
     def populate(self):
         pass
@@ -37,192 +90,121 @@ class FactsBase(object):
             yield self.transform_dict(item, keymap)
 
 
+HOSTID_RE = re.compile(r'^Host ID\s*:\s*(.*)$', re.M)
+
+
 class Default(FactsBase):
 
+    COMMANDS = ('show version', 'show license-info')
+
     def populate(self):
-        COMMANDS = []
-        COMMANDS.append('show license-info | include Host')
-        COMMANDS.append('show bootimage | include primary')
-        COMMANDS.append('show hardware | include Serial')
-        COMMANDS.append('show version | include ACOS')
-        COMMANDS.append('show hardware | include Series')
-        responses = run_commands(self.module, commands=COMMANDS,
-                                 check_rc=False)
+        version = self.planner.parsed('show version') or {}
         self.facts['api'] = 'cliConf'
-        self.facts['hostid'] = self.get_value(responses[0])
-        self.facts['image'] = self.parse_image(responses[1])
+        self.facts['hostid'] = self.search(HOSTID_RE, self.planner.output('show license-info'))
+        self.facts['image'] = self.parse_image(version)
         self.facts['python_version'] = platform.python_version()
-        self.facts['serialnum'] = self.get_value(responses[2])
-        self.facts['version'] = responses[3].strip()
-        self.facts['model'] = responses[4].strip()
-
-    def parse_model(self, value):
-        match = re.search(r'Virtualization type: (\S+)', value)
-        if match:
-            return match.group(1).strip()
-        return ''
-
-    def parse_image(self, value):
-        value = value.strip()
-        match = re.search(r'Hard Disk primary \s*(\S+)', value)
+        self.facts['serialnum'] = version.get('serial_number') or ''
+        self.facts['version'] = version.get('software') or ''
+        self.facts['model'] = version.get('model') or ''
+
+    def parse_image(self, version):
+        # the bootimage name of the primary image, e.g. 4.1.1-P9.105
+        image = version.get('images', {}).get('hard_disk_primary')
+        if image:
+            return '%s.%s' % (image['version'], image['build'])
+
+    def search(self, regex, value, group=1):
+        match = regex.search(value)
         if match:
-            return match.group(1).strip()
-
-    def parse_hostname(self, hostname):
-        hostname = hostname.strip().replace("\n", "")
-        if len(hostname) > 0:
-            hostname = json.loads(hostname)
-            if 'hostname' in hostname and 'value' in hostname['hostname']:
-                return hostname['hostname']['value']
+            return match.group(group).strip()
         return ''
 
-    def get_value(self, value):
-        value = value.strip()
-        value = value[value.find(':') + 1:]
-        return value.strip()
-
 
 class Hardware(FactsBase):
 
-    def parse_memory(self, data):
-        # Example - Memory 8071 Mbyte, Free Memory 3816 Mbyte
-        total_mem, free_mem = data.strip().split(',')
-        total_mem = total_mem[total_mem.find('y') + 1:].strip()
-        free_mem = free_mem[free_mem.find('y') + 1:].strip()
-        return total_mem, free_mem
+    COMMANDS = ('show version',)
 
     def populate(self):
-        COMMANDS = []
-        COMMANDS.append('show version | section Memory')
-        responses = run_commands(self.module, commands=COMMANDS,
-                                 check_rc=False)
-        memory_info = self.parse_memory(responses[0])
-        self.facts['memtotal_mb'], self.facts['memfree_mb'] = memory_info
+        version = self.planner.parsed('show version') or {}
+        if version.get('memory_total_mb') is not None:
+            self.facts['memtotal_mb'] = '%d Mbyte' % version['memory_total_mb']
+            self.facts['memfree_mb'] = '%d Mbyte' % version['memory_free_mb']
+
+
+def pack_address(address, family):
+    """ Binary form of an address, None when it does not parse """
+    try:
+        return socket.inet_pton(family, to_native(address))
+    except (socket.error, ValueError):
+        return None
+
+
+def sorted_addresses(addresses, family=socket.AF_INET):
+    """ Returns the addresses deduplicated and in numeric order, IPv6
+    addresses in their compressed form.  Addresses that do not parse
+    follow in text order.
+    """
+    packed = set()
+    invalid = set()
+    for address in addresses:
+        key = pack_address(address, family)
+        if key is None:
+            invalid.add(address)
+        else:
+            packed.add(key)
+    return [to_text(socket.inet_ntop(family, key)) for key in sorted(packed)] + sorted(invalid)
+
+
+def network_of(address, prefix, family=socket.AF_INET):
+    """ Returns the network of address/prefix as text, e.g. 10.1.0.0/24,
+    or None when the address or prefix do not parse.
+    """
+    packed = pack_address(address, family)
+    try:
+        prefix = int(prefix)
+    except (TypeError, ValueError):
+        return None
+    bits = len(packed or b'') * 8
+    if not packed or not 0 <= prefix <= bits:
+        return None
+    value = int(binascii.hexlify(packed), 16) & ~((1 << (bits - prefix)) - 1)
+    packed = binascii.unhexlify('%0*x' % (bits // 4, value))
+    return '%s/%d' % (to_text(socket.inet_ntop(family, packed)), prefix)
+
+
+def address_index(interfaces):
+    """ Index of the addresses of the interfaces by network, for lookups
+    by later tasks.  Unspecified addresses, e.g. 0.0.0.0, are left out.
+    """
+    index = {}
+    for key in sorted(interfaces):
+        iface = interfaces[key]
+        for family, addresses in ((socket.AF_INET, iface.ipv4), (socket.AF_INET6, iface.ipv6)):
+            for address, prefix in addresses:
+                packed = pack_address(address, family)
+                if not packed or not packed.strip(b'\0'):
+                    continue
+                network = network_of(address, prefix, family)
+                if network:
+                    index.setdefault(network, []).append(dict(interface=key, address=address))
+    return index
 
 
 class Interfaces(FactsBase):
 
-    ipv4_addr_list = []
-    ipv6_addr_list = []
+    COMMANDS = ('show interfaces',)
 
     def populate(self):
-        self.facts['interfaces'] = {}
-        self.facts['all_ipv4_addresses'] = []
-        self.facts['all_ipv6_addresses'] = []
-        COMMANDS = []
-        COMMANDS.append('show interfaces')
-        responses = run_commands(self.module, commands=COMMANDS,
-                                 check_rc=False)
-
-        data = responses[0].strip().split('\n\n  ')
-        all_interface_list = {}
-        for data_obj in data:
-            interfaces = self.parse_interface_key(data_obj)
-            all_interface_list.update(self.populate_interfaces(interfaces))
-        self.facts['interfaces'].update(all_interface_list)
-        self.facts['all_ipv4_addresses'] = self.ipv4_addr_list
-        self.facts['all_ipv6_addresses'] = self.ipv6_addr_list
-
-    def parse_interface_key(self, data):
-        parsed = dict()
-        key = ''
-        for line in data.split('\n'):
-            if len(line) == 0:
-                continue
-            if line[0] == ' ':
-                parsed[key] += '\n%s' % line
-            else:
-                match = re.match(r"^((?:\S+\s+){1}\S+).*", line)
-                if match:
-                    key = match.group(1)
-                    parsed[key] = line
-        return parsed
-
-    def populate_interfaces(self, interfaces):
-        facts = dict()
-        for key, value in iteritems(interfaces):
-            iface = dict()
-            iface['name'] = self.parse_interface_name(value)
-            iface['macaddress'] = self.parse_macaddress(value)
-            iface['mtu'] = self.parse_mtu(value)
-            iface['duplex'] = self.parse_duplex(value)
-            iface['operstatus'] = self.parse_operstatus(value)
-            iface['ipv4'] = self.parse_ipv4(value)
-            iface['ipv6'] = self.parse_ipv6(value)
-
-            facts[key] = iface
-        return facts
-
-    def parse_interface_name(self, data):
-        match = re.search(r'Interface name is (\S+)', data)
-        if match:
-            return match.group(1)
-        return ''
-
-    def parse_macaddress(self, data):
-        match = re.search(r'Hardware is (?:.*), Address is (\S+)', data)
-        if match:
-            return match.group(1)
-
-    def parse_ipv4(self, data):
-        addr_list = []
-        match1 = re.findall(r'Internet address is (\S+)', data)
-        match2 = re.findall(r'Subnet mask is (\S+)', data)
-        if match1 and match2 and len(match1) == len(match2):
-            for i in range(len(match1)):
-                addr_pair = dict()
-                addr_pair['address'] = match1[i].replace(',', '')
-                self.ipv4_addr_list.append(addr_pair['address'])
-                addr_pair['subnet'] = sum(
-                    bin(int(x)).count('1') for x in match2[i].split('.'))
-                addr_list.append(addr_pair)
-        return addr_list
-
-    def parse_ipv6(self, data):
-        addr_list = []
-        match1 = re.findall(r'IPv6 address is (\S+) Prefix (\S+)', data)
-        for item in match1:
-            addr_dict = dict()
-            addr_dict['address'] = item[0]
-            self.ipv6_addr_list.append(addr_dict['address'])
-            addr_dict['prefix'] = item[1]
-            addr_list.append(addr_dict)
-        return addr_list
-
-    def parse_mtu(self, data):
-        match = re.search(r'MTU is (\d+)', data)
-        if match:
-            return int(match.group(1))
-
-    def parse_bandwidth(self, data):
-        match = re.search(r'BW (\d+)', data)
-        if match:
-            return int(match.group(1))
-
-    def parse_duplex(self, data):
-        match = re.search(r'Duplex (\w+)', data, re.M)
-        if match:
-            return match.group(1)
-
-    def parse_type(self, data):
-        match = re.search(r'Hardware is (.+),', data, re.M)
-        if match:
-            return match.group(1)
-
-    def parse_lineprotocol(self, data):
-        match = re.search(r'line protocol is (\S+)\s*$', data, re.M)
-        if match:
-            return match.group(1)
-
-    def parse_operstatus(self, data):
-        match = re.search(r'^(?:.+) is (.+),', data, re.M)
-        if match:
-            return match.group(1)
+        parser = InterfacesParser()
+        interfaces = parser.parse(self.planner.output('show interfaces'))
+        self.facts['interfaces'] = interfaces
+        self.facts['all_ipv4_addresses'] = sorted_addresses(parser.ipv4_addresses)
+        self.facts['all_ipv6_addresses'] = sorted_addresses(parser.ipv6_addresses, socket.AF_INET6)
+        if self.module.params.get('address_index'):
+            self.facts['address_index'] = address_index(interfaces)
 
 
 class Config(FactsBase):
 
     def populate(self):
-        responses = run_commands(self.module, commands=['show running-config'],
-                                 check_rc=False)
-        self.facts['config'] = responses[0]
+        self.facts['config'] = get_config(self.module)
@@ -5,9 +5,12 @@
 from __future__ import absolute_import, division, print_function
 __metaclass__ = type
 
+import time
+
+from ansible.module_utils.six import iteritems
 from ansible_collections.ansible.netcommon.plugins.module_utils.network.common.facts.facts import FactsBase
 from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.facts.base import (
-    Default, Hardware, Interfaces, Config)
+    Default, Hardware, Interfaces, Config, get_planner)
 
 FACT_LEGACY_SUBSETS = dict(
     default=Default,
@@ -16,6 +19,18 @@ FACT_LEGACY_SUBSETS = dict(
     config=Config
 )
 
+# subsets only gathered when named with lazy_subsets
+EXPENSIVE_SUBSETS = frozenset(['config', 'interfaces'])
+
+
+def to_facts(value):
+    """ Turns the records held by the fact classes into plain data """
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return dict((key, to_facts(item)) for key, item in iteritems(value))
+    return value
+
 
 class Facts(FactsBase):
     """ The fact class for ACOS """
@@ -24,6 +39,50 @@ class Facts(FactsBase):
 
     def __init__(self, module):
         super(Facts, self).__init__(module)
+        self.timings = {}
+
+    def runable_subsets(self, legacy_facts_type=None):
+        """ The subsets gather_subset asks for
+
+        default is gathered with any other subset, as netcommon does, so
+        only a gather_subset selecting no subset at all, e.g. [!all, !min],
+        gathers nothing.  With lazy_subsets, all does not include the
+        expensive subsets, only naming them does.
+        """
+        subsets = legacy_facts_type or self._gather_subset
+        runable = self.gen_runable(subsets, self.VALID_LEGACY_GATHER_SUBSETS)
+        if runable:
+            runable.add('default')
+            if self._module.params.get('lazy_subsets'):
+                runable -= EXPENSIVE_SUBSETS - set(subsets)
+        return runable
+
+    def get_network_legacy_facts(self, fact_legacy_obj_map, legacy_facts_type=None):
+        """ Gathers the runable subsets, keeping in timings the seconds
+        spent running the commands of all subsets and populating each.
+        """
+        runable = self.runable_subsets(legacy_facts_type)
+        if not runable:
+            return
+        self.ansible_facts['ansible_net_gather_subset'] = sorted(runable)
+        instances = [(key, fact_legacy_obj_map[key](self._module)) for key in sorted(runable)]
+
+        planner = get_planner(self._module)
+        if planner.pending:
+            start = time.time()
+            planner.run()
+            self.timings['commands'] = round(time.time() - start, 6)
+
+        facts = dict()
+        for key, inst in instances:
+            start = time.time()
+            inst.populate()
+            self.timings[key] = round(time.time() - start, 6)
+            facts.update(inst.facts)
+            self._warnings.extend(inst.warnings)
+
+        for key, value in iteritems(facts):
+            self.ansible_facts['ansible_net_%s' % key] = value
 
     def get_facts(self, legacy_facts_type=None):
         """ Collects the facts for ACOS device
@@ -36,5 +95,7 @@ class Facts(FactsBase):
         if self.VALID_LEGACY_GATHER_SUBSETS:
             self.get_network_legacy_facts(FACT_LEGACY_SUBSETS,
                                           legacy_facts_type)
+            for key, value in iteritems(self.ansible_facts):
+                self.ansible_facts[key] = to_facts(value)
 
         return self.ansible_facts, self._warnings
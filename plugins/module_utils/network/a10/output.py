@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: ©2024 A10 Networks, Inc. All rights reserved.
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import os
+import tempfile
+from collections import deque
+
+from ansible.module_utils._text import to_bytes, to_text
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.config_store import UNSAFE_FILENAME_RE
+
+
+def output_filename(directory, host, index, command):
+    """ Path in directory of the file keeping the output of the command
+    at index of a task run against host.
+    """
+    name = '%s_%d_%s.txt' % (host, index, to_text(command).strip()[:64])
+    return os.path.join(directory, UNSAFE_FILENAME_RE.sub('_', name))
+
+
+class OutputCapture(object):
+    """ Receives the output of one command in chunks and keeps at most
+    limit bytes of it, its head or its tail, writing all of it to path
+    when set.
+
+    The file is written next to path and renamed by close(), a command
+    that fails leaves no partial file behind.  reset() drops what was
+    received, for a command that has to be sent again.
+    """
+
+    def __init__(self, limit=None, keep='head', path=None):
+        self.limit = limit
+        self.keep = keep
+        self.path = path
+        self.size = 0
+        self._chunks = deque()
+        self._kept = 0
+        self._file = self._tmp = None
+
+    def write(self, data):
+        data = to_bytes(data, errors='surrogate_or_strict')
+        self.size += len(data)
+        if self.path:
+            if self._file is None:
+                fd, self._tmp = tempfile.mkstemp(dir=os.path.dirname(self.path) or '.',
+                                                 prefix='.%s.' % os.path.basename(self.path))
+                self._file = os.fdopen(fd, 'wb')
+            self._file.write(data)
+        if self.limit is None:
+            self._chunks.append(data)
+        elif self.keep == 'head':
+            if self._kept < self.limit:
+                data = data[:self.limit - self._kept]
+                self._chunks.append(data)
+                self._kept += len(data)
+        else:
+            self._chunks.append(data)
+            self._kept += len(data)
+            while len(self._chunks) > 1 and self._kept - len(self._chunks[0]) >= self.limit:
+                self._kept -= len(self._chunks.popleft())
+
+    def reset(self):
+        if self._file:
+            self._file.close()
+            os.remove(self._tmp)
+        self.__init__(self.limit, self.keep, self.path)
+
+    def close(self):
+        """ Returns the kept output with its size before truncation """
+        if self.path and self._file is None:
+            self.write(b'')
+        if self._file:
+            self._file.close()
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(self._tmp, 0o666 & ~umask)
+            os.rename(self._tmp, self.path)
+            self._file = None
+
+        kept = b''.join(self._chunks)
+        if self.limit is not None and len(kept) > self.limit:
+            kept = kept[len(kept) - self.limit:]
+        result = dict(stdout=to_text(kept, errors='surrogate_then_replace').strip(),
+                      bytes=self.size, truncated=len(kept) < self.size)
+        if self.path:
+            result['path'] = self.path
+        return result
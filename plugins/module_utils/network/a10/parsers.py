@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: ©2024 A10 Networks, Inc. All rights reserved.
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import re
+import socket
+import struct
+
+from ansible.module_utils._text import to_text
+from ansible.module_utils.six import iteritems
+
+_PARSERS = []
+_LOOKUP = {}
+
+
+def parser(pattern):
+    """ Registers the decorated function as the parser of the output of
+    the commands matching pattern.  The function takes the output as
+    text and returns plain data, or None when it does not recognize it.
+    """
+    regex = re.compile(pattern)
+
+    def register(func):
+        _PARSERS.append((regex, func))
+        _LOOKUP.clear()
+        return func
+    return register
+
+
+def get_parser(command):
+    """ Returns the parser of command, None when no parser matches it.
+    Lookups are memoized by the command with its spacing normalized.
+    """
+    command = ' '.join(to_text(command).split())
+    try:
+        return _LOOKUP[command]
+    except KeyError:
+        pass
+    func = None
+    for regex, candidate in _PARSERS:
+        if regex.match(command):
+            func = candidate
+            break
+    _LOOKUP[command] = func
+    return func
+
+
+def parse_output(command, output):
+    """ Structured data of the output of command, None when no parser is
+    registered for the command or the output is not recognized.
+    """
+    func = get_parser(command)
+    if func is None:
+        return None
+    return func(to_text(output, errors='surrogate_then_replace'))
+
+
+SOFTWARE_RE = re.compile(r'^\s*(.*\(ACOS\) version (\S+), build (\S+)(?: \((.+)\))?)\s*$', re.M)
+BOOTED_FROM_RE = re.compile(r'^\s*Booted from (.+?)\s*$', re.M)
+IMAGE_VERSION_RE = re.compile(
+    r'^\s*(Hard Disk|Compact Flash) (primary|secondary) image( \(default\))? version (\S+), build (\S+)',
+    re.M)
+SERIAL_NUMBER_RE = re.compile(r'^\s*Serial Number:\s*(.*?)\s*$', re.M)
+AFLEX_VERSION_RE = re.compile(r'^\s*aFleX version:\s*(\S+)', re.M)
+AXAPI_VERSION_RE = re.compile(r'^\s*aXAPI version:\s*(\S+)', re.M)
+LAST_SAVED_RE = re.compile(r'^\s*Last configuration saved at (.+?)\s*$', re.M)
+VIRTUALIZATION_RE = re.compile(r'^\s*Virtualization type:\s*(.+?)\s*$', re.M)
+HARDWARE_RE = re.compile(r'^\s*Hardware:\s*(.+?)\s*$', re.M)
+MEMORY_MB_RE = re.compile(r'^\s*Memory (\d+) Mbyte, Free Memory (\d+) Mbyte', re.M)
+CURRENT_TIME_RE = re.compile(r'^\s*Current time is (.+?)\s*$', re.M)
+UPTIME_RE = re.compile(r'^\s*The system has been up (.+?)\s*$', re.M)
+
+
+def _group(regex, output):
+    match = regex.search(output)
+    return match.group(1) if match else None
+
+
+@parser(r'show version$')
+def parse_version(output):
+    """ show version, e.g.
+
+    dict(model='Thunder Series Unified Application Service Gateway vThunder',
+         software='64-bit Advanced Core OS (ACOS) version 4.1.1-P9, build 105 (Sep-21-2018,22:25)',
+         version='4.1.1-P9', build='105', built='Sep-21-2018,22:25',
+         images=dict(hard_disk_primary=dict(version='4.1.1-P9', build='105', default=True), ...),
+         memory_total_mb=8071, memory_free_mb=3894, uptime='33 days, 1 hour, 24 minutes', ...)
+    """
+    match = SOFTWARE_RE.search(output)
+    if not match:
+        return None
+    data = dict(model=output.strip().split('\n')[0].strip(), software=match.group(1),
+                version=match.group(2), build=match.group(3), built=match.group(4))
+    for key, regex in (('booted_from', BOOTED_FROM_RE), ('serial_number', SERIAL_NUMBER_RE),
+                       ('aflex_version', AFLEX_VERSION_RE), ('axapi_version', AXAPI_VERSION_RE),
+                       ('last_saved', LAST_SAVED_RE), ('virtualization', VIRTUALIZATION_RE),
+                       ('hardware', HARDWARE_RE), ('current_time', CURRENT_TIME_RE),
+                       ('uptime', UPTIME_RE)):
+        data[key] = _group(regex, output)
+
+    data['images'] = {}
+    for media, slot, default, version, build in IMAGE_VERSION_RE.findall(output):
+        key = '%s_%s' % (media.lower().replace(' ', '_'), slot)
+        data['images'][key] = dict(version=version, build=build, default=bool(default))
+
+    data['memory_total_mb'] = data['memory_free_mb'] = None
+    match = MEMORY_MB_RE.search(output)
+    if match:
+        data['memory_total_mb'], data['memory_free_mb'] = int(match.group(1)), int(match.group(2))
+    return data
+
+
+PARTITION_TOTAL_RE = re.compile(r'^Total Number of active partitions:\s*(\d+)', re.M)
+
+
+@parser(r'show partition$')
+def parse_partition(output):
+    """ show partition, the partitions in the order listed, e.g.
+
+    dict(total=7, partitions=[dict(name='part2', id=2, type='L3V', parent=None,
+                                   app_type=None, admin_count=0), ...])
+
+    None when the output has no table.
+    """
+    partitions = None
+    for line in output.splitlines():
+        if line.startswith('---'):
+            partitions = []
+        elif partitions is not None and line.strip():
+            fields = line.split()
+            fields += [None] * (6 - len(fields))
+            partitions.append(dict(
+                name=fields[0], id=_int(fields[1]), type=_dash(fields[2]),
+                parent=_dash(fields[3]), app_type=_dash(fields[4]), admin_count=_int(fields[5])))
+    if partitions is None:
+        return None
+    total = _group(PARTITION_TOTAL_RE, output)
+    return dict(total=int(total) if total else len(partitions), partitions=partitions)
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _dash(value):
+    return None if value == '-' else value
+
+
+INTERFACE_KEY_RE = re.compile(r"^((?:\S+\s+){1}\S+).*")
+INTERFACE_NAME_RE = re.compile(r'Interface name is (\S+)')
+MACADDRESS_RE = re.compile(r'Hardware is (?:.*), Address is (\S+)')
+MTU_RE = re.compile(r'MTU is (\d+)')
+DUPLEX_RE = re.compile(r'Duplex (\w+)')
+OPERSTATUS_RE = re.compile(r'^(?:.+) is (.+),')
+IPV4_ADDRESS_RE = re.compile(r'Internet address is (\S+)')
+IPV4_MASK_RE = re.compile(r'Subnet mask is (\S+)')
+IPV6_ADDRESS_RE = re.compile(r'IPv6 address is (\S+) Prefix (\S+)')
+
+
+# prefix length of every contiguous subnet mask
+PREFIX_LENGTHS = dict(
+    (socket.inet_ntoa(struct.pack('!I', (0xffffffff << (32 - length)) & 0xffffffff)), length)
+    for length in range(33))
+
+
+def prefix_length(mask):
+    length = PREFIX_LENGTHS.get(mask)
+    if length is None:
+        # non-contiguous masks count their set bits
+        length = sum(bin(int(x)).count('1') for x in mask.split('.'))
+    return length
+
+
+class InterfaceRecord(object):
+    """ Facts of one interface, see to_dict() for the returned layout
+
+    ipv4 and ipv6 hold (address, subnet) and (address, prefix) tuples.
+    masks only holds the subnet masks while the interface is parsed.
+    """
+
+    __slots__ = ('name', 'macaddress', 'mtu', 'duplex', 'operstatus',
+                 'ipv4', 'ipv6', 'masks')
+
+    def __init__(self):
+        self.name = ''
+        self.macaddress = None
+        self.mtu = None
+        self.duplex = None
+        self.operstatus = None
+        self.ipv4 = []
+        self.ipv6 = []
+        self.masks = []
+
+    def to_dict(self):
+        return dict(name=self.name, macaddress=self.macaddress, mtu=self.mtu,
+                    duplex=self.duplex, operstatus=self.operstatus,
+                    ipv4=[dict(address=address, subnet=subnet)
+                          for address, subnet in self.ipv4],
+                    ipv6=[dict(address=address, prefix=prefix)
+                          for address, prefix in self.ipv6])
+
+
+class InterfacesParser(object):
+    """ Line oriented parser of the ``show interfaces`` output
+
+    Lines are consumed one at a time and every interface is filled in a
+    single scan: a substring test picks the few fields a line can hold
+    before any regex runs on it.  An interface starts at a line that is
+    not indented, or at an indented line following a blank line; the
+    first two words of that line are the key of the interface.
+    """
+
+    def __init__(self):
+        self.interfaces = {}
+        self.ipv4_addresses = []
+        self.ipv6_addresses = []
+        self._block = {}
+        self._current = None
+        self._blank = True
+
+    def parse(self, output):
+        for line in output.strip().split('\n'):
+            self.feed(line)
+        return self.close()
+
+    def feed(self, line):
+        if self._blank and line.startswith('  '):
+            self._flush()
+            line = line[2:]
+        self._blank = not line
+        if not line:
+            return
+
+        if line[0] != ' ':
+            match = INTERFACE_KEY_RE.match(line)
+            if match:
+                self._current = InterfaceRecord()
+                self._block[match.group(1)] = self._current
+
+        iface = self._current
+        if iface is None or (' is ' not in line and 'Duplex ' not in line):
+            return
+        if not iface.name and 'Interface name is' in line:
+            match = INTERFACE_NAME_RE.search(line)
+            if match:
+                iface.name = match.group(1)
+        if iface.macaddress is None and 'Address is' in line:
+            match = MACADDRESS_RE.search(line)
+            if match:
+                iface.macaddress = match.group(1)
+        if iface.mtu is None and 'MTU is' in line:
+            match = MTU_RE.search(line)
+            if match:
+                iface.mtu = int(match.group(1))
+        if iface.duplex is None and 'Duplex ' in line:
+            match = DUPLEX_RE.search(line)
+            if match:
+                iface.duplex = match.group(1)
+        if iface.operstatus is None:
+            match = OPERSTATUS_RE.match(line)
+            if match:
+                iface.operstatus = match.group(1)
+        if 'Internet address is' in line:
+            iface.ipv4.extend(IPV4_ADDRESS_RE.findall(line))
+        if 'Subnet mask is' in line:
+            iface.masks.extend(IPV4_MASK_RE.findall(line))
+        if 'IPv6 address is' in line:
+            iface.ipv6.extend(IPV6_ADDRESS_RE.findall(line))
+
+    def close(self):
+        self._flush()
+        return self.interfaces
+
+    def _flush(self):
+        for key, iface in iteritems(self._block):
+            addresses = iface.ipv4
+            iface.ipv4 = []
+            if addresses and len(addresses) == len(iface.masks):
+                for address, mask in zip(addresses, iface.masks):
+                    address = address.replace(',', '')
+                    self.ipv4_addresses.append(address)
+                    iface.ipv4.append((address, prefix_length(mask)))
+            iface.masks = None
+            self.ipv6_addresses.extend(address for address, prefix in iface.ipv6)
+            self.interfaces[key] = iface
+        self._block = {}
+        self._current = None
+
+
+@parser(r'show interfaces?$')
+def parse_interfaces(output):
+    """ show interfaces, the InterfaceRecord.to_dict() of every interface
+    by its key, e.g. 'Ethernet 1'.  IPv4 subnets are prefix lengths.
+    """
+    return dict((key, iface.to_dict())
+                for key, iface in iteritems(InterfacesParser().parse(output)))
+
+
+VSERVER_RE = re.compile(r'^\*?(\S+)\((\w+)\)\s+(\S+)((?:\s+\d+){5})\s*$')
+VPORT_RE = re.compile(r'^\s+port\s+(\d+)\s+(\S+)((?:\s+\d+){5})\s*$')
+SERVICE_GROUP_RE = re.compile(r'^(\S+)\s+(\d+)/(\S+)((?:\s+\d+){5})\s*$')
+CONN_ATTEMPTS_RE = re.compile(r'^Total received conn attempts on this port:\s*(\d+)')
+VSERVER_COUNTERS = ('current_connections', 'total_connections', 'request_packets',
+                    'response_packets', 'peak_connections')
+
+
+def _counters(text):
+    return dict(zip(VSERVER_COUNTERS, [int(value) for value in text.split()]))
+
+
+@parser(r'show slb virtual-server$')
+def parse_virtual_servers(output):
+    """ show slb virtual-server, the virtual servers by name, e.g.
+
+    dict(vip1=dict(name='vip1', address='10.10.10.100', state='A',
+                   current_connections=0, ..., ports=[
+                       dict(port=80, protocol='http', current_connections=0, ...,
+                            conn_attempts=0, service_groups=[
+                                dict(name='sg-web', port=80, protocol='http', ...)])]))
+
+    state is the code of the device: A all up, P partial up, F functional
+    up, D down, DIS disabled or U unknown.
+    """
+    vservers = {}
+    vserver = port = None
+    for line in output.splitlines():
+        match = VSERVER_RE.match(line)
+        if match:
+            name, state, address, counters = match.groups()
+            vserver = dict(name=name, state=state, address=address, ports=[])
+            vserver.update(_counters(counters))
+            vservers[name] = vserver
+            port = None
+            continue
+        if vserver is None:
+            continue
+        match = VPORT_RE.match(line)
+        if match:
+            port = dict(port=int(match.group(1)), protocol=match.group(2),
+                        conn_attempts=None, service_groups=[])
+            port.update(_counters(match.group(3)))
+            vserver['ports'].append(port)
+            continue
+        if port is None:
+            continue
+        match = SERVICE_GROUP_RE.match(line)
+        if match:
+            group = dict(name=match.group(1), port=int(match.group(2)), protocol=match.group(3))
+            group.update(_counters(match.group(4)))
+            port['service_groups'].append(group)
+            continue
+        match = CONN_ATTEMPTS_RE.match(line)
+        if match:
+            port['conn_attempts'] = int(match.group(1))
+    return vservers
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: ©2024 A10 Networks, Inc. All rights reserved.
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+MAX_RECORDED_COMMANDS = 10000
+
+
+def _round(value):
+    return round(value, 6)
+
+
+class PerfRecorder(object):
+    """ Timings of cliconf calls and of the CLI round trips they make
+
+    Every call records its wall time.  Round trips record the command,
+    wall time and size of the response.  Time spent in round trips is the
+    time waiting for the device prompt, including device latency and the
+    buffer read timeout of network_cli, and is added to the prompt_wait of
+    every call in progress, so that the time a call spends on its own,
+    e.g. diffing, is seconds - prompt_wait.
+
+    A recorder left running by a task that failed before collecting it
+    keeps recording for the tasks after it, only the first
+    MAX_RECORDED_COMMANDS round trips are kept, the totals count all.
+    """
+
+    def __init__(self):
+        self.calls = OrderedDict()
+        self.commands = []
+        self.round_trips = 0
+        self.bytes = 0
+        self.prompt_wait = 0.0
+        self._active = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def call(self, name):
+        frame = dict(prompt_wait=0.0, bytes=0, round_trips=0)
+        self._active.append(frame)
+        start = time.time()
+        try:
+            yield
+        finally:
+            elapsed = time.time() - start
+            self._active.pop()
+            stats = self.calls.setdefault(name, dict(calls=0, seconds=0.0, prompt_wait=0.0,
+                                                     bytes=0, round_trips=0))
+            stats['calls'] += 1
+            stats['seconds'] += elapsed
+            for key, value in frame.items():
+                stats[key] += value
+
+    def round_trip(self, command, seconds, size, session=0):
+        with self._lock:
+            self.round_trips += 1
+            self.bytes += size
+            self.prompt_wait += seconds
+            if len(self.commands) < MAX_RECORDED_COMMANDS:
+                self.commands.append(dict(command=command, seconds=_round(seconds),
+                                          bytes=size, session=session))
+            for frame in self._active:
+                frame['prompt_wait'] += seconds
+                frame['bytes'] += size
+                frame['round_trips'] += 1
+
+    def report(self):
+        calls = OrderedDict()
+        for name, stats in self.calls.items():
+            calls[name] = dict(stats, seconds=_round(stats['seconds']),
+                               prompt_wait=_round(stats['prompt_wait']))
+        return dict(calls=calls, commands=self.commands, round_trips=self.round_trips,
+                    bytes=self.bytes, prompt_wait=_round(self.prompt_wait))
+
+
+class TimedConnection(object):
+    """ Connection proxy recording the wall time of every RPC call, which
+    includes the JSON-RPC exchange with the persistent connection.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.calls = OrderedDict()
+
+    def __getattr__(self, name):
+        method = getattr(self.connection, name)
+
+        def timed(*args, **kwargs):
+            start = time.time()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                stats = self.calls.setdefault(name, dict(calls=0, seconds=0.0))
+                stats['calls'] += 1
+                stats['seconds'] += time.time() - start
+
+        return timed
+
+    def report(self):
+        return OrderedDict((name, dict(stats, seconds=_round(stats['seconds'])))
+                           for name, stats in self.calls.items())
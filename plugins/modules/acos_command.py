@@ -18,6 +18,11 @@ short_description: Run commands on remote devices running A10 ACOS
 description:
   - Sends arbitrary commands to an ACOS device and returns the results
     read from the device.
+  - When only C(show) commands are run the module never reports a change.
+    Otherwise C(changed) is reported when the "Configuration last updated"
+    stamp of the running-config of the partition the commands start in
+    differs before and after the commands.  Devices that do not report
+    the stamp are compared by the output of an empty command.
 version_added: '2.9'
 options:
   commands:
@@ -31,8 +36,8 @@ options:
         a dict containing I(command), I(answer) and I(prompt).
         Common answers are 'y' or "\\r" (carriage return, must be
         double quotes). See examples.
+      - Required unless I(operation) is C(poll) or C(collect).
     type: list
-    required: true
   wait_for:
     description:
       - List of conditions to evaluate against the output of the
@@ -56,9 +61,9 @@ options:
   retries:
     description:
       - Specifies the number of retries a command should by tried
-        before it is considered failed. The command is run on the
-        target device every retry and evaluated against the
-        I(wait_for) conditions.
+        before it is considered failed. All commands are run on the
+        first try, later retries only re-run the commands read by the
+        I(wait_for) conditions that are not yet satisfied.
     type: int
     default: 10
   interval:
@@ -69,12 +74,127 @@ options:
         trying the command again.
     type: int
     default: 1
+  backoff:
+    description:
+      - Factor applied to the wait between retries after every retry.
+        The default of 1 waits I(interval) seconds between all retries,
+        a value of 2 doubles the wait every time.
+    type: float
+    default: 1.0
+  max_interval:
+    description:
+      - Upper bound in seconds of the wait between retries when
+        I(backoff) is used.
+    type: int
+  jitter:
+    description:
+      - Randomize every wait between retries to a value between half
+        and all of the computed wait, so that many hosts polling the
+        same device do not retry in lockstep.
+    type: bool
+    default: false
+  timeout:
+    description:
+      - Overall deadline in seconds for the I(wait_for) conditions to
+        be satisfied. Polling stops when the next retry would start
+        after the deadline, even if I(retries) are left.
+    type: int
   partition:
     description:
       - This argument is used to specify the partition name on
         which you want to execute a task to get resulting output.
+      - The session switches partition only when a previous task left it
+        in another partition. Names missing from the partitions of the
+        device fail the task without sending C(active-partition).
     type: str
     default: shared
+  concurrency:
+    description:
+      - Number of CLI sessions used to run read-only C(show) commands in
+        parallel. Additional sessions to the device are opened on first
+        use and kept open with the persistent connection, up to a total
+        of 8. Responses are returned in the order of the commands. When
+        any command is not a C(show) command or answers a prompt, all
+        commands run one after the other on the persistent session.
+      - Additional sessions require C(ansible_network_cli_ssh_type=paramiko),
+        with C(libssh) all commands run on the persistent session.
+    type: int
+    default: 1
+  operation:
+    description:
+      - C(run) sends the commands and returns their output.
+      - C(start) opens a CLI session of its own in I(partition), starts
+        sending the commands on it in the background and returns at once
+        with the I(handle) of the operation. Used for commands such as
+        C(upgrade) that keep the device busy for minutes, so that one
+        controller can drive many devices without waiting on each.
+        Requires C(ansible_network_cli_ssh_type=paramiko).
+      - C(poll) returns, without waiting, whether the operation of
+        I(handle) finished, the output of its completed commands and the
+        last lines received for the command still running.
+      - C(collect) returns the output of the finished operation of
+        I(handle), evaluates I(wait_for) against it once and forgets the
+        operation. It fails while the operation is still running or when
+        one of its commands failed.
+      - The operation lives in the persistent connection, so the tasks
+        polling it have to run before I(persistent_connect_timeout)
+        closes an idle connection.
+    type: str
+    default: run
+    choices: ['run', 'start', 'poll', 'collect']
+  handle:
+    description:
+      - Handle returned by I(operation=start), required to C(poll) or
+        C(collect) the operation.
+    type: str
+  operation_timeout:
+    description:
+      - With I(operation=start), the number of seconds the device may go
+        without sending output before the operation fails. By default
+        the operation waits as long as the device keeps its session open.
+    type: int
+  output_limit:
+    description:
+      - Maximum number of bytes of the output of every command returned
+        in I(stdout), the rest is dropped. I(outputs) tells the size of
+        the output and whether it was truncated. I(wait_for) conditions
+        are evaluated against the kept output.
+      - C(show) commands are then read over an additional CLI session
+        that keeps no more than I(output_limit) bytes of their output in
+        memory while it is received.
+    type: int
+  output_keep:
+    description:
+      - Part of the output kept when it is longer than I(output_limit),
+        its first or its last bytes.
+    type: str
+    default: head
+    choices: ['head', 'tail']
+  output_dir:
+    description:
+      - Directory on the controller the whole output of every command is
+        written to, one file per command named after the host, the index
+        and the command. The files are written while the output is
+        received, also when I(output_limit) truncates the output returned.
+    type: path
+  parse:
+    description:
+      - Return I(parsed) with the output of every command turned into
+        structured data by the parser registered for the command. Parsers
+        exist for C(show version), C(show interfaces),
+        C(show slb virtual-server) and C(show partition), other commands
+        and outputs truncated by I(output_limit) get no parsed data.
+    type: bool
+    default: false
+  split_lines:
+    description:
+      - Return I(stdout_lines) with the output of every command split
+        into lines. Set to C(false) for commands with large output, whose
+        lines would otherwise double the size of the result.
+    type: bool
+    default: true
+extends_documentation_fragment:
+  - a10.acos_cli.acos.perf
 notes:
   - Tested against ACOS 4.1.1-P9
 '''
@@ -120,11 +240,75 @@ EXAMPLES = r'''
         wait_for: result[0] contains ACOS
         retries: 10
 
+    - name: Wait for a server to come up, backing off up to 30 seconds
+      a10.acos_cli.acos_command:
+        commands:
+          - show version
+          - show slb server s1
+        wait_for: result[1] contains Up
+        interval: 2
+        backoff: 2
+        max_interval: 30
+        jitter: true
+        timeout: 300
+
     - name: Run commands from lines on my_partition
       a10.acos_cli.acos_command:
         partition: my_partition
         commands: show running-config
 
+    - name: Run show commands over three CLI sessions
+      a10.acos_cli.acos_command:
+        commands:
+          - show version
+          - show hardware
+          - show interfaces
+          - show slb virtual-server
+        concurrency: 3
+
+    - name: Start an upgrade without waiting for the image transfer
+      a10.acos_cli.acos_command:
+        operation: start
+        commands:
+          - command: upgrade hd pri use-mgmt-port scp://user@192.0.2.10:/images/ACOS.upg
+            check_all: true
+            prompt:
+              - "Password \\[\\]\\?"
+              - "Do you want to reboot the system after the upgrade\\?\\[yes\\/no\\]:"
+            answer:
+              - "{{ scp_password }}"
+              - "no"
+      register: upgrade
+
+    - name: Wait for the upgrade to finish
+      a10.acos_cli.acos_command:
+        operation: poll
+        handle: "{{ upgrade.handle }}"
+      register: upgrade_status
+      until: upgrade_status.finished
+      retries: 120
+      delay: 15
+
+    - name: Check the result of the upgrade
+      a10.acos_cli.acos_command:
+        operation: collect
+        handle: "{{ upgrade.handle }}"
+        wait_for: result[0] contains successful
+
+    - name: Read the state of the virtual servers as data
+      a10.acos_cli.acos_command:
+        commands: show slb virtual-server
+        parse: true
+      register: vservers
+
+    - name: Keep the last 64KiB of the log, and all of it on the controller
+      a10.acos_cli.acos_command:
+        commands: show log
+        output_limit: 65536
+        output_keep: tail
+        output_dir: /var/tmp/acos-logs
+        split_lines: false
+
     - name: Run multiple sequential commands on ACOS device
       a10.acos_cli.acos_command:
         commands:
@@ -142,24 +326,87 @@ stdout:
   sample: ['...', '...']
 stdout_lines:
   description: The value of stdout split into a list
-  returned: always apart from low level errors (such as action plugin)
+  returned: when split_lines is set, apart from low level errors (such as action plugin)
   type: list
   sample: [['...', '...'], ['...'], ['...']]
+parsed:
+  description: The output of every command as data, null for commands
+               without parser
+  returned: when parse is set
+  type: list
+  sample: [{'version': '4.1.1-P9', 'build': '105', 'memory_total_mb': 8071,
+            'memory_free_mb': 3894, 'serial_number': 'N/A'}]
+outputs:
+  description: Size in bytes of the whole output of every command, whether
+               stdout holds only part of it and the file it was written to
+  returned: when output_limit or output_dir is set
+  type: list
+  sample: [{'bytes': 48211873, 'truncated': true,
+            'path': '/var/tmp/acos-logs/vthunder_0_show_log.txt'}]
+attempts:
+  description: Commands run, time taken in seconds and number of pending
+               conditions for every attempt of the I(wait_for) poll
+  returned: when wait_for is used
+  type: list
+  sample: [{'attempt': 1, 'commands': [0, 1], 'elapsed': 0.412, 'pending': 1}]
+handle:
+  description: Handle of the operation, to poll or collect it
+  returned: when operation is start, poll or collect
+  type: str
+  sample: 3f2a9c41d0b7
+finished:
+  description: Whether all commands of the operation returned or one failed
+  returned: when operation is poll or collect
+  type: bool
+  sample: false
+elapsed:
+  description: Seconds the operation has been running, or ran
+  returned: when operation is poll or collect
+  type: float
+  sample: 184.209
+progress:
+  description: Last lines received for the command the operation is running
+  returned: when operation is poll
+  type: list
+  sample: ['Getting upgrade package ...', '.............']
 failed_conditions:
   description: The list of conditionals that have failed
   returned: failed
   type: list
   sample: ['...', '...']
+perf:
+  description: Timings of the task. C(rpc) holds the count and wall time
+               of the RPC calls of the module, C(calls) those of the
+               cliconf plugin with the time waiting for the device prompt,
+               C(slowest) the slowest round trips to the device
+  returned: when perf or perf_trace is set
+  type: dict
+  sample: {'seconds': 0.52, 'round_trips': 3, 'bytes': 4211, 'prompt_wait': 0.41,
+           'rpc': {'run_commands': {'calls': 1, 'seconds': 0.44}},
+           'calls': {'run_commands': {'calls': 1, 'seconds': 0.42, 'prompt_wait': 0.41,
+                                      'bytes': 4211, 'round_trips': 3}},
+           'slowest': [{'command': 'show version', 'seconds': 0.15, 'bytes': 1812,
+                        'session': 0}],
+           'config_cache': {'hits': 0, 'misses': 0, 'invalidations': 0,
+                            'entries': 0, 'bytes': 0}}
 '''
 
 __metaclass__ = type
 
+import errno
+import os
+import random
+import re
 import time
 
 from ansible.module_utils._text import to_text
 from ansible.module_utils.basic import AnsibleModule
-from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.acos import \
-    run_commands
+from ansible.module_utils.connection import ConnectionError
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.acos import (
+    collect_perf, get_active_partition, get_config_revision, get_connection, get_operation, is_read_only,
+    perf_argument_spec, run_commands, set_active_partition, start_operation, start_perf)
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.output import output_filename
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.parsers import parse_output
 from ansible_collections.ansible.netcommon.plugins.module_utils.network.common.parsing import \
     Conditional
 from ansible_collections.ansible.netcommon.plugins.module_utils.network.common.utils import (
@@ -190,24 +437,222 @@ def configuration_to_list(configuration):
     return sanitized_config_list
 
 
+def config_changed(module, partition, before_revision, before_config):
+    """ Whether the commands changed the configuration of partition, the
+    partition active when before_revision was read.  When the device did
+    not report a revision the outputs of an empty command, before_config
+    and the one sent now, are compared instead.
+    """
+    if get_active_partition(module) != partition:
+        # the commands switched partitions, stamps of different
+        # partitions cannot be compared
+        set_active_partition(module, partition)
+
+    if before_revision is None:
+        after_config = configuration_to_list(run_commands(module, ''))
+        return len(set(after_config) - set(before_config)) != 0
+    return get_config_revision(module) != before_revision
+
+
+def output_capture(module, commands):
+    """ Capture arguments of run_commands for every command, or None
+    without the output_limit and output_dir options.
+    """
+    limit = module.params['output_limit']
+    directory = module.params['output_dir']
+    if limit is None and not directory:
+        return None
+
+    host = None
+    if directory:
+        try:
+            os.makedirs(directory)
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                module.fail_json(msg='Unable to create %s: %s' % (directory, to_text(exc)))
+        try:
+            host = get_connection(module).get_option('host')
+        except ConnectionError:
+            pass
+    return [dict(limit=limit, keep=module.params['output_keep'],
+                 path=output_filename(directory, host or 'acos', index, item['command'])
+                 if directory else None)
+            for index, item in enumerate(commands)]
+
+
+def parse_responses(commands, responses, outputs, warnings):
+    """ parse_output() of every response, None for truncated outputs """
+    parsed = []
+    for index, (command, response) in enumerate(zip(commands, responses)):
+        if outputs and outputs[index] and outputs[index].get('truncated'):
+            warnings.append('Output of %s is truncated, not parsing it' % command)
+            parsed.append(None)
+        else:
+            parsed.append(parse_output(command, response))
+    return parsed
+
+
+RESULT_INDEX_RE = re.compile(r'^result\[(\d+)\]')
+
+
+def command_indexes(conditional, count):
+    """ Indexes of the commands whose output the conditional reads """
+    match = RESULT_INDEX_RE.match(conditional.key)
+    if match and int(match.group(1)) < count:
+        return set([int(match.group(1))])
+    return set(range(count))
+
+
+def wait_for_conditionals(module, commands, conditionals, capture=None):
+    """ Runs the commands until the conditionals are satisfied
+
+    Every command runs on the first attempt.  Later attempts only re-run
+    the commands read by the conditionals that are still pending, the wait
+    between attempts grows by I(backoff) up to I(max_interval) and polling
+    stops at the I(timeout) deadline.  Returns the responses, the pending
+    conditionals and the timing of every attempt.
+    """
+    retries = module.params['retries']
+    match = module.params['match']
+    backoff = module.params['backoff']
+    max_interval = module.params['max_interval']
+    delay = float(module.params['interval'])
+    deadline = None
+    if module.params['timeout']:
+        deadline = time.time() + module.params['timeout']
+
+    responses = [None] * len(commands)
+    outputs = [None] * len(commands)
+    indexes = set(range(len(commands)))
+    attempts = list()
+
+    while retries > 0:
+        started = time.time()
+        selected = sorted(indexes)
+        kwargs = dict(concurrency=module.params['concurrency'])
+        if capture is not None:
+            kwargs['capture'] = [capture[i] for i in selected]
+        output = run_commands(module, [commands[i] for i in selected], **kwargs)
+        for index, out in zip(selected, output):
+            if capture is not None:
+                out = dict(out)
+                outputs[index] = out
+                out = out.pop('stdout')
+            responses[index] = out
+
+        for item in list(conditionals):
+            if item(responses):
+                if match == 'any':
+                    conditionals = list()
+                    break
+                conditionals.remove(item)
+
+        attempts.append({
+            'attempt': len(attempts) + 1,
+            'commands': selected,
+            'elapsed': round(time.time() - started, 3),
+            'pending': len(conditionals),
+        })
+
+        retries -= 1
+        if not conditionals or not retries:
+            break
+
+        wait = delay
+        if module.params['jitter']:
+            wait = random.uniform(delay / 2, delay)
+        if deadline is not None and time.time() + wait >= deadline:
+            break
+        time.sleep(wait)
+
+        delay *= backoff
+        if max_interval:
+            delay = min(delay, max_interval)
+        indexes = set()
+        for item in conditionals:
+            indexes.update(command_indexes(item, len(commands)))
+
+    return responses, conditionals, attempts, outputs
+
+
+def check_operation(module, conditionals, result):
+    """ Polls or collects the operation of the handle option into result,
+    failing the module when a collected operation did not succeed.
+    """
+    collect = module.params['operation'] == 'collect'
+    handle = module.params['handle']
+    status = get_operation(module, handle, collect=collect)
+    result.update(handle=handle, finished=status['finished'], elapsed=status['elapsed'],
+                  stdout=status['responses'])
+    if module.params['split_lines']:
+        result['stdout_lines'] = list(to_lines(status['responses']))
+    if module.params['parse']:
+        result['parsed'] = parse_responses(status['commands'], status['responses'], None,
+                                           result['warnings'])
+    if not collect:
+        result['progress'] = status['progress']
+        return
+
+    if not status['finished']:
+        module.fail_json(msg='Operation %s is still running' % handle,
+                         progress=status['progress'], **result)
+    result['changed'] = not all(is_read_only(command) for command in status['commands'])
+    if status['error']:
+        module.fail_json(msg=status['error'], **result)
+
+    pending = [item.raw for item in conditionals if not item(status['responses'])]
+    if pending and (module.params['match'] == 'all' or len(pending) == len(conditionals)):
+        module.fail_json(msg='One or more conditional statements have not been satisfied',
+                         failed_conditions=pending, **result)
+
+
+def exit_module(module, result):
+    perf = collect_perf(module)
+    if perf:
+        result['perf'] = perf
+
+    module.exit_json(**result)
+
+
 def main():
     """main entry point for module execution
     """
     argument_spec = dict(
-        commands=dict(type='list', required=True),
+        commands=dict(type='list'),
         wait_for=dict(type='list', aliases=['waitfor']),
         match=dict(default='all', choices=['all', 'any']),
         retries=dict(default=10, type='int'),
         interval=dict(default=1, type='int'),
-        partition=dict(default='shared')
+        backoff=dict(default=1.0, type='float'),
+        max_interval=dict(type='int'),
+        jitter=dict(default=False, type='bool'),
+        timeout=dict(type='int'),
+        partition=dict(default='shared'),
+        concurrency=dict(default=1, type='int'),
+        operation=dict(default='run', choices=['run', 'start', 'poll', 'collect']),
+        handle=dict(),
+        operation_timeout=dict(type='int'),
+        output_limit=dict(type='int'),
+        output_keep=dict(default='head', choices=['head', 'tail']),
+        output_dir=dict(type='path'),
+        parse=dict(default=False, type='bool'),
+        split_lines=dict(default=True, type='bool')
     )
+    argument_spec.update(perf_argument_spec)
+
+    required_if = [('operation', 'run', ['commands']),
+                   ('operation', 'start', ['commands']),
+                   ('operation', 'poll', ['handle']),
+                   ('operation', 'collect', ['handle'])]
 
     module = AnsibleModule(argument_spec=argument_spec,
+                           required_if=required_if,
                            supports_check_mode=True)
+    start_perf(module)
 
     warnings = list()
     result = {'changed': False, 'warnings': warnings}
-    commands = parse_commands(module, warnings)
+    operation = module.params['operation']
     wait_for = module.params['wait_for'] or list()
 
     try:
@@ -215,52 +660,57 @@ def main():
     except AttributeError as exc:
         module.fail_json(msg=to_text(exc))
 
-    retries = module.params['retries']
-    interval = module.params['interval']
-    match = module.params['match']
-
-    if module.params['partition'].lower() != 'shared':
-        partition_name = module.params['partition']
-        out = run_commands(module, 'active-partition %s' % (partition_name))
-        if "does not exist" in str(out[0]):
-            module.fail_json(msg="Provided partition does not exist")
+    if operation in ('poll', 'collect'):
+        check_operation(module, conditionals, result)
+        exit_module(module, result)
 
-    before_config_list = configuration_to_list(run_commands(module,
-                                                            ''))
+    if operation == 'start' and wait_for:
+        module.fail_json(msg='wait_for is evaluated when the operation is collected, '
+                             'not when it is started')
 
-    while retries > 0:
-        responses = run_commands(module, commands)
-        for item in list(conditionals):
-            if item(responses):
-                if match == 'any':
-                    conditionals = list()
-                    break
-                conditionals.remove(item)
-
-        if not conditionals:
-            break
-
-        time.sleep(interval)
-        retries -= 1
-    after_config_list = configuration_to_list(run_commands(module,
-                                                           ''))
-    diff = list(set(after_config_list) - set(before_config_list))
-    if len(diff) != 0:
-        result['changed'] = True
-    else:
-        result['changed'] = False
+    commands = parse_commands(module, warnings)
+    set_active_partition(module)
+
+    if operation == 'start':
+        if not commands:
+            # check mode left no command to start
+            exit_module(module, result)
+        result['handle'] = start_operation(module, commands, timeout=module.params['operation_timeout'])
+        exit_module(module, result)
+
+    read_only = all(is_read_only(item) for item in commands)
+    if not read_only:
+        partition = get_active_partition(module)
+        before_revision = get_config_revision(module)
+        before_config = None
+        if before_revision is None:
+            before_config = configuration_to_list(run_commands(module, ''))
+
+    capture = output_capture(module, commands)
+    responses, conditionals, attempts, outputs = wait_for_conditionals(
+        module, commands, conditionals, capture)
+
+    if not read_only:
+        result['changed'] = config_changed(module, partition, before_revision, before_config)
 
     if conditionals:
         failed_conditions = [item.raw for item in conditionals]
         msg = 'One or more conditional statements have not been satisfied'
-        module.fail_json(msg=msg, failed_conditions=failed_conditions)
-
-    result.update({
-        'stdout': responses,
-        'stdout_lines': list(to_lines(responses)),
-    })
-
-    module.exit_json(**result)
+        module.fail_json(msg=msg, failed_conditions=failed_conditions,
+                         attempts=attempts)
+
+    if wait_for:
+        result['attempts'] = attempts
+
+    result['stdout'] = responses
+    if module.params['split_lines']:
+        result['stdout_lines'] = list(to_lines(responses))
+    if module.params['parse']:
+        result['parsed'] = parse_responses([item['command'] for item in commands], responses,
+                                           outputs, warnings)
+    if capture is not None:
+        result['outputs'] = outputs
+    exit_module(module, result)
 
 
 if __name__ == '__main__':
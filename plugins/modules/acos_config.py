@@ -20,6 +20,9 @@ description:
     for segmenting configuration into sections.  This module provides
     an implementation for working with ACOS configuration sections.
 version_added: '2.9'
+extends_documentation_fragment:
+  - a10.acos_cli.acos.perf
+  - a10.acos_cli.acos.config_cache
 notes:
   - Tested against ACOS 4.1.1-P9
   - Abbreviated commands are NOT idempotent, see
@@ -127,6 +130,10 @@ options:
         startup-config.  If the argument is set to I(changed), then the
         running-config will only be copied to the startup-config if the task
         has made a change.
+      - With I(modified), the startup-config is compared by its checksum,
+        which the persistent connection keeps for the following tasks
+        until C(write memory) runs or the C(Configuration last saved)
+        stamp of the running-config changes.
     type: str
     default: never
     choices: ['always', 'never', 'modified', 'changed']
@@ -155,6 +162,22 @@ options:
             working directory and backup configuration will be copied in
             C(filename) within I(backup) directory.
         type: path
+      stream:
+        description:
+          - Have the module write the backup file, in chunks, instead of
+            returning the configuration to the controller in the task
+            result. Only the path and checksum of the file are returned,
+            which keeps large configurations out of the task result. The
+            file holds the same content as a backup written by the
+            controller.
+        type: bool
+        default: false
+      compress:
+        description:
+          - Write the backup file gzip compressed, with a C(.gz) suffix
+            added to the generated filename. Implies C(stream).
+        type: bool
+        default: false
     type: dict
   diff_against:
     description:
@@ -168,8 +191,74 @@ options:
       - This argument is used to specify the partition name on which you want to
         execute configurations in a task. This option activates the provided
         partition and performs given configurations on it.
+      - The session switches partition only when a previous task left it
+        in another partition. Names missing from the partitions of the
+        device fail the task without sending C(active-partition).
     type: str
     default: shared
+  partitions:
+    description:
+      - Configures several partitions in one task. A mapping of partition
+        name to a dict with the I(lines) or the I(src) of the partition,
+        and optionally I(before) and I(after), which have the meaning of
+        the options of the same name. A list of lines can be given in
+        place of the dict.
+      - The partitions are configured one after the other on the same
+        session. The running-config of every partition is fetched, diffed
+        and pushed, and saved as set by I(save_when). I(match),
+        I(diff_ignore_lines), I(defaults) and I(batch_size) apply to every
+        partition.
+      - The task stops at the first partition that fails, partitions
+        configured before it keep their changes.
+      - Mutually exclusive with I(lines), I(src), I(partition),
+        I(intended_config), I(running_config), I(backup) and
+        I(diff_against).
+    type: dict
+  batch_size:
+    description:
+      - Number of configuration lines written to the device in a single
+        write when pushing changes. The echoed output is split back into
+        one response per line and errors are still reported per line.
+        Lines that answer a prompt are always sent on their own. By
+        default every line waits for the device prompt before the next
+        one is sent.
+      - When a line fails, the lines following it in the same batch have
+        already been sent to the device.
+    type: int
+  scoped_fetch:
+    description:
+      - Fetch only the sections of the running-config holding the
+        top-level objects of I(lines) or I(src), with one
+        C(show running-config | section) per object, instead of the full
+        running-config.
+      - The full running-config is fetched when the candidate has more
+        than 8 top-level objects, removes objects with C(no) or has
+        regular expression characters in a top-level line, when
+        I(match) is not C(line), and with I(running_config), I(backup),
+        I(intended_config), I(diff_against), I(before), I(after) or
+        I(save_when=modified). It is also fetched when the device does
+        not support C(section).
+    type: bool
+    default: true
+  verify:
+    description:
+      - How the module decides that pushed commands changed the device.
+      - With C(touched), only the blocks of the top-level objects the
+        pushed commands belong to are fetched again, with one
+        C(show running-config | section) per object, and compared with
+        the running-config before the change. The full running-config is
+        fetched instead for the same cases as I(scoped_fetch), when
+        I(before) or I(after) are set, or when a touched object is not
+        found after the change.
+      - With C(full), the running-config, or with I(scoped_fetch) the
+        sections of all objects of the candidate, is fetched again and
+        the task is changed when it has lines it did not have before.
+      - With C(responses), nothing is fetched again. The task is changed
+        when commands were pushed without an error, and any output the
+        device printed for a pushed command is returned as a warning.
+    type: str
+    default: touched
+    choices: ['touched', 'full', 'responses']
 '''
 
 EXAMPLES = r'''
@@ -213,6 +302,13 @@ EXAMPLES = r'''
       filename: backup.cfg
       dir_path: /home/user
 
+- name: compressed backup written by the module
+  a10.acos_cli.acos_config:
+    backup: yes
+    backup_options:
+      dir_path: /var/backups/acos
+      compress: yes
+
 - name: run lines with check_mode
   a10.acos_cli.acos_config:
     lines:
@@ -226,6 +322,24 @@ EXAMPLES = r'''
     lines:
       - slb template http test_template1
       - slb server test_server1 10.10.21.44
+
+- name: configure the tenant partitions in one task
+  a10.acos_cli.acos_config:
+    partitions:
+      tenant1:
+        lines:
+          - slb server web1 10.10.1.11
+          - slb server web2 10.10.1.12
+      tenant2:
+        src: tenant2.cfg
+      tenant3:
+        - slb template http tenant3_http
+    save_when: changed
+
+- name: push a large configuration in batches of 100 lines
+  a10.acos_cli.acos_config:
+    src: slb_servers.cfg
+    batch_size: 100
 '''
 
 RETURN = r'''
@@ -239,11 +353,25 @@ commands:
   returned: always
   type: list
   sample: ['hostname foo', 'router ospf 1', 'router-id 192.0.2.1']
+partitions:
+  description: Whether every partition of the partitions option changed
+               and the commands pushed to it. The commands and updates
+               of the task list the commands of all partitions, each
+               preceded by the active-partition command selecting it
+  returned: when partitions is set
+  type: dict
+  sample: {'tenant1': {'changed': true, 'commands': ['slb server web1 10.10.1.11']},
+           'tenant2': {'changed': false, 'commands': []}}
 backup_path:
   description: The full path to the backup file
   returned: when backup is yes
   type: str
   sample: /playbooks/ansible/backup/acos_config.2016-07-16@22:28:34
+backup_checksum:
+  description: The sha1 checksum of the backup file as written
+  returned: when backup is yes and stream or compress is set in backup options
+  type: str
+  sample: 2a3c3d4ba6c67e2cd7e2a4de0ec32f1d4d7b7bfe
 filename:
   description: The name of the backup file
   returned: when backup is yes and filename is not specified in backup options
@@ -264,17 +392,41 @@ time:
   returned: when backup is yes
   type: str
   sample: "22:28:34"
+perf:
+  description: Timings of the task. C(rpc) holds the count and wall time
+               of the RPC calls of the module, C(calls) those of the
+               cliconf plugin with the time waiting for the device prompt,
+               C(slowest) the slowest round trips to the device
+               and C(config_store) the hits of I(config_cache)
+  returned: when perf or perf_trace is set
+  type: dict
+  sample: {'seconds': 0.52, 'round_trips': 3, 'bytes': 4211, 'prompt_wait': 0.41,
+           'rpc': {'run_commands': {'calls': 1, 'seconds': 0.44}},
+           'calls': {'run_commands': {'calls': 1, 'seconds': 0.42, 'prompt_wait': 0.41,
+                                      'bytes': 4211, 'round_trips': 3}},
+           'slowest': [{'command': 'show version', 'seconds': 0.15, 'bytes': 1812,
+                        'session': 0}],
+           'config_cache': {'hits': 0, 'misses': 0, 'invalidations': 0,
+                            'entries': 0, 'bytes': 0}}
 '''
 
 __metaclass__ = type
 
+import os
+import re
+
 from ansible.module_utils._text import to_text
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.connection import ConnectionError
 from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.acos import (
-    get_config, run_commands, get_connection)
+    config_cache_argument_spec, get_config, run_commands, get_connection, load_config,
+    perf_argument_spec, set_active_partition, start_perf, collect_perf)
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.backup import write_backup
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.config import (
+    RunningConfigIndex, config_fingerprint, config_saved_stamp)
 from ansible_collections.ansible.netcommon.plugins.module_utils.network.common.config import (
     NetworkConfig, dumps)
+from ansible_collections.ansible.netcommon.plugins.module_utils.network.common.utils import to_list
 
 
 def get_candidate_config(module):
@@ -322,113 +474,352 @@ def configuration_to_list(configuration):
     return sanitized_config_list
 
 
-def get_running_config(module, current_config=None, flags=None):
+class ConfigSnapshot(object):
+    """ Per-run view of the device running-config
+
+    The pre-change config is fetched from the device once and shared by
+    the change detection, backup, diff and save_when logic.  The
+    post-change config is only fetched again once commands have been
+    pushed to the device, which invalidates the config cache.  With a
+    scope, only the sections of the running-config holding the scoped
+    top-level objects are fetched.  With touched objects, changed only
+    fetches the sections of those.
+    """
+
+    def __init__(self, module, flags=None, scope=None):
+        self.module = module
+        self.flags = flags
+        self.scope = scope
+        self.pushed = False
+        self.touched = None
+        self.verify = 'full'
+        self._before = None
+        self._before_list = None
+        self._with_flags = None
+        self._after = None
+        self._after_list = None
+
+    def _fetch(self, flags=None):
+        if not self.scope:
+            return get_config(self.module, flags=flags)
+
+        sections = []
+        for item in self.scope:
+            section = get_config(self.module, flags=to_list(flags) + ['| section %s' % item])
+            # get_config returns the full config when section is not supported
+            if section and section not in sections:
+                sections.append(section)
+        return '\n'.join(sections)
+
+    @property
+    def before(self):
+        if self._before is None:
+            self._before = self._fetch()
+        return self._before
+
+    @property
+    def before_list(self):
+        if self._before_list is None:
+            self._before_list = configuration_to_list([self.before])
+        return self._before_list
+
+    @property
+    def base(self):
+        """ Config used as the base for diffs and backups """
+        if not self.flags:
+            return self.before
+        if self._with_flags is None:
+            self._with_flags = self._fetch(flags=self.flags)
+        return self._with_flags
+
+    @property
+    def after(self):
+        if not self.pushed:
+            return self.before
+        if self._after is None:
+            self._after = self._fetch()
+        return self._after
+
+    @property
+    def after_list(self):
+        if not self.pushed:
+            return self.before_list
+        if self._after_list is None:
+            self._after_list = configuration_to_list([self.after])
+        return self._after_list
+
+    def mark_pushed(self, verify='full', touched=None):
+        self.pushed = True
+        self.verify = verify
+        self.touched = touched
+        self._after = None
+        self._after_list = None
+
+    def _touched_changed(self):
+        """ Looks for lines added to the blocks of the touched objects by
+        the push, as the full comparison does.  None when an object is
+        missing afterwards, e.g. because the device rewrote its top-level
+        line, and has to be verified in full.
+        """
+        after = RunningConfigIndex('\n'.join(
+            get_config(self.module, flags=['| section %s' % key]) for key in self.touched))
+        if any(key not in after.blocks for key in self.touched):
+            return None
+        before = RunningConfigIndex(self.before).subset(self.touched, header=False)
+        after = after.subset(self.touched, header=False)
+        return len(set(configuration_to_list([after])) - set(configuration_to_list([before]))) != 0
+
+    @property
+    def changed(self):
+        if self.pushed and self.verify == 'responses':
+            return True
+        if self.pushed and self.verify == 'touched' and self.touched:
+            changed = self._touched_changed()
+            if changed is not None:
+                return changed
+        return len(set(self.after_list) - set(self.before_list)) != 0
+
+
+def get_running_config(module, snapshot):
     running = module.params['running_config']
     if not running:
-        if not module.params['defaults'] and current_config:
-            running = current_config
-        else:
-            running = get_config(module, flags=flags)
+        running = snapshot.base
 
     return running
 
 
-def main():
-    """ main entry point for module execution
-    """
-    backup_spec = dict(
-        filename=dict(),
-        dir_path=dict(type='path')
-    )
-    argument_spec = dict(
-        src=dict(type='path'),
-        lines=dict(aliases=['commands'], type='list'),
-        intended_config=dict(aliases=['commands'], type='list'),
-        before=dict(type='list'),
-        after=dict(type='list'),
-        defaults=dict(type='bool', default=False),
-        backup=dict(type='bool', default=False),
-        backup_options=dict(type='dict', options=backup_spec),
-        save_when=dict(choices=['always', 'never', 'modified', 'changed'],
-                       default='never'),
-        diff_against=dict(choices=['startup']),
-        diff_ignore_lines=dict(type='list'),
-        match=dict(default='line', choices=['line', 'strict', 'exact', 'none']),
-        running_config=dict(aliases=['config']),
-        partition=dict(default='shared')
+SCOPED_FETCH_MAX_OBJECTS = 8
+SCOPED_OBJECT_RE = re.compile(r'^[\w .:/@-]+$')
 
-    )
 
-    mutually_exclusive = [("lines", "src")]
+def get_config_scope(module, candidate, before=None, after=None):
+    """ Returns the top-level lines of the candidate when the running-config
+    can be fetched for those objects only, None when it has to be fetched
+    in full.
+    """
+    params = module.params
+    if not params['scoped_fetch'] or params['match'] != 'line' or \
+            params['running_config'] or params['backup'] or params['intended_config'] or \
+            params['diff_against'] or params['save_when'] == 'modified' or before or after:
+        return None
+
+    scope = []
+    for item in NetworkConfig(indent=1, contents=candidate).items:
+        if item.parents:
+            continue
+        text = item.text.strip()
+        # removals and regex characters need the full config to be detected
+        if text.startswith('no ') or not SCOPED_OBJECT_RE.match(text):
+            return None
+        if text not in scope:
+            scope.append(text)
+
+    if not scope or len(scope) > SCOPED_FETCH_MAX_OBJECTS:
+        return None
+    return scope
+
+
+def get_touched_objects(module, candidate, commands, before=None, after=None):
+    """ Returns the top-level lines of the candidate objects the pushed
+    commands belong to, None when the change has to be verified against
+    the full running-config.
+    """
+    params = module.params
+    if params['verify'] != 'touched' or params['save_when'] == 'modified' or \
+            params['diff_against'] or before or after:
+        return None
+
+    commands = set(commands)
+    touched = []
+    for item in NetworkConfig(indent=1, contents=candidate).items:
+        if item.text not in commands:
+            continue
+        text = item.parents[0] if item.parents else item.text
+        if text.startswith('no ') or not SCOPED_OBJECT_RE.match(text):
+            return None
+        if text not in touched:
+            touched.append(text)
+
+    if not touched or len(touched) > SCOPED_FETCH_MAX_OBJECTS:
+        return None
+    return touched
+
+
+def push_candidate(module, connection, snapshot, candidate, before=None, after=None):
+    """ Diffs the candidate against the running config and pushes the
+    commands missing from it, unless in check mode.  Returns the commands,
+    an empty list when there is nothing to push.
+    """
+    running = get_running_config(module, snapshot)
+
+    try:
+        response = connection.get_diff(
+            candidate=candidate, running=running, diff_match=module.params['match'],
+            diff_ignore_lines=module.params['diff_ignore_lines'])
+    except ConnectionError as exc:
+        module.fail_json(msg=to_text(exc, errors='surrogate_then_replace'))
+
+    config_diff = response['config_diff']
+    if not config_diff:
+        return []
+
+    commands = config_diff.splitlines()
+    if before:
+        commands[:0] = before
+    if after:
+        commands.extend(after)
+
+    # send the configuration commands to the device and merge
+    # them with the current running config
+    if not module.check_mode and commands:
+        responses = load_config(module, commands, batch_size=module.params['batch_size'])
+        verify = module.params['verify']
+        if verify == 'responses':
+            # errors fail load_config, any other output may be a rejection
+            for command, response in zip(commands, responses or []):
+                if to_text(response).strip():
+                    module.warn('%s: %s' % (command, to_text(response).strip()))
+        snapshot.mark_pushed(verify, get_touched_objects(module, candidate, commands, before, after))
+    return commands
+
+
+def handle_save_when(module, snapshot, changed):
+    """ Copies the running-config of the active partition to its
+    startup-config as requested by save_when.
+    """
+    save_when = module.params['save_when']
+    diff_ignore_lines = module.params['diff_ignore_lines']
 
-    module = AnsibleModule(argument_spec=argument_spec,
-                           mutually_exclusive=mutually_exclusive,
-                           supports_check_mode=True)
+    if save_when == 'always':
+        save_config(module)
+    elif save_when == 'modified':
+        # the startup-config is fingerprinted, and kept, by the cliconf plugin
+        running = snapshot.after
+        try:
+            startup = get_connection(module).get_startup_fingerprint(
+                ignore_lines=diff_ignore_lines, saved=config_saved_stamp(running))
+        except ConnectionError as exc:
+            module.fail_json(msg=to_text(exc, errors='surrogate_then_replace'))
+        if config_fingerprint(running, diff_ignore_lines) != startup:
+            save_config(module)
+    elif save_when == 'changed' and changed:
+        save_config(module)
 
-    connection = get_connection(module)
 
-    result = {'changed': False}
+PARTITION_KEYS = ('lines', 'src', 'before', 'after')
 
-    warnings = list()
 
+def get_partition_specs(module):
+    """ Validates the partitions option, returns (name, spec) pairs """
     if module.params['partition'].lower() != 'shared':
-        partition_name = module.params['partition']
-        out = run_commands(module, 'active-partition %s' % (partition_name))
-        if "does not exist" in str(out[0]):
-            module.fail_json(msg="Provided partition does not exist")
-
-    diff_ignore_lines = module.params['diff_ignore_lines']
-    match = module.params['match']
-    contents = None
+        module.fail_json(msg='partition and partitions are mutually exclusive')
+    if module.params['backup']:
+        module.fail_json(msg='backup is not supported with partitions')
+
+    specs = []
+    for name, spec in module.params['partitions'].items():
+        if isinstance(spec, list):
+            spec = dict(lines=spec)
+        if not isinstance(spec, dict):
+            module.fail_json(msg='partitions.%s must be a dict with lines or src' % name)
+        unsupported = sorted(set(spec) - set(PARTITION_KEYS))
+        if unsupported:
+            module.fail_json(msg='Unsupported parameters for partitions.%s: %s' % (
+                name, ', '.join(unsupported)))
+        if bool(spec.get('lines')) == bool(spec.get('src')):
+            module.fail_json(msg='partitions.%s requires one of lines or src' % name)
+        specs.append((to_text(name), spec))
+    return specs
+
+
+def configure_partitions(module, connection, result):
+    """ Fetches, diffs, pushes and saves the config of every partition of
+    the partitions option, one after the other on the same session.
+    """
     flags = 'with-default' if module.params['defaults'] else []
+    partitions = dict()
+    updates = list()
 
-    startup_config_list = configuration_to_list(run_commands(module,
-                                                             'show running-config'))
-
-    if module.params['backup'] or (module._diff and
-                                   module.params['diff_against'] == 'running'):
-        contents = get_config(module, flags=flags)
-        if module.params['backup']:
-            result['__backup__'] = contents
+    for name, spec in get_partition_specs(module):
+        set_active_partition(module, name)
 
-    if len(str(module.params['lines'])) > 0 and len(str(module.params['src'])) > 0:
-        candidate = get_candidate_config(module)
-        running = get_running_config(module, contents, flags=flags)
+        if spec.get('src'):
+            candidate = spec['src']
+        else:
+            candidate_obj = NetworkConfig(indent=1)
+            candidate_obj.add(to_list(spec['lines']))
+            candidate = dumps(candidate_obj, 'raw')
+
+        before = to_list(spec.get('before'))
+        after = to_list(spec.get('after'))
+        snapshot = ConfigSnapshot(module, flags=flags,
+                                  scope=get_config_scope(module, candidate, before, after))
+        commands = push_candidate(module, connection, snapshot, candidate,
+                                  before=before, after=after)
+        changed = snapshot.changed
+        handle_save_when(module, snapshot, changed)
+
+        partitions[name] = dict(changed=changed, commands=commands)
+        if commands:
+            updates.append('active-partition %s' % name)
+            updates.extend(commands)
+
+    result.update(
+        changed=any(item['changed'] for item in partitions.values()),
+        partitions=partitions,
+        commands=updates,
+        updates=updates,
+    )
 
-        try:
-            response = connection.get_diff(
-                candidate=candidate, running=running, diff_match=match, diff_ignore_lines=diff_ignore_lines)
-        except ConnectionError as exc:
-            module.fail_json(msg=to_text(exc, errors='surrogate_then_replace'))
 
-        config_diff = response['config_diff']
+def write_module_backup(module, contents, backup_options):
+    """ Writes the backup to dir_path/filename, which the action plugin
+    resolves the same way as for backups it writes itself.  The cliconf
+    plugin defines no non_config_lines, the contents are only stripped as
+    the action plugin does.
+    """
+    if not (backup_options.get('dir_path') and backup_options.get('filename')):
+        module.fail_json(msg='dir_path and filename of backup_options are required to stream the backup')
+    dest = os.path.join(backup_options['dir_path'], backup_options['filename'])
+    try:
+        checksum, changed = write_backup(dest, contents, compress=backup_options.get('compress'))
+    except (IOError, OSError) as exc:
+        module.fail_json(msg='Could not write to destination file %s: %s' % (dest, to_text(exc)))
+    return {'backup_path': dest, 'backup_checksum': checksum, '__backup_changed__': changed}
 
-        if config_diff:
-            commands = config_diff.splitlines()
 
-            if module.params['before']:
-                commands[:0] = module.params['before']
+def configure_partition(module, connection, result):
+    """ Configures the partition of the partition option """
+    set_active_partition(module)
 
-            if module.params['after']:
-                commands.extend(module.params['after'])
+    diff_ignore_lines = module.params['diff_ignore_lines']
+    match = module.params['match']
+    flags = 'with-default' if module.params['defaults'] else []
+    candidate = get_candidate_config(module)
+    scope = None
+    if candidate:
+        scope = get_config_scope(module, candidate, module.params['before'],
+                                 module.params['after'])
+    snapshot = ConfigSnapshot(module, flags=flags, scope=scope)
+
+    if module.params['backup']:
+        backup_options = module.params['backup_options'] or {}
+        if backup_options.get('stream') or backup_options.get('compress'):
+            result.update(write_module_backup(module, snapshot.base, backup_options))
+        else:
+            result['__backup__'] = snapshot.base
 
+    if len(str(module.params['lines'])) > 0 and len(str(module.params['src'])) > 0:
+        commands = push_candidate(module, connection, snapshot, candidate,
+                                  before=module.params['before'], after=module.params['after'])
+        if commands:
             result['commands'] = commands
             result['updates'] = commands
 
-            # send the configuration commands to the device and merge
-            # them with the current running config
-            if not module.check_mode:
-                if commands:
-                    connection.edit_config(candidate=commands)
-                    result['changed'] = True
-
-    running_config_list = configuration_to_list(run_commands(module,
-                                                             'show running-config'))
-
     # intended_config
     if module.params['intended_config']:
         intended_config_list = get_intended_config(module)
-        running = get_running_config(module, contents, flags=flags)
+        running = get_running_config(module, snapshot)
         found_diff = connection.get_diff(
             candidate=intended_config_list, running=running, diff_match=match, diff_ignore_lines=diff_ignore_lines)
         if len(found_diff) != 0:
@@ -441,35 +832,12 @@ def main():
                 'success': True
             })
 
-    after_config_list = configuration_to_list(run_commands(module,
-                                                           'show running-config'))
-    diff = list(set(after_config_list) - set(startup_config_list))
-    if len(diff) != 0:
-        result['changed'] = True
-    else:
-        result['changed'] = False
-
-    running_config = module.params['running_config']
-    startup_config = None
-
-    if module.params['save_when'] == 'always':
-        save_config(module)
-    elif module.params['save_when'] == 'modified':
-        output = run_commands(module,
-                              ['show running-config', 'show startup-config'])
-        running_config = NetworkConfig(indent=1, contents=output[0],
-                                       ignore_lines=diff_ignore_lines)
-        startup_config = NetworkConfig(indent=1, contents=output[1],
-                                       ignore_lines=diff_ignore_lines)
-        if running_config.sha1 != startup_config.sha1:
-            save_config(module)
-
-    elif module.params['save_when'] == 'changed' and result['changed']:
-        save_config(module)
+    result['changed'] = snapshot.changed
+    handle_save_when(module, snapshot, result['changed'])
 
     if module.params['diff_against'] == 'startup':
-        difference_with_startup_config = connection.get_diff(candidate=startup_config_list,
-                                                             running=running_config_list,
+        difference_with_startup_config = connection.get_diff(candidate=snapshot.before_list,
+                                                             running=snapshot.after_list,
                                                              diff_match=match, diff_ignore_lines=diff_ignore_lines)
         if len(difference_with_startup_config) != 0:
             result.update({
@@ -484,7 +852,66 @@ def main():
                 'startup_diff': None
             })
 
+
+def main():
+    """ main entry point for module execution
+    """
+    backup_spec = dict(
+        filename=dict(),
+        dir_path=dict(type='path'),
+        stream=dict(type='bool', default=False),
+        compress=dict(type='bool', default=False)
+    )
+    argument_spec = dict(
+        src=dict(type='path'),
+        lines=dict(aliases=['commands'], type='list'),
+        intended_config=dict(aliases=['commands'], type='list'),
+        before=dict(type='list'),
+        after=dict(type='list'),
+        defaults=dict(type='bool', default=False),
+        backup=dict(type='bool', default=False),
+        backup_options=dict(type='dict', options=backup_spec),
+        save_when=dict(choices=['always', 'never', 'modified', 'changed'],
+                       default='never'),
+        diff_against=dict(choices=['startup']),
+        diff_ignore_lines=dict(type='list'),
+        match=dict(default='line', choices=['line', 'strict', 'exact', 'none']),
+        running_config=dict(aliases=['config']),
+        partition=dict(default='shared'),
+        partitions=dict(type='dict'),
+        batch_size=dict(type='int'),
+        scoped_fetch=dict(type='bool', default=True),
+        verify=dict(default='touched', choices=['touched', 'full', 'responses'])
+    )
+    argument_spec.update(perf_argument_spec)
+    argument_spec.update(config_cache_argument_spec)
+
+    mutually_exclusive = [("lines", "src"),
+                          ("partitions", "lines"), ("partitions", "src"),
+                          ("partitions", "intended_config"),
+                          ("partitions", "running_config"),
+                          ("partitions", "diff_against")]
+
+    module = AnsibleModule(argument_spec=argument_spec,
+                           mutually_exclusive=mutually_exclusive,
+                           supports_check_mode=True)
+    start_perf(module)
+
+    connection = get_connection(module)
+
+    result = {'changed': False}
+
+    warnings = list()
+
+    if module.params['partitions']:
+        configure_partitions(module, connection, result)
+    else:
+        configure_partition(module, connection, result)
+
     result['warnings'] = warnings
+    perf = collect_perf(module)
+    if perf:
+        result['perf'] = perf
     module.exit_json(**result)
 
 
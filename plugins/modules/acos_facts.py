@@ -39,8 +39,43 @@ options:
     description:
       - This argument is used to specify the partition name from
         which you want to collect respective facts.
+      - The session switches partition only when a previous task left it
+        in another partition. Names missing from the partitions of the
+        device fail the task without sending C(active-partition).
     type: str
     default: shared
+  concurrency:
+    description:
+      - Number of CLI sessions used to run read-only C(show) commands in
+        parallel. Additional sessions to the device are opened on first
+        use and kept open with the persistent connection, up to a total
+        of 8. Responses are returned in the order of the commands. When
+        any command is not a C(show) command or answers a prompt, all
+        commands run one after the other on the persistent session.
+    type: int
+    default: 1
+  lazy_subsets:
+    description:
+      - Gather the expensive subsets, C(config) and C(interfaces), only
+        when they are named in I(gather_subset). C(all) then stands for
+        the C(default) and C(hardware) subsets, so that facts gathered
+        for a whole inventory do not carry the running-config of every
+        device.
+      - Independently of this option, C(default) is gathered with any
+        other subset, and C(gather_subset: ['!all', '!min']) gathers
+        nothing and sends no command.
+    type: bool
+    default: false
+  address_index:
+    description:
+      - Return C(ansible_net_address_index), the addresses of the
+        interfaces by network, e.g. C(10.1.0.0/24), for lookups in later
+        tasks. Only used with the interfaces subset.
+    type: bool
+    default: false
+extends_documentation_fragment:
+  - a10.acos_cli.acos.perf
+  - a10.acos_cli.acos.config_cache
 notes:
   - Tested against ACOS 4.1.1-P9
 '''
@@ -61,6 +96,18 @@ EXAMPLES = r'''
         gather_subset:
           - "!hardware"
 
+    - name: Collect the cheap facts, and the interfaces that are asked for
+      a10.acos_cli.acos_facts:
+        gather_subset:
+          - all
+          - interfaces
+        lazy_subsets: true
+
+    - name: Collect the default facts over three CLI sessions
+      a10.acos_cli.acos_facts:
+        gather_subset: default
+        concurrency: 3
+
     - name: Collect all the facts my_partition
       a10.acos_cli.acos_facts:
         partition: my_partition
@@ -119,24 +166,52 @@ ansible_net_config:
 
 # interfaces
 ansible_net_all_ipv4_addresses:
-  description: All IPv4 addresses configured on the device
+  description: All IPv4 addresses configured on the device, without
+               duplicates and in numeric order
   returned: when interfaces is configured
   type: list
 ansible_net_all_ipv6_addresses:
-  description: All IPv6 addresses configured on the device
+  description: All IPv6 addresses configured on the device, without
+               duplicates, in numeric order and compressed form
   returned: when interfaces is configured
   type: list
+ansible_net_address_index:
+  description: The addresses of the interfaces by network, with the key
+               of the interface holding each address
+  returned: when interfaces is configured and address_index is set
+  type: dict
+  sample: {'10.43.12.0/24': [{'interface': 'Ethernet 1', 'address': '10.43.12.24'}]}
 ansible_net_interfaces:
   description: A hash of all interfaces running on the system
   returned: when interfaces is configured
   type: dict
+perf:
+  description: Timings of the task. C(rpc) holds the count and wall time
+               of the RPC calls of the module, C(calls) those of the
+               cliconf plugin with the time waiting for the device prompt,
+               C(slowest) the slowest round trips to the device,
+               C(config_store) the hits of I(config_cache) and C(subsets)
+               the seconds spent running the commands of all subsets and
+               populating each subset
+  returned: when perf or perf_trace is set
+  type: dict
+  sample: {'seconds': 0.52, 'round_trips': 3, 'bytes': 4211, 'prompt_wait': 0.41,
+           'subsets': {'commands': 0.43, 'default': 0.0002, 'hardware': 0.0001},
+           'rpc': {'run_commands': {'calls': 1, 'seconds': 0.44}},
+           'calls': {'run_commands': {'calls': 1, 'seconds': 0.42, 'prompt_wait': 0.41,
+                                      'bytes': 4211, 'round_trips': 3}},
+           'slowest': [{'command': 'show version', 'seconds': 0.15, 'bytes': 1812,
+                        'session': 0}],
+           'config_cache': {'hits': 0, 'misses': 0, 'invalidations': 0,
+                            'entries': 0, 'bytes': 0}}
 '''
 
 __metaclass__ = type
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.acos import \
-    run_commands
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.acos import (
+    collect_perf, config_cache_argument_spec, perf_argument_spec, set_active_partition,
+    start_perf)
 from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.facts.facts import \
     Facts
 
@@ -146,28 +221,38 @@ class FactsArgs(object):
 
     argument_spec = {
         'gather_subset': dict(default=['all'], type='list'),
-        'partition': dict(default='shared')
+        'partition': dict(default='shared'),
+        'concurrency': dict(default=1, type='int'),
+        'lazy_subsets': dict(default=False, type='bool'),
+        'address_index': dict(default=False, type='bool')
     }
 
 
 def main():
     """ Main entry point for AnsibleModule """
-    argument_spec = FactsArgs.argument_spec
+    argument_spec = dict(FactsArgs.argument_spec)
+    argument_spec.update(perf_argument_spec)
+    argument_spec.update(config_cache_argument_spec)
 
     module = AnsibleModule(argument_spec=argument_spec,
                            supports_check_mode=True)
+    start_perf(module)
 
-    if module.params['partition'].lower() != 'shared':
-        partition = module.params['partition']
-        out = run_commands(module, 'active-partition %s' % (partition))
-        if "does not exist" in str(out[0]):
-            module.fail_json(msg="Provided partition does not exist")
+    facts = Facts(module)
+    if facts.runable_subsets():
+        set_active_partition(module)
 
     warnings = []
-    ansible_facts, additional_warnings = Facts(module).get_facts()
+    ansible_facts, additional_warnings = facts.get_facts()
     warnings.extend(additional_warnings)
 
-    module.exit_json(ansible_facts=ansible_facts, warnings=warnings)
+    result = dict(ansible_facts=ansible_facts, warnings=warnings)
+    perf = collect_perf(module)
+    if perf:
+        perf['subsets'] = facts.timings
+        result['perf'] = perf
+
+    module.exit_json(**result)
 
 
 if __name__ == '__main__':
@@ -13,31 +13,88 @@ from ansible.module_utils._text import to_bytes
 from ansible.plugins.terminal import TerminalBase
 
 
+# (name, pattern, flags, keywords) - every match of a pattern contains one
+# of its lower-cased keywords, which are used to prefilter the response
+TERMINAL_STDERR_PATTERNS = (
+    ('error', br"% ?Error", 0, (b"%error", b"% error")),
+    ('bad_secret', br"% ?Bad secret", 0, (b"bad secret",)),
+    ('bad_passwords', br"[\r\n%] Bad passwords", 0, (b"bad passwords",)),
+    ('invalid_input', br"invalid input", re.I, (b"invalid input",)),
+    ('incomplete_command', br"(?:incomplete|ambiguous) command", re.I, (b" command",)),
+    ('connection_timed_out', br"connection timed out", re.I, (b"connection timed out",)),
+    ('not_found', br"[^\r\n]+ not found", 0, (b" not found",)),
+    ('returned_error_code', br"'[^']' +returned error code: ?\d+", 0, (b"returned error code",)),
+    ('bad_mask', br"Bad mask", re.I, (b"bad mask",)),
+    ('overlaps', br"% ?(\S+) ?overlaps with ?(\S+)", re.I, (b"overlaps with",)),
+    ('error_message', br"[%\S] ?Error: ?[\s]+", re.I, (b"error:",)),
+    ('informational', br"[%\S] ?Informational: ?[\s]+", re.I, (b"informational:",)),
+    ('authorization_failed', br"Command authorization failed", 0, (b"command authorization failed",)),
+    ('duplicate', br"Duplicate ?[\s]+", 0, (b"duplicate",)),
+    ('object_does_not_exist', br"Object specified does not exist ?[\s]+", 0, (b"object specified does not exist",)),
+    ('runtime_field', br"This field cannot be modified at runtime?[\s]+", 0, (b"cannot be modified at runtim",)),
+    ('open_session', br"There exists an open[\s]+", 0, (b"there exists an open",)),
+)
+
+
+class StderrMatcher(object):
+    """ Single-pass matcher for the ACOS terminal error patterns
+
+    Behaves like a compiled regex for netcommon, which calls ``search()``
+    on every response buffer.  The buffer is lower-cased once and searched
+    for the literal keywords of the patterns; the combined regex only runs
+    on the lines holding a keyword hit.  The name of the pattern that
+    fired is available as ``match.lastgroup``.
+    """
+
+    def __init__(self, patterns):
+        regexes = []
+        keywords = set()
+        for name, pattern, flags, alternatives in patterns:
+            keywords.update(alternatives)
+            if flags & re.I:
+                pattern = b'(?i:' + pattern + b')'
+            regexes.append(b'(?P<' + to_bytes(name) + b'>' + pattern + b')')
+        self.regex = re.compile(b'|'.join(regexes))
+        self.pattern = self.regex.pattern
+        # a keyword containing another one never needs its own scan
+        self.keywords = sorted(keyword for keyword in keywords
+                               if not any(other != keyword and other in keyword
+                                          for other in keywords))
+
+    def search(self, data):
+        lowered = data.lower()
+        first = None
+        for keyword in self.keywords:
+            pos = lowered.find(keyword)
+            while pos != -1:
+                # the window keeps the character before the line, needed
+                # by the bad_passwords pattern, and the line ending
+                start = max(data.rfind(b'\n', 0, pos), 0)
+                end = data.find(b'\n', pos + len(keyword))
+                end = len(data) if end == -1 else end + 1
+                match = self.regex.search(data, start, end)
+                if match:
+                    if first is None or match.start() < first.start():
+                        first = match
+                    break
+                pos = lowered.find(keyword, end)
+        return first
+
+
 class TerminalModule(TerminalBase):
 
     terminal_stdout_re = [
         re.compile(br"[\r\n]?[\w\+\-\.:\/\[\]]+(?:\([^\)]+\)){0,3}(?:[>#]) ?$")
     ]
 
-    terminal_stderr_re = [
-        re.compile(br"% ?Error"),
-        re.compile(br"% ?Bad secret"),
-        re.compile(br"[\r\n%] Bad passwords"),
-        re.compile(br"invalid input", re.I),
-        re.compile(br"(?:incomplete|ambiguous) command", re.I),
-        re.compile(br"connection timed out", re.I),
-        re.compile(br"[^\r\n]+ not found"),
-        re.compile(br"'[^']' +returned error code: ?\d+"),
-        re.compile(br"Bad mask", re.I),
-        re.compile(br"% ?(\S+) ?overlaps with ?(\S+)", re.I),
-        re.compile(br"[%\S] ?Error: ?[\s]+", re.I),
-        re.compile(br"[%\S] ?Informational: ?[\s]+", re.I),
-        re.compile(br"Command authorization failed"),
-        re.compile(br"Duplicate ?[\s]+"),
-        re.compile(br"Object specified does not exist ?[\s]+"),
-        re.compile(br"This field cannot be modified at runtime?[\s]+"),
-        re.compile(br"There exists an open[\s]+")
-    ]
+    terminal_stderr_re = [StderrMatcher(TERMINAL_STDERR_PATTERNS)]
+
+    def on_open_shell(self):
+        # network_cli keeps its cliconf plugin across close() and
+        # reset_connection, the state it holds belongs to the old shell
+        reset_session = getattr(getattr(self._connection, 'cliconf', None), 'reset_session', None)
+        if reset_session:
+            reset_session()
 
     def on_become(self, passwd=None):
         if self._get_prompt().endswith(b'#'):
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: ©2024 A10 Networks, Inc. All rights reserved.
+
+"""Config diff cost on large synthetic running-configs.
+
+Compares NetworkConfig.difference() against the full running-config with
+the indexed config_difference() used by Cliconf.get_diff, and checks that
+both produce the same command text for every match mode.  Candidates touch
+a handful of objects, then another hundred slb servers.
+
+    python tests/benchmarks/bench_config_diff.py [lines ...]
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import sys
+import time
+
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.config import (
+    config_difference)
+from ansible_collections.ansible.netcommon.plugins.module_utils.network.common.config import (
+    NetworkConfig, dumps)
+
+
+def running_config(lines):
+    config = ['ip dns primary 10.18.18.71', '!']
+    server = 0
+    while len(config) < lines:
+        config.extend([
+            'slb server s%d 10.%d.%d.%d' % (server, server // 65536 % 256,
+                                            server // 256 % 256, server % 256),
+            '  port 80 tcp',
+            '  port 443 tcp',
+            '!',
+        ])
+        server += 1
+    config.extend(['slb service-group sg1 tcp', '  member s1 80', '!',
+                   'slb virtual-server vs1 10.255.0.1', '  port 80 http',
+                   '    service-group sg1', '!'])
+    return '\n'.join(config)
+
+
+CANDIDATE = '\n'.join([
+    'ip dns primary 10.18.18.71',
+    'slb server s1 10.0.0.1',
+    ' port 80 tcp',
+    ' port 8080 tcp',
+    'slb server new-server 10.250.0.1',
+    ' port 80 tcp',
+    'slb virtual-server vs1 10.255.0.1',
+    ' port 80 http',
+    '  service-group sg2',
+])
+
+
+def candidate_config(touched):
+    lines = CANDIDATE.split('\n')
+    for server in range(touched):
+        lines.extend(['slb server s%d 10.0.%d.%d' % (server * 7, server * 7 // 256 % 256,
+                                                     server * 7 % 256),
+                      ' port 80 tcp', ' port 8443 tcp'])
+    return '\n'.join(lines)
+
+
+def timed(func):
+    start = time.time()
+    result = func()
+    return time.time() - start, result
+
+
+def run(lines, touched):
+    running = running_config(lines)
+    for match in ('line', 'strict', 'exact'):
+        candidate = NetworkConfig(indent=1)
+        candidate.load(candidate_config(touched))
+
+        def before():
+            running_obj = NetworkConfig(indent=1, contents=running)
+            return dumps(candidate.difference(running_obj, match=match), 'commands')
+
+        def after():
+            return dumps(config_difference(candidate, running, match=match), 'commands')
+
+        t_before, expected = timed(before)
+        t_after, result = timed(after)
+        assert result == expected, (match, result, expected)
+        print("%7d lines %4d candidate lines  %-6s  before %9.1f ms  after %9.1f ms  speedup %6.1fx" % (
+            lines, len(candidate.items), match, t_before * 1000, t_after * 1000,
+            t_before / t_after))
+
+
+def main(argv):
+    sizes = [int(arg) for arg in argv] or [10000, 100000]
+    for size in sizes:
+        for touched in (0, 100):
+            run(size, touched)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
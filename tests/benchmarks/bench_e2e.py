@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: ©2024 A10 Networks, Inc. All rights reserved.
+
+"""End-to-end cost of acos_command, acos_facts and acos_config.
+
+Every scenario runs the module's main() against the local CLI simulator,
+through a real network_cli connection with the terminal and cliconf
+plugins of this collection, for each running-config size and simulated
+round trip time.  Reported per scenario: wall time, CLI round trips
+(lines executed by the device), CLI sessions opened, bytes read from the
+device and, with --memory, the peak of traced Python memory.
+
+    python tests/benchmarks/bench_e2e.py [--sizes 1000,10000] [--rtts 0,0.005,0.05]
+        [--buffer-read-timeout 0.1] [--memory] [--json results.json]
+
+--buffer-read-timeout defaults to the network_cli default of 0.1 seconds,
+which network_cli waits after every prompt for late output.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from ansible.plugins.loader import init_plugin_loader
+
+# collections have to be imported through the collection loader for the
+# connection, terminal and cliconf plugin loaders to work
+init_plugin_loader()
+
+from ansible_collections.a10.acos_cli.plugins.modules import (  # noqa: E402
+    acos_command, acos_config, acos_facts)
+from ansible_collections.a10.acos_cli.tests.benchmarks.simulator import (  # noqa: E402
+    AcosDevice, SimulatedConnection, generate_config)
+
+SHOW_COMMANDS = ['show version', 'show hardware', 'show interfaces', 'show slb server']
+CONFIG_CACHE = os.path.join(tempfile.gettempdir(), 'acos-bench-config-cache')
+
+
+def new_servers(prefix, count):
+    return ['slb server %s%d 10.250.%d.%d' % (prefix, server, server // 256, server % 256)
+            for server in range(count)]
+
+
+SCENARIOS = [
+    ('command_show', acos_command, dict(commands=SHOW_COMMANDS),
+     lambda result: not result['changed']),
+    ('command_show_parallel', acos_command, dict(commands=SHOW_COMMANDS, concurrency=4),
+     lambda result: not result['changed']),
+    ('command_config', acos_command, dict(commands=['show running-config']),
+     lambda result: not result['changed']),
+    ('command_config_capped', acos_command, dict(commands=['show running-config'], output_limit=4096,
+                                                 split_lines=False),
+     lambda result: result['outputs'][0]['truncated']),
+    ('facts_all', acos_facts, dict(gather_subset='all'),
+     lambda result: 'ansible_net_config' in result['ansible_facts']),
+    ('facts_all_lazy', acos_facts, dict(gather_subset='all', lazy_subsets=True),
+     lambda result: 'ansible_net_config' not in result['ansible_facts']),
+    ('facts_config_store', acos_facts, dict(gather_subset='config', config_cache=CONFIG_CACHE),
+     lambda result: 'ansible_net_config' in result['ansible_facts']),
+    ('facts_config_stored', acos_facts, dict(gather_subset='config', config_cache=CONFIG_CACHE),
+     lambda result: 'ansible_net_config' in result['ansible_facts']),
+    ('config_push', acos_config, dict(lines=new_servers('a', 50)),
+     lambda result: result['changed']),
+    ('config_push_batched', acos_config, dict(lines=new_servers('b', 50), batch_size=25),
+     lambda result: result['changed']),
+    ('config_push_responses', acos_config, dict(lines=new_servers('c', 50), verify='responses'),
+     lambda result: result['changed']),
+    ('config_idempotent', acos_config, dict(lines=new_servers('a', 50)),
+     lambda result: not result['changed']),
+    ('config_targeted_full', acos_config, dict(lines=['slb server t1 10.251.0.1'], scoped_fetch=False),
+     lambda result: result['changed']),
+    ('config_targeted', acos_config, dict(lines=['slb server t2 10.251.0.2']),
+     lambda result: result['changed']),
+    ('config_targeted_idempotent', acos_config, dict(lines=['slb server t2 10.251.0.2']),
+     lambda result: not result['changed']),
+    ('config_save_modified', acos_config, dict(lines=['ip dns secondary 10.0.0.2'],
+                                               save_when='modified'),
+     lambda result: result['changed']),
+    ('config_save_unmodified', acos_config, dict(lines=['ip dns secondary 10.0.0.2'],
+                                                 save_when='modified'),
+     lambda result: not result['changed']),
+    ('config_save_unmodified_kept', acos_config, dict(lines=['ip dns secondary 10.0.0.2'],
+                                                      save_when='modified'),
+     lambda result: not result['changed']),
+]
+
+
+def run_scenario(sim, module, args, memory):
+    stats = sim.device.stats.copy()
+    if memory:
+        tracemalloc.start()
+    start = time.time()
+    try:
+        result = sim.run_module(module, args)
+    finally:
+        elapsed = time.time() - start
+        peak = tracemalloc.get_traced_memory()[1] if memory else None
+        if memory:
+            tracemalloc.stop()
+    delta = sim.device.stats - stats
+    return result, dict(seconds=round(elapsed, 4), round_trips=delta['commands'],
+                        sessions=delta['sessions'], bytes=delta['bytes_out'],
+                        peak_memory=peak)
+
+
+def run(size, rtt, options):
+    results = []
+    shutil.rmtree(CONFIG_CACHE, ignore_errors=True)
+    device = AcosDevice(config=generate_config(size), rtt=rtt)
+    with SimulatedConnection(device, buffer_read_timeout=options.buffer_read_timeout) as sim:
+        # log in and elevate once, like the first task of a play
+        sim.run_module(acos_command, dict(commands=['show version']))
+        for name, module, args, check in SCENARIOS:
+            result, measured = run_scenario(sim, module, args, options.memory)
+            if result.get('failed') or not check(result):
+                raise AssertionError('%s failed: %s' % (name, result))
+            measured.update(scenario=name, config_lines=size, rtt=rtt)
+            results.append(measured)
+            print("%-26s %7d lines  rtt %5.3fs  %8.3fs  %5d round trips  %2d sessions  %9d bytes%s" % (
+                name, size, rtt, measured['seconds'], measured['round_trips'],
+                measured['sessions'], measured['bytes'],
+                '  peak %6.1f MB' % (measured['peak_memory'] / 1048576.0) if options.memory else ''))
+    return results
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', default='1000,10000')
+    parser.add_argument('--rtts', default='0,0.005,0.05')
+    parser.add_argument('--buffer-read-timeout', type=float, default=0.1)
+    parser.add_argument('--memory', action='store_true')
+    parser.add_argument('--json')
+    options = parser.parse_args(argv)
+
+    results = []
+    for size in [int(size) for size in options.sizes.split(',')]:
+        for rtt in [float(rtt) for rtt in options.rtts.split(',')]:
+            results.extend(run(size, rtt, options))
+
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: ©2024 A10 Networks, Inc. All rights reserved.
+
+"""Interfaces facts parsing cost on large generated ``show interfaces`` output.
+
+Compares the previous block/regex based parsing of the Interfaces facts
+with InterfacesParser, and checks that both build the same interfaces,
+IPv4 and IPv6 facts.  Also reports the cost of sorting and deduplicating
+the addresses and of building the address index.  Output is generated for ethernet ports, VEs and
+trunks in the layout of tests/.../fixtures/acos_facts_show_interfaces.
+
+    python tests/benchmarks/bench_facts_interfaces.py [interfaces ...]
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import re
+import socket
+import sys
+import time
+
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.facts.base import (
+    address_index, sorted_addresses)
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.parsers import InterfacesParser
+
+
+ETHERNET = '''  Ethernet {n} is up, line protocol is up
+  Hardware is 10Gig, Address is fa16.3e{n:02x}.90d5
+  Internet address is 10.{hi}.{lo}.1, Subnet mask is 255.255.255.0
+  Internet address is 10.{hi}.{lo}.2, Subnet mask is 255.255.255.128
+  IPv6 address is 2001:db8::{n:x} Prefix 64 Type: unicast
+  IPv6 link-local address is fe80::f816:3eff:fe19:{n:x} Prefix 64 Type: link-local
+  Configured Speed auto, Actual 10Gbit, Configured Duplex auto, Actual fdx
+  Member of L2 Vlan 1, Port is Untagged
+  Flow Control is disabled, IP MTU is 1500 bytes
+  Port as Mirror disabled, Monitoring this Port disabled
+  Interface name is port{n}
+  470841 packets input,  19776422 bytes
+  Received 470829 broadcasts,  Received 12 multicasts,  Received 0 unicasts
+  0 input errors,  0 CRC  0 frame
+  0 runts  0 giants
+  0 packets output  0 bytes
+  Transmitted 0 broadcasts  0 multicasts  0 unicasts
+  0 output errors  0 collisions
+  300 second input rate: 40 bits/sec, 0 packets/sec, 0% utilization
+  300 second output rate: 0 bits/sec, 0 packets/sec, 0% utilization
+'''
+
+VE = '''VirtualEthernet {n} is up, line protocol is up
+  Hardware is VirtualEthernet, Address is fa16.3e{n:02x}.10c2
+  Internet address is 172.{hi}.{lo}.1, Subnet mask is 255.255.0.0
+  IP MTU is 1500 bytes
+  0 packets input  0 bytes
+  0 packets output  0 bytes
+'''
+
+TRUNK = '''Trunk {n} is up, line protocol is up
+  Hardware is TrunkGroup, Address is fa16.3e{n:02x}.10c2
+  IP MTU is 9000 bytes
+'''
+
+
+def show_interfaces(count):
+    blocks = []
+    for n in range(1, count + 1):
+        template = (ETHERNET, ETHERNET, VE, TRUNK)[n % 4]
+        blocks.append(template.format(n=n, hi=n // 256 % 256, lo=n % 256))
+    return '\n'.join(blocks)
+
+
+def legacy(output):
+    """ Interfaces.populate before InterfacesParser """
+    ipv4_addr_list = []
+    ipv6_addr_list = []
+
+    def parse_interface_key(data):
+        parsed = dict()
+        key = ''
+        for line in data.split('\n'):
+            if len(line) == 0:
+                continue
+            if line[0] == ' ':
+                parsed[key] += '\n%s' % line
+            else:
+                match = re.match(r"^((?:\S+\s+){1}\S+).*", line)
+                if match:
+                    key = match.group(1)
+                    parsed[key] = line
+        return parsed
+
+    def search(pattern, data, group=1, flags=0):
+        match = re.search(pattern, data, flags)
+        if match:
+            return match.group(group)
+
+    def parse_ipv4(data):
+        addr_list = []
+        match1 = re.findall(r'Internet address is (\S+)', data)
+        match2 = re.findall(r'Subnet mask is (\S+)', data)
+        if match1 and match2 and len(match1) == len(match2):
+            for i in range(len(match1)):
+                address = match1[i].replace(',', '')
+                ipv4_addr_list.append(address)
+                addr_list.append(dict(address=address, subnet=sum(
+                    bin(int(x)).count('1') for x in match2[i].split('.'))))
+        return addr_list
+
+    def parse_ipv6(data):
+        addr_list = []
+        for address, prefix in re.findall(r'IPv6 address is (\S+) Prefix (\S+)', data):
+            ipv6_addr_list.append(address)
+            addr_list.append(dict(address=address, prefix=prefix))
+        return addr_list
+
+    interfaces = {}
+    for data_obj in output.strip().split('\n\n  '):
+        for key, value in parse_interface_key(data_obj).items():
+            mtu = search(r'MTU is (\d+)', value)
+            interfaces[key] = dict(
+                name=search(r'Interface name is (\S+)', value) or '',
+                macaddress=search(r'Hardware is (?:.*), Address is (\S+)', value),
+                mtu=int(mtu) if mtu else None,
+                duplex=search(r'Duplex (\w+)', value, flags=re.M),
+                operstatus=search(r'^(?:.+) is (.+),', value, flags=re.M),
+                ipv4=parse_ipv4(value),
+                ipv6=parse_ipv6(value))
+    return interfaces, ipv4_addr_list, ipv6_addr_list
+
+
+def streaming(output):
+    parser = InterfacesParser()
+    interfaces = dict((key, record.to_dict())
+                      for key, record in parser.parse(output).items())
+    return interfaces, parser.ipv4_addresses, parser.ipv6_addresses
+
+
+def timed(func, output):
+    start = time.time()
+    result = func(output)
+    return time.time() - start, result
+
+
+def run(count):
+    output = show_interfaces(count)
+    t_before, expected = timed(legacy, output)
+    t_after, result = timed(streaming, output)
+    assert result == expected
+    print("%6d interfaces %8d lines  before %8.1f ms  after %8.1f ms  speedup %5.1fx" % (
+        count, output.count('\n'), t_before * 1000, t_after * 1000, t_before / t_after))
+
+    parser = InterfacesParser()
+    records = parser.parse(output)
+    start = time.time()
+    sorted_addresses(parser.ipv4_addresses)
+    sorted_addresses(parser.ipv6_addresses, socket.AF_INET6)
+    t_sorted = time.time() - start
+    start = time.time()
+    index = address_index(records)
+    t_index = time.time() - start
+    print("%6d interfaces %8d addresses  sort/dedup %8.1f ms  index %8.1f ms  %d networks" % (
+        count, len(parser.ipv4_addresses) + len(parser.ipv6_addresses),
+        t_sorted * 1000, t_index * 1000, len(index)))
+
+
+def main(argv):
+    sizes = [int(arg) for arg in argv] or [100, 1000, 10000]
+    for size in sizes:
+        run(size)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
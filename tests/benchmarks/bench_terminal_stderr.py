@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: ©2024 A10 Networks, Inc. All rights reserved.
+
+"""Per-response cost of the terminal error check on large show outputs.
+
+Compares the previous list of 17 separate regexes, which netcommon runs
+one after the other, with the single-pass StderrMatcher.
+
+    python tests/benchmarks/bench_terminal_stderr.py [size_mb ...]
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import re
+import sys
+import timeit
+
+from ansible_collections.a10.acos_cli.plugins.terminal.acos import (
+    StderrMatcher, TERMINAL_STDERR_PATTERNS)
+
+SHOW_INTERFACES = (
+    b"  Ethernet 1 is up, line protocol is up\n"
+    b"  Hardware is 10Gig, Address is fa16.3e22.90d5\n"
+    b"  Internet address is 10.43.12.24, Subnet mask is 255.255.255.0\n"
+    b"  470841 packets input,  19776422 bytes\n"
+    b"  0 input errors,  0 CRC  0 frame\n"
+    b"  0 output errors,  0 collisions\n\n"
+)
+
+
+def separate_regexes():
+    return [re.compile(pattern, flags)
+            for name, pattern, flags, keywords in TERMINAL_STDERR_PATTERNS]
+
+
+def run(size_mb, number=3):
+    data = SHOW_INTERFACES * int(size_mb * 1024 * 1024 / len(SHOW_INTERFACES))
+    before = separate_regexes()
+    after = StderrMatcher(TERMINAL_STDERR_PATTERNS)
+
+    assert not any(regex.search(data) for regex in before)
+    assert after.search(data) is None
+
+    t_before = timeit.timeit(
+        lambda: [regex.search(data) for regex in before], number=number) / number
+    t_after = timeit.timeit(lambda: after.search(data), number=number) / number
+    print("%6.1f MB  before %8.1f ms  after %8.1f ms  speedup %5.1fx" % (
+        len(data) / 1024.0 / 1024.0, t_before * 1000, t_after * 1000,
+        t_before / t_after))
+
+
+def main(argv):
+    sizes = [float(arg) for arg in argv] or [1, 4, 16]
+    for size in sizes:
+        run(size)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
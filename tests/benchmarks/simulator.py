@@ -0,0 +1,694 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: ©2024 A10 Networks, Inc. All rights reserved.
+
+"""Local ACOS CLI simulator.
+
+AcosDevice models the CLI of an ACOS device: exec, privileged and config
+modes with their prompts, enable passwords, partitions, a hierarchical
+running/startup config, the common show commands with ``| include``,
+``| exclude``, ``| section`` and ``| begin`` filters, interactive
+``[yes/no]`` questions and the error strings matched by the terminal
+plugin.  Every command costs one simulated round trip of ``rtt`` seconds
+plus ``line_delay`` seconds of device time, lines written in one go are
+processed back to back like on a real shell.
+
+SimParamikoConnection stands in for the paramiko connection plugin, so a
+real ``ansible.netcommon.network_cli`` connection with the acos terminal
+and cliconf plugins of this collection runs unchanged against the
+simulator.  run_module() runs a module's main() in process and sends its
+RPCs through the same JsonRpcServer used by ansible-connection::
+
+    device = AcosDevice(config=generate_config(10000), rtt=0.005)
+    with SimulatedConnection(device) as sim:
+        result = sim.run_module(acos_command, {'commands': ['show version']})
+    print(device.stats)
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import json
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+
+from ansible.module_utils import basic
+from ansible.module_utils.connection import Connection
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10 import acos as acos_utils
+from ansible_collections.ansible.netcommon.plugins.module_utils.network.common import network
+from ansible_collections.a10.acos_cli.tests.unit.compat.mock import patch
+from ansible_collections.a10.acos_cli.tests.unit.modules.utils import (
+    AnsibleExitJson, AnsibleFailJson, exit_json, fail_json, set_module_args)
+
+INVALID_INPUT = "% Invalid input detected at '^' marker."
+INCOMPLETE = "% Incomplete command."
+
+BLOCK_OPENERS = OrderedDict([
+    ('slb server ', 'real server'),
+    ('slb service-group ', 'slb svc group'),
+    ('slb virtual-server ', 'slb vserver'),
+    ('slb template ', 'slb template'),
+    ('health monitor ', 'health:monitor'),
+    ('interface ', 'if'),
+    ('vlan ', 'vlan'),
+    ('partition ', 'partition'),
+])
+
+SUB_BLOCK_OPENERS = {
+    'real server': ('port ', 'real server-node port'),
+    'slb vserver': ('port ', 'slb vserver-vport'),
+}
+
+TOP_LEVEL_LEAVES = ('hostname ', 'ip dns ', 'ip route ', 'ipv6 route ', 'ip nat ',
+                    'multi-config ', 'timezone ', 'ntp ', 'logging ', 'snmp-server ',
+                    'web-service', 'enable-management ', 'system ', 'glm ')
+
+IPV4_LIKE_RE = re.compile(r'^\d+\.\d+\.\d+\.\S+$')
+IPV4_RE = re.compile(r'^(25[0-5]|2[0-4]\d|1?\d?\d)(\.(25[0-5]|2[0-4]\d|1?\d?\d)){3}$')
+
+SHOW_VERSION = """Thunder Series Unified Application Service Gateway vThunder
+  Copyright 2007-2018 by A10 Networks, Inc.  All A10 Networks products are
+       protected by one or more of the following US patents:
+       9756071, 9742879, 9722918, 9712493, 9705800, 9661026, 9621575, 9609052
+
+      64-bit Advanced Core OS (ACOS) version 4.1.1-P9, build 105 (Sep-21-2018,22:25)
+        Booted from Hard Disk primary image
+      Serial Number: N/A
+      aFleX version: 2.0.0
+      aXAPI version: 3.0
+      Hard Disk primary image (default) version 4.1.1-P9, build 105
+      Hard Disk secondary image version 4.1.1-P9, build 105
+      Last configuration saved at {saved}
+      Virtualization type: KVM
+      System Polling Mode : Off
+      Hardware: 8 CPUs(Stepping 3), Single 40G Hard disk
+      Memory 8071 Mbyte, Free Memory 3894 Mbyte
+      Hardware Manufacturing Code: N/A
+      Current time is {now}
+      The system has been up 33 days, 1 hour, 24 minutes"""
+
+SHOW_HARDWARE = """Thunder Series Unified Application Service Gateway vThunder
+      Serial No  : N/A
+      CPU        : Core Processor
+                   8 cores
+                   3  stepping
+      Storage    : Single 40G drive
+      Memory     : Total System Memory 8071 Mbyte, Free Memory 3908 Mbyte
+      L2/3 ASIC  : 0 device(s) present
+      Bypass     : Absent"""
+
+SHOW_LICENSE_INFO = """Host ID        : ABCDEFGHIJKLMNOPQ
+USB ID         : Not Available
+Billing Serials: N/A"""
+
+SHOW_BOOTIMAGE = """(* = Default)
+                         Version
+-----------------------------------------------
+Hard Disk primary         4.1.1-P9.105 (*)
+Hard Disk secondary       4.1.1-P9.105"""
+
+INTERFACE_COUNTERS = """  470841 packets input,  19776422 bytes
+  Received 470829 broadcasts,  Received 12 multicasts,  Received 0 unicasts
+  0 input errors,  0 CRC  0 frame
+  0 runts  0 giants
+  0 packets output  0 bytes
+  Transmitted 0 broadcasts  0 multicasts  0 unicasts
+  0 output errors  0 collisions
+  300 second input rate: 40 bits/sec, 0 packets/sec, 0% utilization
+  300 second output rate: 0 bits/sec, 0 packets/sec, 0% utilization"""
+
+
+def generate_config(lines, interfaces=8):
+    """ Running-config text of about the given number of lines """
+    config = ['hostname vThunder', 'ip dns primary 10.18.18.71']
+    for port in range(1, interfaces + 1):
+        config.extend(['interface ethernet %d' % port, '  name port%d' % port, '  enable',
+                       '  ip address 10.%d.0.1 255.255.255.0' % port])
+    config.extend(['vlan 100', '  untagged ethernet %d' % interfaces,
+                   '  router-interface ve 100', 'interface ve 100',
+                   '  ip address 172.16.0.1 255.255.0.0',
+                   'partition my_partition id 6'])
+    server = 0
+    while len(config) < lines:
+        config.extend([
+            'slb server s%d 10.%d.%d.%d' % (server, 100 + server // 65536 % 100,
+                                            server // 256 % 256, server % 256),
+            '  port 80 tcp',
+            '  port 443 tcp',
+        ])
+        server += 1
+    config.extend(['slb service-group sg1 tcp', '  member s0 80',
+                   'slb virtual-server vs1 10.255.0.1', '  port 80 http',
+                   '    service-group sg1'])
+    return '\n'.join(config)
+
+
+class ConfigTree(object):
+    """ Ordered tree of config lines, children are indented by two spaces """
+
+    def __init__(self):
+        self.root = OrderedDict()
+
+    def load(self, text):
+        stack = [(-1, self.root)]
+        for line in text.split('\n'):
+            if not line.strip() or line.lstrip().startswith('!'):
+                continue
+            indent = len(line) - len(line.lstrip())
+            while stack[-1][0] >= indent:
+                stack.pop()
+            node = stack[-1][1].setdefault(line.strip(), OrderedDict())
+            stack.append((indent, node))
+
+    def render(self):
+        lines = []
+
+        def walk(node, depth):
+            for line, children in node.items():
+                lines.append('  ' * depth + line)
+                walk(children, depth + 1)
+                if depth == 0:
+                    lines.append('!')
+
+        walk(self.root, 0)
+        return lines
+
+    def blocks(self, prefix):
+        return [(line, children) for line, children in self.root.items()
+                if line.startswith(prefix)]
+
+
+class AcosDevice(object):
+    """ Shared state of the simulated device, used by all its CLI sessions """
+
+    def __init__(self, config='', hostname='vThunder', password='a10',
+                 rtt=0.0, line_delay=0.0):
+        self.hostname = hostname
+        self.password = password
+        self.rtt = rtt
+        self.line_delay = line_delay
+        self.lock = threading.RLock()
+        self.stats = Counter()
+        self.running = {'shared': ConfigTree()}
+        self.running['shared'].load(config)
+        self.startup = {'shared': '\n'.join(self.running['shared'].render())}
+        self.updated = self.saved = time.strftime('%H:%M:%S UTC %a %b %d %Y')
+        self._revision = 0
+
+    def partitions(self):
+        return [line.split()[1] for line, children
+                in self.running['shared'].blocks('partition ')]
+
+    def config(self, partition):
+        with self.lock:
+            if partition not in self.running:
+                self.running[partition] = ConfigTree()
+            return self.running[partition]
+
+    def touch(self):
+        self._revision += 1
+        self.updated = '%s.%d' % (time.strftime('%H:%M:%S UTC %a %b %d %Y'), self._revision)
+
+    def open_session(self):
+        with self.lock:
+            self.stats['sessions'] += 1
+        return CliSession(self)
+
+
+class CliSession(object):
+    """ One CLI shell: mode, partition, config context and pending questions """
+
+    def __init__(self, device):
+        self.device = device
+        self.privileged = False
+        self.config_mode = False
+        self.partition = 'shared'
+        self.context = []
+        self._question = None
+        self._question_text = None
+
+    def prompt(self):
+        prompt = self.device.hostname
+        if self.partition != 'shared':
+            prompt += '[%s]' % self.partition
+        if self.config_mode:
+            mode = 'config'
+            if self.context:
+                mode += '-%s' % self.context[-1][0]
+            return '%s(%s)#' % (prompt, mode)
+        return prompt + ('#' if self.privileged else '>')
+
+    def execute(self, line):
+        """ Echo, output and next prompt for one line typed on the shell """
+        with self.device.lock:
+            self.device.stats['commands'] += 1
+            echo = line
+            if self._question is not None:
+                handler, self._question = self._question, None
+                if handler == self._check_password:
+                    echo = ''
+                output = handler(line.strip())
+            else:
+                output = self._dispatch(line.strip())
+
+            if self._question is not None:
+                return '%s\r\n%s' % (echo, self._question_text)
+            text = echo + '\r\n'
+            if output:
+                text += output.replace('\n', '\r\n') + '\r\n'
+            return text + self.prompt()
+
+    def _ask(self, text, handler):
+        self._question = handler
+        self._question_text = text
+
+    def _dispatch(self, command):
+        if not command:
+            return ''
+        if command.startswith('show '):
+            return self._show(command)
+        if self.config_mode:
+            return self._configure(command)
+        return self._exec(command)
+
+    def _exec(self, command):
+        words = command.split()
+        if words[0] == 'enable':
+            if self.privileged:
+                return ''
+            return self._ask('Password:', self._check_password)
+        if not self.privileged:
+            if words[0] in ('terminal', 'exit'):
+                return ''
+            return INVALID_INPUT
+        if words[0] == 'disable':
+            self.privileged = False
+        elif words[0] == 'terminal' or words[0] == 'clear':
+            return ''
+        elif words[0] == 'configure':
+            self.config_mode = True
+        elif words[0] == 'active-partition':
+            return self._active_partition(words)
+        elif words[0] == 'write' and len(words) > 1 and words[1].startswith('mem'):
+            return self._write_memory()
+        elif words[0] in ('reboot', 'reload'):
+            return self._ask('Proceed with %s? [yes/no]:' % words[0],
+                             lambda answer: 'Reload cancelled.' if answer != 'yes' else '')
+        else:
+            return INVALID_INPUT
+        return ''
+
+    def _check_password(self, password):
+        if password == self.device.password:
+            self.privileged = True
+            return ''
+        return '% Bad passwords'
+
+    def _active_partition(self, words):
+        if len(words) < 2:
+            return INCOMPLETE
+        name = words[1]
+        if name != 'shared' and name not in self.device.partitions():
+            return "Partition '%s' does not exist" % name
+        self.partition = name
+        return 'Current active partition: %s' % name
+
+    def _write_memory(self):
+        device = self.device
+        device.startup[self.partition] = '\n'.join(device.config(self.partition).render())
+        device.saved = time.strftime('%H:%M:%S UTC %a %b %d %Y')
+        return 'Building configuration...\nWrite configuration to primary default startup-config\n[OK]'
+
+    def _configure(self, command):
+        words = command.split()
+        if command in ('end', 'exit') and not self.context:
+            self.config_mode = False
+            return ''
+        if command == 'end':
+            self.context = []
+            self.config_mode = False
+            return ''
+        if command == 'exit':
+            self.context.pop()
+            return ''
+        if words[0] in ('write', 'active-partition'):
+            return self._exec(command)
+
+        for word in words:
+            if IPV4_LIKE_RE.match(word) and not IPV4_RE.match(word):
+                return INVALID_INPUT
+
+        negate = words[0] == 'no'
+        line = ' '.join(words[1:]) if negate else command
+        tree = self.device.config(self.partition)
+
+        opener = self._opener(BLOCK_OPENERS, line)
+        if opener is not None:
+            node = tree.root
+            self.context = []
+        elif self.context:
+            node = self.context[-1][1]
+            kind = self.context[-1][0]
+            sub = SUB_BLOCK_OPENERS.get(kind)
+            if len(self.context) == 1 and sub and line.startswith(sub[0]):
+                opener = sub[1]
+        elif line.startswith(TOP_LEVEL_LEAVES) or line in ('multi-config enable',):
+            node = tree.root
+        else:
+            return INVALID_INPUT
+
+        if line.startswith(TOP_LEVEL_LEAVES) and opener is None:
+            node = tree.root
+            self.context = []
+
+        if negate:
+            if line in node:
+                del node[line]
+                self.device.touch()
+            return ''
+
+        if line not in node:
+            node[line] = OrderedDict()
+            self.device.touch()
+        if opener is not None and not line.startswith('partition '):
+            self.context.append((opener, node[line]))
+        return ''
+
+    def _opener(self, openers, line):
+        for prefix, kind in openers.items():
+            if line.startswith(prefix):
+                if kind == 'if':
+                    return 'if:%s' % ':'.join(line.split()[1:3])
+                if kind == 'vlan':
+                    return 'vlan:%s' % line.split()[1]
+                return kind
+        return None
+
+    def _show(self, command):
+        command, filters = command.split('|')[0].strip(), command.split('|')[1:]
+        words = command.split()[1:]
+        output = self._show_output(words)
+        if output is None:
+            return INVALID_INPUT
+        config = words[0] in ('running-config', 'startup-config')
+        for flt in filters:
+            output = apply_filter(output, flt.strip(), config)
+            if output is None:
+                return INVALID_INPUT
+        return output
+
+    def _show_output(self, words):
+        device = self.device
+        if not words:
+            return None
+        if words[0] == 'running-config':
+            lines = device.config(self.partition).render()
+            if 'with-default' in words:
+                lines = ['system promiscuous-mode disable', '!'] + lines
+            body = '\n'.join(lines)
+            header = ['!Current configuration: %d bytes' % len(body),
+                      '!Configuration last updated at %s' % device.updated,
+                      '!Configuration last saved at %s' % device.saved,
+                      '!64-bit Advanced Core OS (ACOS) version 4.1.1-P9, build 105 (Sep-21-2018,22:25)',
+                      '!']
+            return '\n'.join(header + [body])
+        if words[0] == 'startup-config':
+            body = device.startup.get(self.partition, '')
+            return '!Current configuration: %d bytes\n!\n%s' % (len(body), body)
+        if words[0] == 'version':
+            return SHOW_VERSION.format(saved=device.saved, now=time.strftime('%b-%d-%Y, %H:%M'))
+        if words[0] == 'hardware':
+            return SHOW_HARDWARE
+        if words[0] == 'license-info':
+            return SHOW_LICENSE_INFO
+        if words[0] == 'bootimage':
+            return SHOW_BOOTIMAGE
+        if words[0] == 'partition':
+            partitions = device.partitions()
+            lines = ['Total Number of active partitions: %d' % len(partitions),
+                     'Partition Name   Id     L3V/SP     Parent L3V           App Type   Admin Count',
+                     '-' * 78]
+            for index, name in enumerate(partitions):
+                lines.append('%-16s %-7d L3V       -                    -            0' % (name, index + 1))
+            return '\n'.join(lines)
+        if words[0] == 'interfaces':
+            return show_interfaces(device.config(self.partition))
+        if words[:2] == ['slb', 'server']:
+            lines = ['Total Number of Servers configured: %d' % len(
+                device.config(self.partition).blocks('slb server '))]
+            for line, children in device.config(self.partition).blocks('slb server '):
+                lines.append('%-25s %-16s Up' % tuple(line.split()[2:4]))
+            return '\n'.join(lines)
+        return None
+
+
+def apply_filter(output, flt, config=False):
+    """ Output of a ``| include``, ``exclude``, ``begin`` or ``section`` filter,
+    sections are config blocks in configs and single lines otherwise.
+    """
+    words = flt.split(None, 1)
+    if len(words) != 2:
+        return None
+    kind, pattern = words
+    regex = re.compile(pattern)
+    lines = output.split('\n')
+    if kind == 'include':
+        return '\n'.join(line for line in lines if regex.search(line))
+    if kind == 'exclude':
+        return '\n'.join(line for line in lines if not regex.search(line))
+    if kind == 'begin':
+        for index, line in enumerate(lines):
+            if regex.search(line):
+                return '\n'.join(lines[index:])
+        return ''
+    if kind == 'section' and not config:
+        return '\n'.join(line.strip() for line in lines if regex.search(line))
+    if kind == 'section':
+        result, block = [], []
+        for line in lines + ['']:
+            if line and line[0] == ' ':
+                block.append(line)
+                continue
+            if any(regex.search(item) for item in block):
+                result.extend(block)
+            block = [line] if line and not line.startswith('!') else []
+        return '\n'.join(result)
+    return None
+
+
+def show_interfaces(tree):
+    blocks = []
+    for line, children in tree.blocks('interface '):
+        words = line.split()
+        kind = {'ethernet': 'Ethernet', 've': 'VirtualEthernet', 'trunk': 'Trunk',
+                'loopback': 'Loopback'}.get(words[1], words[1])
+        number = int(re.sub(r'\D', '', words[2]) or 0) if len(words) > 2 else 0
+        status = 'up' if 'enable' in children or words[1] != 'ethernet' else 'disabled'
+        lines = ['  %s %s is %s, line protocol is %s' % (kind, words[2], status, status),
+                 '  Hardware is 10Gig, Address is fa16.3e%02x.%04x' % (number % 256, number)]
+        for child in children:
+            if child.startswith('ip address '):
+                address, mask = child.split()[2:4]
+                lines.append('  Internet address is %s, Subnet mask is %s' % (address, mask))
+            elif child.startswith('ipv6 address '):
+                address, prefix = child.split()[2].split('/')
+                lines.append('  IPv6 address is %s Prefix %s Type: unicast' % (address, prefix))
+        lines.append('  Configured Speed auto, Actual 10Gbit, Configured Duplex auto, Actual fdx')
+        lines.append('  Flow Control is disabled, IP MTU is 1500 bytes')
+        for child in children:
+            if child.startswith('name '):
+                lines.append('  Interface name is %s' % child.split()[1])
+        lines.append(INTERFACE_COUNTERS)
+        blocks.append('\n'.join(lines))
+    return '\n\n'.join(blocks)
+
+
+class SimChannel(object):
+    """ paramiko Channel look-alike on top of a CliSession
+
+    Every line written is executed on the session; its response becomes
+    readable once the simulated round trip and device time have passed.
+    recv() blocks like a socket with a timeout.
+    """
+
+    def __init__(self, device):
+        self.device = device
+        self.session = device.open_session()
+        self.closed = False
+        self._timeout = None
+        self._pending = b''
+        self._out = deque()
+        self._busy_until = time.time()
+        self._queue(self.session.prompt(), time.time())
+
+    def _queue(self, text, sent_at):
+        device = self.device
+        start = max(sent_at + device.rtt / 2, self._busy_until)
+        self._busy_until = start + device.line_delay
+        data = text.encode('utf-8')
+        with device.lock:
+            device.stats['bytes_out'] += len(data)
+        self._out.append([self._busy_until + device.rtt / 2, data])
+
+    def settimeout(self, timeout):
+        self._timeout = timeout
+
+    def gettimeout(self):
+        return self._timeout
+
+    def sendall(self, data):
+        with self.device.lock:
+            self.device.stats['bytes_in'] += len(data)
+        now = time.time()
+        self._pending += data.replace(b'\n', b'')
+        while b'\r' in self._pending:
+            line, self._pending = self._pending.split(b'\r', 1)
+            self._queue(self.session.execute(line.decode('utf-8')), now)
+
+    send = sendall
+
+    def recv(self, nbytes):
+        deadline = None if self._timeout is None else time.time() + self._timeout
+        while True:
+            if self.closed:
+                return b''
+            now = time.time()
+            if self._out and self._out[0][0] <= now:
+                data = b''
+                while self._out and self._out[0][0] <= now and len(data) < nbytes:
+                    chunk = self._out[0]
+                    size = nbytes - len(data)
+                    data, chunk[1] = data + chunk[1][:size], chunk[1][size:]
+                    if not chunk[1]:
+                        self._out.popleft()
+                return data
+            wait = self._out[0][0] - now if self._out else None
+            if deadline is not None:
+                if now >= deadline:
+                    raise socket.timeout()
+                wait = deadline - now if wait is None else min(wait, deadline - now)
+            time.sleep(wait if wait is not None else 1)
+
+    def close(self):
+        self.closed = True
+
+
+class SimSSHClient(object):
+    """ paramiko SSHClient look-alike handing out simulated shells """
+
+    def __init__(self, device):
+        self.device = device
+
+    def invoke_shell(self):
+        return SimChannel(self.device)
+
+    def close(self):
+        pass
+
+
+class SimParamikoConnection(object):
+    """ Stands in for the paramiko connection plugin used by network_cli """
+
+    force_persistence = False
+
+    def __init__(self, device):
+        self.device = device
+        self.ssh = None
+
+    def _set_log_channel(self, name):
+        pass
+
+    def _connect(self):
+        self.ssh = SimSSHClient(self.device)
+        return self
+
+    def _connect_uncached(self):
+        return SimSSHClient(self.device)
+
+    def close(self):
+        self.ssh = None
+
+
+class SimulatedConnection(object):
+    """ A network_cli connection to an AcosDevice plus an in-process
+    ansible-connection: JSON-RPC requests of modules are handled by a
+    JsonRpcServer registered with the connection, like in the persistent
+    connection process.
+    """
+
+    def __init__(self, device, buffer_read_timeout=0.0, command_timeout=30):
+        from ansible.playbook.play_context import PlayContext
+        from ansible.plugins.loader import connection_loader, init_plugin_loader
+        from ansible.utils.jsonrpc import JsonRpcServer
+
+        init_plugin_loader()
+        play_context = PlayContext()
+        play_context.network_os = 'a10.acos_cli.acos'
+        play_context.remote_addr = device.hostname
+        play_context.remote_user = 'admin'
+        play_context.become = True
+        play_context.become_method = 'enable'
+        play_context.become_pass = device.password
+
+        self.device = device
+        self.connection = connection_loader.get('ansible.netcommon.network_cli',
+                                                play_context, '/dev/null')
+        self.connection.set_options(direct={
+            'host': device.hostname,
+            'persistent_buffer_read_timeout': buffer_read_timeout,
+            'persistent_command_timeout': command_timeout,
+        })
+        self.connection._ssh_type = 'paramiko'
+        self.connection._ssh_type_conn = SimParamikoConnection(device)
+
+        self.server = JsonRpcServer()
+        # JsonRpcServer keeps registered objects in a class attribute, one
+        # ansible-connection process serving a single connection
+        self.server._objects = set()
+        self.server.register(self.connection)
+        fd, self.socket_path = tempfile.mkstemp(prefix='acos-sim-')
+        os.close(fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    def rpc_connection(self, socket_path):
+        server = self.server
+
+        class RpcConnection(Connection):
+
+            def send(self, data):
+                return server.handle_request(data)
+
+        return RpcConnection(socket_path)
+
+    def run_module(self, module, args):
+        """ Runs module.main() and returns its result dict """
+        args = dict(args, _ansible_socket=self.socket_path)
+        set_module_args(json.loads(json.dumps(args)))
+        acos_utils.invalidate_config()
+        try:
+            with patch.multiple(basic.AnsibleModule, exit_json=exit_json, fail_json=fail_json):
+                with patch.object(acos_utils, 'Connection', self.rpc_connection):
+                    with patch.object(network, 'Connection', self.rpc_connection):
+                        module.main()
+        except AnsibleExitJson as exc:
+            return exc.args[0]
+        except AnsibleFailJson as exc:
+            return exc.args[0]
+        finally:
+            self.connection.pop_messages()
+        raise AssertionError('%s did not exit' % module.__name__)
@@ -0,0 +1,540 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: ©2024 A10 Networks, Inc. All rights reserved.
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import re
+import socket
+
+from ansible.errors import AnsibleConnectionFailure
+from ansible_collections.a10.acos_cli.plugins.cliconf.acos import Cliconf, CliSession
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.config import config_fingerprint
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.output import OutputCapture
+from ansible_collections.a10.acos_cli.plugins.terminal.acos import TerminalModule
+from ansible_collections.a10.acos_cli.tests.unit.compat import unittest
+from ansible_collections.a10.acos_cli.tests.unit.compat.mock import MagicMock, patch
+from ansible_collections.a10.acos_cli.tests.unit.modules.network.a10.base import load_fixture
+
+
+class FakeSession(object):
+
+    opened = []
+
+    def __init__(self, connection):
+        self.partition = 'shared'
+        self.commands = []
+        self.opened.append(self)
+
+    def set_partition(self, partition):
+        self.partition = partition
+
+    def send(self, command, prompt=None, answer=None, check_all=False):
+        self.commands.append(command)
+        if b'bad' in command:
+            raise AnsibleConnectionFailure('% Invalid input')
+        return 'session output of %s' % command.decode()
+
+    def stream(self, command, capture):
+        self.commands.append(command)
+        capture.write(b'session output of ' + command)
+        return capture.close()
+
+    def progress(self):
+        return ['session output']
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def close(self):
+        self.closed = True
+
+
+class FakeShell(object):
+    """ Shell replying to every line sent with the next scripted reply """
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.sent = []
+        self.pending = [b'vThunder#']
+        self.timeout = None
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def gettimeout(self):
+        return self.timeout
+
+    def sendall(self, data):
+        self.sent.append(data)
+        reply = self.replies.pop(0)
+        self.pending.extend(reply if isinstance(reply, list) else [reply])
+
+    def recv(self, nbytes):
+        if not self.pending:
+            raise socket.timeout()
+        return self.pending.pop(0)
+
+
+class TestAcosCliconf(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = MagicMock()
+        self.connection.get_prompt.return_value = b'vThunder(config)#'
+        self.connection._terminal.terminal_stderr_re = TerminalModule.terminal_stderr_re
+        self.cliconf = Cliconf(self.connection)
+
+    def sent_commands(self):
+        return [call[1]['command'] for call in self.connection.send.call_args_list]
+
+    def test_edit_config_line_by_line(self):
+        self.connection.send.return_value = ''
+        lines = ['slb server s1 10.0.0.1', 'port 80 tcp']
+        resp = self.cliconf.edit_config(candidate=lines)
+        self.assertEqual(resp['request'], lines)
+        self.assertEqual(resp['response'], ['', ''])
+        self.assertEqual(self.sent_commands(),
+                         [b'configure terminal', b'slb server s1 10.0.0.1',
+                          b'port 80 tcp', b'end'])
+
+    def test_edit_config_batched(self):
+        lines = ['slb server s1 10.0.0.1', 'port 80 tcp',
+                 'slb server s2 10.0.0.2', 'port 8080 tcp']
+        echoed = ('vThunder(config)#slb server s1 10.0.0.1\n'
+                  'vThunder(config-real server)#port 80 tcp\n'
+                  'Port already exists\n'
+                  'vThunder(config-real server-node port)#slb server s2 10.0.0.2\n'
+                  'vThunder(config-real server)#port 8080 tcp\n'
+                  'vThunder(config-real server-node port)#')
+        self.connection.send.side_effect = ['', echoed, '']
+
+        resp = self.cliconf.edit_config(candidate=lines, batch_size=10)
+        self.assertEqual(resp['request'], lines)
+        self.assertEqual(resp['response'], ['', 'Port already exists', '', ''])
+        self.assertEqual(self.sent_commands()[1], b'\r'.join(
+            line.encode() for line in lines))
+        self.assertEqual(self.connection.send.call_count, 3)
+
+    def test_edit_config_batched_waits_for_last_echo(self):
+        lines = ['ip dns primary 10.0.0.1', 'ip dns secondary 10.0.0.2']
+        self.connection.send.side_effect = [
+            '', 'vThunder(config)#ip dns primary 10.0.0.1\nvThunder(config)#', '']
+        self.connection.receive.return_value = \
+            'vThunder(config)#ip dns secondary 10.0.0.2\nvThunder(config)#'
+
+        resp = self.cliconf.edit_config(candidate=lines, batch_size=2)
+        self.assertEqual(resp['response'], ['', ''])
+        self.assertEqual(self.connection.receive.call_count, 1)
+
+    def test_edit_config_batched_repeated_lines(self):
+        lines = ['slb server s1 10.0.0.1', 'port 80 tcp', 'slb server s2 10.0.0.2', 'port 80 tcp']
+        self.connection.send.side_effect = [
+            '', 'vThunder(config)#slb server s1 10.0.0.1\n'
+                'vThunder(config-real server)#port 80 tcp\n'
+                'vThunder(config-real server-node port)#', '']
+        self.connection.receive.return_value = \
+            'vThunder(config-real server-node port)#slb server s2 10.0.0.2\n' \
+            'vThunder(config-real server)#port 80 tcp\n' \
+            'Port already exists\n' \
+            'vThunder(config-real server-node port)#'
+
+        resp = self.cliconf.edit_config(candidate=lines, batch_size=10)
+        self.assertEqual(resp['response'], ['', '', '', 'Port already exists'])
+        self.assertEqual(self.connection.receive.call_count, 1)
+
+    def test_edit_config_batched_prompt_line_sent_alone(self):
+        lines = ['ip dns primary 10.0.0.1',
+                 {'command': 'slb template http t1', 'prompt': '[yes/no]', 'answer': 'yes'},
+                 'ip dns secondary 10.0.0.2']
+        self.connection.send.return_value = ''
+        self.cliconf.edit_config(candidate=lines, batch_size=10)
+        self.assertEqual(self.sent_commands(),
+                         [b'configure terminal', b'ip dns primary 10.0.0.1',
+                          b'slb template http t1', b'ip dns secondary 10.0.0.2',
+                          b'end'])
+
+    def test_edit_config_batched_error(self):
+        lines = ['ip dns primary 10.0.0.1', 'ip dns secondary 10.0.0.x']
+        error = ('vThunder(config)#ip dns primary 10.0.0.1\n'
+                 'vThunder(config)#ip dns secondary 10.0.0.x\n'
+                 '% Invalid input detected at \'^\' marker.\n'
+                 'vThunder(config)#')
+        self.connection.send.side_effect = ['', AnsibleConnectionFailure(error)]
+        with self.assertRaises(AnsibleConnectionFailure) as exc:
+            self.cliconf.edit_config(candidate=lines, batch_size=10)
+        self.assertIn('Error while applying configuration line: ip dns secondary 10.0.0.x',
+                      str(exc.exception))
+        self.connection.receive.assert_not_called()
+
+    def test_edit_config_batched_error_reads_remaining_lines(self):
+        lines = ['slb server s1 10.0.0.1', 'port 80 tcp', 'port 80x tcp',
+                 'slb server s2 10.0.0.2', 'port 8080 tcp']
+        error = ('vThunder(config)#slb server s1 10.0.0.1\n'
+                 'vThunder(config-real server)#port 80 tcp\n'
+                 'Port already exists\n'
+                 'vThunder(config-real server-node port)#port 80x tcp\n'
+                 '% Invalid input detected at \'^\' marker.\n'
+                 'vThunder(config-real server-node port)#')
+        self.connection.send.side_effect = ['', AnsibleConnectionFailure(error)]
+        self.connection.receive.side_effect = [
+            'vThunder(config-real server-node port)#slb server s2 10.0.0.2\n'
+            'vThunder(config-real server)#',
+            'vThunder(config-real server)#port 8080 tcp\n'
+            'vThunder(config-real server-node port)#']
+        with self.assertRaises(AnsibleConnectionFailure) as exc:
+            self.cliconf.edit_config(candidate=lines, batch_size=10)
+        self.assertIn('Error while applying configuration line: port 80x tcp', str(exc.exception))
+        self.assertEqual(self.connection.receive.call_count, 2)
+
+    def test_edit_config_batched_error_stops_reading_on_timeout(self):
+        lines = ['ip dns primary 10.0.0.x', 'ip dns secondary 10.0.0.2']
+        error = ('vThunder(config)#ip dns primary 10.0.0.x\n'
+                 '% Invalid input detected at \'^\' marker.\n'
+                 'vThunder(config)#')
+        self.connection.send.side_effect = ['', AnsibleConnectionFailure(error)]
+        self.connection.receive.side_effect = AnsibleConnectionFailure('command timeout triggered')
+        with self.assertRaises(AnsibleConnectionFailure) as exc:
+            self.cliconf.edit_config(candidate=lines, batch_size=10)
+        self.assertIn('Error while applying configuration line: ip dns primary 10.0.0.x',
+                      str(exc.exception))
+        self.assertEqual(self.connection.receive.call_count, 1)
+
+    def test_perf_not_recorded_by_default(self):
+        self.connection.send.return_value = ''
+        self.cliconf.edit_config(candidate=['ip dns primary 10.0.0.1'])
+        self.assertEqual(self.cliconf.get_perf(), {})
+
+    def test_perf_records_calls_and_round_trips(self):
+        self.connection.send.return_value = 'ok'
+        self.cliconf.start_perf()
+        self.cliconf.edit_config(candidate=['ip dns primary 10.0.0.1', 'ip dns secondary 10.0.0.2'])
+        self.cliconf.get_diff(candidate='ip dns primary 10.0.0.1', running='', diff_match='line')
+        perf = self.cliconf.get_perf()
+
+        self.assertEqual([item['command'] for item in perf['commands']],
+                         ['configure terminal', 'ip dns primary 10.0.0.1',
+                          'ip dns secondary 10.0.0.2', 'end'])
+        self.assertEqual(perf['calls']['edit_config']['calls'], 1)
+        self.assertEqual(perf['calls']['edit_config']['round_trips'], 4)
+        self.assertEqual(perf['calls']['edit_config']['bytes'], 8)
+        self.assertEqual(perf['calls']['send_command']['calls'], 4)
+        self.assertEqual(perf['calls']['get_diff']['round_trips'], 0)
+        self.assertEqual(perf['calls']['get_diff']['prompt_wait'], 0)
+        self.assertEqual(self.cliconf.get_perf(), {})
+
+    def test_perf_recorder_left_running_is_capped(self):
+        self.connection.send.return_value = 'ok'
+        self.cliconf.start_perf()
+        with patch('ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.perf.MAX_RECORDED_COMMANDS', 2):
+            self.cliconf.run_commands(['show version', 'show hardware', 'show partition'])
+        perf = self.cliconf.get_perf()
+        self.assertEqual([item['command'] for item in perf['commands']], ['show version', 'show hardware'])
+        self.assertEqual(perf['round_trips'], 3)
+        self.assertEqual(perf['bytes'], 6)
+
+    def test_perf_records_batches(self):
+        lines = ['ip dns primary 10.0.0.1', 'ip dns secondary 10.0.0.2']
+        self.connection.send.side_effect = lambda command, **kwargs: \
+            'vThunder(config)#%s\nvThunder(config)#' % command.decode().replace('\r', '\nvThunder(config)#')
+        self.cliconf.start_perf()
+        self.cliconf.edit_config(candidate=lines, batch_size=10)
+        commands = [item['command'] for item in self.cliconf.get_perf()['commands']]
+        self.assertEqual(commands, ['configure terminal', 'ip dns primary 10.0.0.1 (+1 lines)', 'end'])
+
+    def device_partitions(self, command, **kwargs):
+        if command == b'show partition':
+            return load_fixture('acos_config_show_partition.cfg')
+        if command.startswith(b'active-partition'):
+            return 'Current active partition: %s' % command.split()[-1].decode()
+        return ''
+
+    def test_set_partition_skips_active_partition(self):
+        self.connection.send.side_effect = self.device_partitions
+        self.cliconf.set_partition('shared')
+        self.cliconf.set_partition('my_partition')
+        self.cliconf.set_partition('my_partition')
+        self.cliconf.run_commands(['show version'])
+        self.cliconf.set_partition('my_partition')
+        self.cliconf.set_partition('shared')
+        self.assertEqual(self.sent_commands(), [b'show partition', b'active-partition my_partition',
+                                                b'show version', b'active-partition shared'])
+
+    def test_set_partition_unknown_fails_fast(self):
+        self.connection.send.side_effect = self.device_partitions
+        self.cliconf.set_partition('part2')
+        for attempt in range(2):
+            with self.assertRaises(ValueError) as exc:
+                self.cliconf.set_partition('my_partition2')
+            self.assertIn('does not exist', str(exc.exception))
+        self.assertEqual(self.sent_commands(), [b'show partition', b'active-partition part2'])
+
+    def test_set_partition_refreshes_after_config_changes(self):
+        self.connection.send.side_effect = self.device_partitions
+        self.cliconf.set_partition('part2')
+        self.cliconf.run_commands(['show version', 'active-partition shared'])
+        self.cliconf.set_partition('part3')
+        self.assertEqual(self.sent_commands().count(b'show partition'), 1)
+        self.cliconf.edit_config(candidate=['ip dns primary 10.0.0.1'])
+        self.cliconf.run_commands(['clear slb server s1'])
+        self.cliconf.set_partition('part4')
+        self.assertEqual(self.sent_commands().count(b'show partition'), 1)
+        self.cliconf.edit_config(candidate=['partition part8 id 8'])
+        self.cliconf.set_partition('part5')
+        self.assertEqual(self.sent_commands().count(b'show partition'), 2)
+        self.cliconf.run_commands(['configure', 'no partition part8'])
+        self.cliconf.set_partition('part6')
+        self.assertEqual(self.sent_commands().count(b'show partition'), 3)
+
+    def test_set_partition_after_reconnect(self):
+        self.connection.send.side_effect = self.device_partitions
+        self.connection.cliconf = self.cliconf
+        self.cliconf.set_partition('part2')
+        TerminalModule(self.connection).on_open_shell()
+        self.cliconf.set_partition('part2')
+        self.cliconf.set_partition('shared')
+        self.assertEqual(self.sent_commands(), [b'show partition', b'active-partition part2',
+                                                b'show partition', b'active-partition part2',
+                                                b'active-partition shared'])
+
+    def test_set_partition_without_show_partition(self):
+        def device(command, **kwargs):
+            if command == b'show partition':
+                raise AnsibleConnectionFailure('% Unrecognized command')
+            return self.device_partitions(command)
+        self.connection.send.side_effect = device
+        self.assertEqual(self.cliconf.set_partition('part2'), 'Current active partition: part2')
+        self.assertEqual(self.sent_commands(), [b'show partition', b'active-partition part2'])
+
+    def test_set_partition_device_check(self):
+        self.connection.send.return_value = load_fixture('acos_command_active-partition_my_partition2')
+        with self.assertRaises(ValueError) as exc:
+            self.cliconf.set_partition('my_partition2')
+        self.assertIn("Partition 'my_partition2' does not exist", str(exc.exception))
+        self.assertEqual(self.cliconf._partition, 'shared')
+
+    def test_startup_fingerprint_kept_until_write(self):
+        startup = load_fixture('acos_running_config.cfg')
+        self.connection.send.side_effect = \
+            lambda command, **kwargs: startup if command == b'show startup-config' else ''
+        fingerprint = self.cliconf.get_startup_fingerprint(saved='10:00:00')
+        self.assertEqual(fingerprint, config_fingerprint(startup))
+        self.assertEqual(self.cliconf.get_startup_fingerprint(saved='10:00:00'), fingerprint)
+        self.assertEqual(self.sent_commands(), [b'show startup-config'])
+
+        self.cliconf.get_startup_fingerprint(saved='10:00:05')
+        self.cliconf.run_commands(['write memory'])
+        self.cliconf.get_startup_fingerprint(saved='10:00:05')
+        self.cliconf.get_startup_fingerprint(ignore_lines=['fingerprint-ignored .*'], saved='10:00:05')
+        self.assertEqual(self.sent_commands().count(b'show startup-config'), 4)
+
+    def test_startup_fingerprint_without_saved_stamp(self):
+        self.connection.send.return_value = 'hostname vThunder'
+        self.cliconf.get_startup_fingerprint(saved=None)
+        self.cliconf.get_startup_fingerprint(saved=None)
+        self.assertEqual(self.sent_commands(), [b'show startup-config', b'show startup-config'])
+
+    def test_get_device_info(self):
+        self.connection.send.return_value = '\n'.join([
+            'ACOS vThunder (revision 3) Version 4.1.1-P9,',
+            'vThunder uptime is 33 days',
+            'System image file is "flash:acos-4.1.1-P9.bin"'])
+        self.assertEqual(self.cliconf.get_device_info(), dict(
+            network_os='acos', network_os_version='4.1.1-P9', network_os_model='vThunder',
+            network_os_hostname='vThunder', network_os_image='flash:acos-4.1.1-P9.bin'))
+
+        self.connection.send.return_value = load_fixture('acos_command_show_version')
+        self.assertEqual(self.cliconf.get_device_info(), dict(network_os='acos'))
+
+    def test_run_commands_sequential_by_default(self):
+        self.connection.send.return_value = 'output'
+        resp = self.cliconf.run_commands(['show version', 'show hardware'])
+        self.assertEqual(resp, ['output', 'output'])
+        self.assertEqual(self.sent_commands(), [b'show version', b'show hardware'])
+
+
+@patch('ansible_collections.a10.acos_cli.plugins.cliconf.acos.CliSession', FakeSession)
+class TestAcosCliconfParallel(unittest.TestCase):
+
+    def setUp(self):
+        FakeSession.opened = []
+        self.connection = MagicMock()
+        self.connection.send.side_effect = \
+            lambda command, **kwargs: 'main output of %s' % command.decode()
+        self.cliconf = Cliconf(self.connection)
+        self.commands = ['show version', 'show hardware', 'show interfaces',
+                         'show slb server', 'show partition']
+
+    def test_run_commands_parallel_keeps_order(self):
+        resp = self.cliconf.run_commands(self.commands, concurrency=3)
+        self.assertEqual(len(FakeSession.opened), 2)
+        self.assertEqual(len(resp), len(self.commands))
+        for cmd, out in zip(self.commands, resp):
+            self.assertTrue(out.endswith('output of %s' % cmd), out)
+
+    def test_run_commands_parallel_reuses_sessions(self):
+        self.cliconf.run_commands(self.commands, concurrency=3)
+        self.cliconf.run_commands(self.commands, concurrency=3)
+        self.assertEqual(len(FakeSession.opened), 2)
+
+    def test_run_commands_parallel_check_rc(self):
+        commands = ['show bad%d' % i for i in range(4)]
+        self.connection.send.side_effect = AnsibleConnectionFailure('% Invalid input')
+        with self.assertRaises(AnsibleConnectionFailure):
+            self.cliconf.run_commands(commands, concurrency=2)
+
+        resp = self.cliconf.run_commands(commands, check_rc=False, concurrency=2)
+        self.assertEqual(resp, ['% Invalid input'] * 4)
+
+    def test_run_commands_parallel_module_commands(self):
+        commands = [dict(command=cmd, prompt=None, answer=None, newline=True,
+                         sendonly=False, check_all=False) for cmd in self.commands]
+        self.cliconf.run_commands(commands, concurrency=3)
+        self.assertEqual(len(FakeSession.opened), 2)
+
+    def test_run_commands_prompt_is_sequential(self):
+        commands = ['show version', dict(command='show hardware', prompt='[yes/no]', answer='y')]
+        self.cliconf.run_commands(commands, concurrency=3)
+        self.assertEqual(FakeSession.opened, [])
+
+    def test_run_commands_not_read_only_is_sequential(self):
+        commands = ['show version', 'clear slb server']
+        self.cliconf.run_commands(commands, concurrency=3)
+        self.assertEqual(FakeSession.opened, [])
+        self.assertEqual(self.connection.send.call_count, 2)
+
+    def test_run_commands_parallel_perf(self):
+        self.cliconf.start_perf()
+        self.cliconf.run_commands(self.commands, concurrency=3)
+        perf = self.cliconf.get_perf()
+        self.assertEqual(sorted(item['command'] for item in perf['commands']),
+                         sorted(self.commands))
+        self.assertEqual(perf['calls']['run_commands']['round_trips'], len(self.commands))
+        self.assertTrue(set(item['session'] for item in perf['commands']) <= set([0, 1, 2]))
+
+    def test_run_commands_capture_streams_on_session(self):
+        resp = self.cliconf.run_commands(['show log', 'show version'],
+                                         capture=[dict(limit=10), None])
+        self.assertEqual(len(FakeSession.opened), 1)
+        self.assertEqual(FakeSession.opened[0].commands, [b'show log', b'show version'])
+        self.assertEqual(resp[0], dict(stdout='session ou', bytes=26, truncated=True))
+        self.assertEqual(resp[1]['stdout'], 'session output of show version')
+        self.connection.send.assert_not_called()
+
+    def test_run_commands_capture_not_read_only(self):
+        resp = self.cliconf.run_commands(['clear slb server'], capture=[dict(limit=4, keep='tail')])
+        self.assertEqual(FakeSession.opened, [])
+        self.assertEqual(resp, [dict(stdout='rver', bytes=31, truncated=True)])
+
+    def test_run_commands_parallel_follows_partition(self):
+        self.cliconf.run_commands('active-partition my_partition')
+        self.cliconf.run_commands(self.commands, concurrency=2)
+        self.assertEqual(FakeSession.opened[0].partition, 'my_partition')
+
+
+class TestAcosCliSession(unittest.TestCase):
+
+    def open_session(self, replies):
+        shell = FakeShell([b'\r\nvThunder#'] + replies)
+        connection = MagicMock(ssh_type='paramiko')
+        connection.get_option.side_effect = dict(persistent_command_timeout=30,
+                                                 persistent_buffer_read_timeout=0.1).get
+        connection._terminal.ansi_re = []
+        connection._terminal.terminal_stdout_re = [re.compile(br'[\w\-]+[>#] ?$')]
+        connection._terminal.terminal_stderr_re = [re.compile(br'% Invalid input')]
+        connection.paramiko_conn._connect_uncached.return_value.invoke_shell.return_value = shell
+        return CliSession(connection), shell
+
+    def test_send_answers_all_prompts(self):
+        session, shell = self.open_session([
+            b'upgrade\r\nPassword []?', b'\r\nGetting upgrade package ...\r\nReboot?[yes/no]:',
+            b'\r\nUpgrade successful\r\nvThunder#'])
+        out = session.send(b'upgrade', prompt=[r'Password \[\]\?', r'Reboot\?\[yes/no\]:'],
+                           answer=['secret', 'no'], check_all=True)
+        self.assertEqual(shell.sent[-3:], [b'upgrade\r', b'secret\r', b'no\r'])
+        self.assertIn('Upgrade successful', out)
+        self.assertEqual(session.progress(2), ['Upgrade successful', 'vThunder#'])
+
+    def test_stream_writes_output_while_received(self):
+        block = b''.join(b'session %05d\r\n' % i for i in range(8000))
+        session, shell = self.open_session([[b'show session\r\n' + block, block, b'vThunder#']])
+        capture = MagicMock(wraps=OutputCapture(limit=30))
+        result = session.stream(b'show session', capture)
+        self.assertGreater(capture.write.call_count, 2)
+        self.assertEqual(result['stdout'], 'session 00000\nsession 00001\nse')
+        self.assertEqual(result['bytes'], 2 * len(block.replace(b'\r\n', b'\n')) - 1)
+        self.assertTrue(result['truncated'])
+
+    def test_send_waits_for_prompt_to_settle(self):
+        session, shell = self.open_session([[b'show running-config\r\nhostname vThunder\r\nvThunder#',
+                                             b' banner exec vThunder#', b'\r\n!\r\nend\r\nvThunder#']])
+        out = session.send(b'show running-config')
+        self.assertEqual(out, 'hostname vThunder\nvThunder# banner exec vThunder#\n!\nend')
+        self.assertEqual(shell.pending, [])
+        self.assertEqual(shell.timeout, 30)
+
+    def test_stream_waits_for_prompt_to_settle(self):
+        session, shell = self.open_session([[b'show running-config\r\nvThunder#', b'\r\nend\r\nvThunder#']])
+        result = session.stream(b'show running-config', OutputCapture())
+        self.assertEqual(result['stdout'], 'vThunder#\nend')
+
+    def test_stream_device_error(self):
+        session, shell = self.open_session([b'show bad\r\n% Invalid input\r\nvThunder#'])
+        capture = OutputCapture()
+        with self.assertRaises(AnsibleConnectionFailure):
+            session.stream(b'show bad', capture)
+        self.assertEqual(capture.size, 0)
+
+    def test_requires_paramiko(self):
+        connection = MagicMock(ssh_type='libssh')
+        with self.assertRaises(AnsibleConnectionFailure) as ctx:
+            CliSession(connection)
+        self.assertIn('ssh_type=paramiko', str(ctx.exception))
+        connection.paramiko_conn._connect_uncached.assert_not_called()
+
+    def test_send_answers_first_prompt(self):
+        session, shell = self.open_session([b'reboot\r\nProceed? [yes/no]:', b'\r\nvThunder#'])
+        session.send(b'reboot', prompt=[r'\[yes/no\]', r'Password'], answer=['no', 'x'])
+        self.assertEqual(shell.sent[-2:], [b'reboot\r', b'no\r'])
+
+
+@patch('ansible_collections.a10.acos_cli.plugins.cliconf.acos.CliSession', FakeSession)
+class TestAcosCliconfOperation(unittest.TestCase):
+
+    def setUp(self):
+        FakeSession.opened = []
+        self.cliconf = Cliconf(MagicMock())
+
+    def wait(self, handle):
+        self.cliconf._operations[handle]._thread.join(5)
+
+    def test_operation_runs_on_own_session(self):
+        self.cliconf.run_commands('active-partition my_partition')
+        handle = self.cliconf.start_operation(['configure', 'upgrade hd pri scp://host/ACOS.upg'],
+                                              timeout=600)
+        self.wait(handle)
+        session = FakeSession.opened[0]
+        self.assertEqual(session.partition, 'my_partition')
+        self.assertEqual(session.timeout, 600)
+        self.assertTrue(session.closed)
+        self.assertEqual(session.commands, [b'configure', b'upgrade hd pri scp://host/ACOS.upg'])
+
+        status = self.cliconf.get_operation(handle)
+        self.assertTrue(status['finished'])
+        self.assertEqual(len(status['responses']), 2)
+        self.assertEqual(self.cliconf.get_operation(handle, collect=True)['error'], None)
+        with self.assertRaises(ValueError):
+            self.cliconf.get_operation(handle)
+
+    def test_operation_failure(self):
+        handle = self.cliconf.start_operation(['upgrade bad', 'show version'])
+        self.wait(handle)
+        status = self.cliconf.get_operation(handle, collect=True)
+        self.assertEqual(status['error'], '% Invalid input')
+        self.assertEqual(status['responses'], [])
+
+    def test_operation_limit(self):
+        self.cliconf._operations = dict(('op%d' % i, MagicMock(finished=None)) for i in range(7))
+        with self.assertRaises(ValueError):
+            self.cliconf.start_operation(['upgrade hd pri scp://host/ACOS.upg'])
+        self.assertEqual(FakeSession.opened, [])
@@ -7,9 +7,9 @@ __metaclass__ = type
 
 import json
 
+from ansible.module_utils.connection import ConnectionError
 from ansible_collections.a10.acos_cli.plugins.modules import acos_command
 from ansible_collections.a10.acos_cli.tests.unit.compat.mock import patch
-from ansible_collections.a10.acos_cli.tests.unit.modules.utils import AnsibleFailJson
 from ansible_collections.a10.acos_cli.tests.unit.modules.utils import set_module_args
 from ansible_collections.a10.acos_cli.tests.unit.modules.network.a10.base import (
     TestAcosModule, load_fixture)
@@ -27,9 +27,19 @@ class TestAcosCommandModule(TestAcosModule):
 
         self.run_commands = self.mock_run_commands.start()
 
+        self.mock_get_config_revision = patch(
+            'ansible_collections.a10.acos_cli.plugins.modules.acos_command.get_config_revision')
+        self.get_config_revision = self.mock_get_config_revision.start()
+
+        self.mock_acos_connection = patch(
+            'ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.acos.get_connection')
+        self.acos_connection = self.mock_acos_connection.start().return_value
+
     def tearDown(self):
         super(TestAcosCommandModule, self).tearDown()
         self.mock_run_commands.stop()
+        self.mock_get_config_revision.stop()
+        self.mock_acos_connection.stop()
 
     def load_fixtures(self, commands=None):
 
@@ -81,7 +91,7 @@ class TestAcosCommandModule(TestAcosModule):
         wait_for = 'result[0] contains "test"'
         set_module_args(dict(commands=['show version'], wait_for=wait_for))
         self.execute_module(failed=True)
-        self.assertEqual(self.run_commands.call_count, 12)
+        self.assertEqual(self.run_commands.call_count, 10)
 
     def test_acos_command_retries(self):
         wait_for = 'result[0] contains "ACOS"'
@@ -149,14 +159,203 @@ class TestAcosCommandModule(TestAcosModule):
         commands = ['show running-config']
         set_module_args(dict(commands=commands, partition='my_partition'))
         self.execute_module()
-        second_args = [calls[0][1]
-                       for calls in self.run_commands.call_args_list]
-        self.assertTrue(self.run_commands.called)
-        self.assertIn('active-partition my_partition', second_args)
+        self.acos_connection.set_partition.assert_called_once_with(partition='my_partition')
+        self.assertEqual(self.run_commands.call_count, 1)
+
+    def test_acos_command_returns_to_shared(self):
+        set_module_args(dict(commands=['show version'], partition='Shared'))
+        self.execute_module()
+        self.acos_connection.set_partition.assert_called_once_with(partition='shared')
 
     def test_acos_command_partition_does_not_exists(self):
+        self.acos_connection.set_partition.side_effect = ConnectionError(
+            load_fixture('acos_command_active-partition_my_partition2'))
         commands = ['show running-config']
         set_module_args(dict(commands=commands, partition='my_partition2'))
-        with self.assertRaises(AnsibleFailJson):
+        result = self.execute_module(failed=True)
+        self.assertEqual(result['msg'], 'Provided partition does not exist')
+        self.assertFalse(self.run_commands.called)
+
+    def test_acos_command_read_only_no_extra_calls(self):
+        set_module_args(dict(commands=['show version', 'show hardware']))
+        result = self.execute_module()
+        self.assertFalse(result['changed'])
+        self.assertEqual(self.run_commands.call_count, 1)
+        self.assertFalse(self.get_config_revision.called)
+
+    def test_acos_command_wait_for_reruns_pending_commands(self):
+        wait_for = ['result[0] contains "Thunder"', 'result[1] contains "test"']
+        set_module_args(dict(commands=['show version', 'show hardware'],
+                             wait_for=wait_for, retries=3))
+        self.execute_module(failed=True)
+        sent = [[item['command'] for item in call[0][1]]
+                for call in self.run_commands.call_args_list]
+        self.assertEqual(sent, [['show version', 'show hardware'],
+                                ['show hardware'], ['show hardware']])
+
+    def test_acos_command_wait_for_attempts(self):
+        wait_for = 'result[0] contains "ACOS"'
+        set_module_args(dict(commands=['show version', 'show hardware'], wait_for=wait_for))
+        result = self.execute_module()
+        self.assertEqual(len(result['attempts']), 1)
+        self.assertEqual(result['attempts'][0]['commands'], [0, 1])
+        self.assertEqual(result['attempts'][0]['pending'], 0)
+
+    @patch('ansible_collections.a10.acos_cli.plugins.modules.acos_command.time')
+    def test_acos_command_wait_for_backoff(self, mock_time):
+        mock_time.time.return_value = 0
+        wait_for = 'result[0] contains "test"'
+        set_module_args(dict(commands=['show version'], wait_for=wait_for, retries=5,
+                             interval=1, backoff=2, max_interval=5))
+        self.execute_module(failed=True)
+        waits = [call[0][0] for call in mock_time.sleep.call_args_list]
+        self.assertEqual(waits, [1, 2, 4, 5])
+
+    @patch('ansible_collections.a10.acos_cli.plugins.modules.acos_command.time')
+    def test_acos_command_wait_for_timeout(self, mock_time):
+        mock_time.time.side_effect = lambda: mock_time.sleep.call_count * 10
+        wait_for = 'result[0] contains "test"'
+        set_module_args(dict(commands=['show version'], wait_for=wait_for,
+                             interval=10, timeout=25))
+        self.execute_module(failed=True)
+        self.assertEqual(self.run_commands.call_count, 3)
+
+    def load_empty_responses(self, commands=None):
+        self.run_commands.side_effect = lambda module, commands, **kwargs: [''] * len(commands)
+
+    def test_acos_command_config_changed(self):
+        self.load_fixtures = self.load_empty_responses
+        self.get_config_revision.side_effect = [
+            '!Configuration last updated at 10:00:00 IST Tue Feb 6 2024',
+            '!Configuration last updated at 10:00:05 IST Tue Feb 6 2024']
+        set_module_args(dict(commands=['configure', 'ip dns primary 10.0.0.1', 'end']))
+        self.execute_module(changed=True)
+        self.assertEqual(self.get_config_revision.call_count, 2)
+
+    def test_acos_command_config_unchanged(self):
+        self.load_fixtures = self.load_empty_responses
+        self.get_config_revision.return_value = \
+            '!Configuration last updated at 10:00:00 IST Tue Feb 6 2024'
+        set_module_args(dict(commands=['clear slb server']))
+        self.execute_module(changed=False)
+
+    def test_acos_command_config_without_revision(self):
+        prompts = ['vThunder#', 'vThunder#', 'vThunder#', 'vThunder(config)#']
+
+        def run_commands(module, commands, **kwargs):
+            if commands == '':
+                return [prompts.pop(0)]
+            return [''] * len(commands)
+
+        self.load_fixtures = lambda commands=None: None
+        self.run_commands.side_effect = run_commands
+        self.get_config_revision.return_value = None
+        set_module_args(dict(commands=['clear slb server']))
+        self.execute_module(changed=False)
+        set_module_args(dict(commands=['configure']))
+        self.execute_module(changed=True)
+
+    def test_acos_command_config_revision_same_partition(self):
+        events = []
+
+        def run_commands(module, commands, **kwargs):
+            for item in commands:
+                events.append(item['command'])
+                if item['command'].startswith('active-partition'):
+                    module._acos_partition = item['command'].split()[-1]
+            return [''] * len(commands)
+
+        def get_config_revision(module):
+            events.append('revision in %s' % module._acos_partition)
+            return '!Configuration last updated at 10:00:00 IST Tue Feb 6 2024'
+
+        def set_partition(partition):
+            events.append('set_partition %s' % partition)
+
+        self.load_fixtures = lambda commands=None: None
+        self.run_commands.side_effect = run_commands
+        self.get_config_revision.side_effect = get_config_revision
+        self.acos_connection.set_partition.side_effect = set_partition
+        set_module_args(dict(commands=['active-partition part2', 'ip dns primary 10.0.0.1']))
+        self.execute_module(changed=False)
+        self.assertEqual(events, ['set_partition shared', 'revision in shared',
+                                  'active-partition part2', 'ip dns primary 10.0.0.1',
+                                  'set_partition shared', 'revision in shared'])
+
+    def operation_status(self, **kwargs):
+        status = dict(commands=['upgrade hd pri scp://host/ACOS.upg'], finished=True,
+                      elapsed=184.2, responses=['Upgrade successful'], progress=[], error=None)
+        status.update(kwargs)
+        return status
+
+    def test_acos_command_operation_start(self):
+        with patch('ansible_collections.a10.acos_cli.plugins.modules.acos_command.start_operation') as start:
+            start.return_value = '3f2a9c41d0b7'
+            set_module_args(dict(commands=['upgrade hd pri scp://host/ACOS.upg'],
+                                 operation='start', operation_timeout=600))
+            result = self.execute_module()
+        self.assertEqual(result['handle'], '3f2a9c41d0b7')
+        self.assertEqual(start.call_args[1], dict(timeout=600))
+        self.assertEqual(start.call_args[0][1][0]['command'], 'upgrade hd pri scp://host/ACOS.upg')
+        self.run_commands.assert_not_called()
+
+    def test_acos_command_operation_poll(self):
+        with patch('ansible_collections.a10.acos_cli.plugins.modules.acos_command.get_operation') as get:
+            get.return_value = self.operation_status(finished=False, responses=[],
+                                                     progress=['Getting upgrade package ...'])
+            set_module_args(dict(operation='poll', handle='3f2a9c41d0b7'))
             result = self.execute_module()
-            self.assertIn('Provided partition does not exist', result['msg'])
+        self.assertFalse(result['finished'])
+        self.assertEqual(result['progress'], ['Getting upgrade package ...'])
+        self.assertEqual(get.call_args[1], dict(collect=False))
+
+    def test_acos_command_operation_collect(self):
+        with patch('ansible_collections.a10.acos_cli.plugins.modules.acos_command.get_operation') as get:
+            get.return_value = self.operation_status()
+            set_module_args(dict(operation='collect', handle='3f2a9c41d0b7',
+                                 wait_for=['result[0] contains successful']))
+            result = self.execute_module(changed=True)
+            self.assertEqual(result['stdout'], ['Upgrade successful'])
+            self.assertEqual(get.call_args[1], dict(collect=True))
+
+            set_module_args(dict(operation='collect', handle='3f2a9c41d0b7',
+                                 wait_for=['result[0] contains failed']))
+            result = self.execute_module(failed=True)
+            self.assertEqual(result['failed_conditions'], ['result[0] contains failed'])
+
+    def test_acos_command_operation_collect_running(self):
+        with patch('ansible_collections.a10.acos_cli.plugins.modules.acos_command.get_operation') as get:
+            get.return_value = self.operation_status(finished=False, responses=[])
+            set_module_args(dict(operation='collect', handle='3f2a9c41d0b7'))
+            result = self.execute_module(failed=True)
+        self.assertIn('still running', result['msg'])
+
+    def test_acos_command_operation_collect_error(self):
+        with patch('ansible_collections.a10.acos_cli.plugins.modules.acos_command.get_operation') as get:
+            get.return_value = self.operation_status(responses=[], error='% Invalid input')
+            set_module_args(dict(operation='collect', handle='3f2a9c41d0b7'))
+            result = self.execute_module(failed=True)
+        self.assertEqual(result['msg'], '% Invalid input')
+
+    def test_acos_command_operation_requires_handle(self):
+        set_module_args(dict(operation='poll'))
+        self.execute_module(failed=True)
+
+    def test_acos_command_output_limit(self):
+        def captured(module, commands, **kwargs):
+            return [dict(stdout='Thunder', bytes=1812, truncated=True) for item in commands]
+        self.load_fixtures = lambda commands=None: setattr(self.run_commands, 'side_effect', captured)
+        set_module_args(dict(commands=['show version'], output_limit=7, split_lines=False,
+                             wait_for=['result[0] contains Thunder']))
+        result = self.execute_module()
+        self.assertEqual(result['stdout'], ['Thunder'])
+        self.assertEqual(result['outputs'], [dict(bytes=1812, truncated=True)])
+        self.assertNotIn('stdout_lines', result)
+        self.assertEqual(self.run_commands.call_args[1]['capture'],
+                         [dict(limit=7, keep='head', path=None)])
+
+    def test_acos_command_parse(self):
+        set_module_args(dict(commands=['show version', 'show hardware'], parse=True))
+        result = self.execute_module()
+        self.assertEqual(result['parsed'][0]['version'], '4.1.1-P9')
+        self.assertIsNone(result['parsed'][1])
@@ -6,9 +6,14 @@ from __future__ import (absolute_import, division, print_function)
 __metaclass__ = type
 
 from mock import MagicMock, Mock
+import gzip
 import os
+import shutil
+import tempfile
 
+from ansible.module_utils.connection import ConnectionError
 from ansible_collections.a10.acos_cli.plugins.cliconf.acos import Cliconf
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.config import config_fingerprint
 from ansible_collections.a10.acos_cli.plugins.modules import acos_config
 from ansible_collections.a10.acos_cli.tests.unit.compat.mock import patch
 from ansible_collections.a10.acos_cli.tests.unit.modules.utils import AnsibleFailJson
@@ -38,11 +43,22 @@ class TestAcosConfigModule(TestAcosModule):
         self.conn.edit_config = MagicMock()
         self.conn.get_diff = MagicMock()
 
+        self.mock_acos_connection = patch(
+            'ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.acos.get_connection')
+        self.acos_connection = self.mock_acos_connection.start().return_value
+
         self.mock_run_commands = patch(
             "ansible_collections.a10.acos_cli.plugins.modules.acos_config.run_commands"
         )
         self.run_commands = self.mock_run_commands.start()
 
+        self.mock_load_config = patch(
+            "ansible_collections.a10.acos_cli.plugins.modules.acos_config.load_config"
+        )
+        self.load_config = self.mock_load_config.start()
+        self.load_config.side_effect = \
+            lambda module, commands, **kwargs: self.conn.edit_config(candidate=commands, **kwargs)
+
         self.src = os.path.join(os.path.dirname(
             __file__), 'fixtures/show_config_file_commands.cfg')
         self.backup_spec = {
@@ -61,6 +77,8 @@ class TestAcosConfigModule(TestAcosModule):
         self.mock_get_config.stop()
         self.mock_run_commands.stop()
         self.mock_get_connection.stop()
+        self.mock_acos_connection.stop()
+        self.mock_load_config.stop()
 
     def load_fixtures(self, filename=None):
         config_file = "acos_running_config.cfg"
@@ -137,7 +155,7 @@ class TestAcosConfigModule(TestAcosModule):
     def test_acos_config_save_changed_false(self):
         set_module_args(dict(save_when="changed"))
         self.execute_module()
-        self.assertEqual(self.run_commands.call_count, 3)
+        self.assertEqual(self.run_commands.call_count, 0)
         self.assertEqual(self.conn.edit_config.call_count, 1)
         args = self.run_commands.call_args_list
         commands = [x[0][1] for x in args]
@@ -147,36 +165,27 @@ class TestAcosConfigModule(TestAcosModule):
         lines = ["ip dns primary 10.18.18.19"]
         set_module_args(dict(lines=lines, save_when="always"))
         self.execute_module()
-        self.assertEqual(self.run_commands.call_count, 4)
+        self.assertEqual(self.run_commands.call_count, 1)
         self.assertEqual(self.conn.edit_config.call_count, 1)
         args = self.run_commands.call_args_list
         commands = [x[0][1] for x in args]
         self.assertIn("write memory\r", commands)
 
-    @patch("ansible_collections.a10.acos_cli.plugins.modules.acos_config.NetworkConfig")
-    def test_acos_config_save_no_modified(self, mock_networkConfig):
+    def test_acos_config_save_no_modified(self):
+        running = '!Configuration last saved at 10:00:00 IST Tue Feb 6 2024\n' + self.running_config
+        self.get_config.side_effect = lambda module, **kwargs: running
+        self.conn.get_startup_fingerprint.return_value = config_fingerprint(self.running_config)
         lines = ["ip dns primary 10.18.18.39"]
         set_module_args(dict(lines=lines, save_when="modified"))
         self.execute_module()
 
-        args = self.run_commands.call_args_list[-1][0][1]
-        self.assertEqual(args, ['show running-config', 'show startup-config'])
-
-        self.assertEqual(mock_networkConfig.call_count, 3)
-
+        self.conn.get_startup_fingerprint.assert_called_once_with(
+            ignore_lines=None, saved='10:00:00 IST Tue Feb 6 2024')
         commands = [x[0][1] for x in self.run_commands.call_args_list]
-        self.assertNotIn("write memory\r", commands)
-
-    @patch("ansible_collections.a10.acos_cli.plugins.modules.acos_config.NetworkConfig")
-    def test_acos_config_save_modified(self, mock_networkConfig):
+        self.assertEqual(commands, [])
 
-        running_config_fixture = Mock()
-        running_config_fixture.sha1 = "show running_config fixtures"
-        startup_config_fixture = Mock()
-        startup_config_fixture.sha1 = "show startup_config fixtures"
-
-        mock_networkConfig.side_effect = [
-            running_config_fixture, startup_config_fixture]
+    def test_acos_config_save_modified(self):
+        self.conn.get_startup_fingerprint.return_value = config_fingerprint('hostname other')
         set_module_args(dict(save_when="modified"))
 
         self.execute_module()
@@ -195,28 +204,64 @@ class TestAcosConfigModule(TestAcosModule):
         result = self.execute_module()
         self.assertIn("__backup__", result)
 
-    @patch("ansible_collections.a10.acos_cli.plugins.modules.acos_config.run_commands")
-    def test_acos_config_in_existing_partition(self, mock_partition):
-        fixture = [load_fixture("acos_config_show_partition.cfg")]
-        mock_partition.return_value = fixture
+    def test_acos_config_backup_stream(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        backup_options = dict(dir_path=tmpdir, filename='backup.cfg', stream=True)
+        set_module_args(dict(backup=True, backup_options=backup_options))
+        result = self.execute_module()
+        self.assertNotIn("__backup__", result)
+        self.assertEqual(result['backup_path'], os.path.join(tmpdir, 'backup.cfg'))
+        self.assertTrue(result['__backup_changed__'])
+        with open(result['backup_path']) as f:
+            self.assertEqual(f.read(), self.get_config.return_value.strip())
+
+        result = self.execute_module()
+        self.assertFalse(result['__backup_changed__'])
+
+    def test_acos_config_backup_compressed(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        backup_options = dict(dir_path=tmpdir, filename='backup.cfg.gz', compress=True)
+        set_module_args(dict(backup=True, backup_options=backup_options))
+        result = self.execute_module()
+        with gzip.open(result['backup_path'], 'rt') as f:
+            self.assertEqual(f.read(), self.get_config.return_value.strip())
+        self.assertEqual(len(result['backup_checksum']), 40)
+
+    def test_acos_config_in_existing_partition(self):
         partition_name = 'my_partition'
         set_module_args(dict(partition=partition_name))
         self.execute_module()
-        second_args = [calls[0][1]
-                       for calls in mock_partition.call_args_list]
-        self.assertIn('active-partition my_partition', second_args)
+        self.acos_connection.set_partition.assert_called_once_with(partition='my_partition')
 
-    @patch("ansible_collections.a10.acos_cli.plugins.modules.acos_config.run_commands")
-    def test_acos_config_partition_does_not_exist(self, mock_partition):
-        fixture = [load_fixture(
-            "acos_config_active-partition_my_partition3.cfg")]
-        mock_partition.return_value = fixture
+    def test_acos_config_partition_does_not_exist(self):
+        self.acos_connection.set_partition.side_effect = ConnectionError(
+            load_fixture("acos_config_active-partition_my_partition3.cfg"))
         partition_name = 'my_partition3'
         set_module_args(dict(partition=partition_name))
-        self.assertRaises(AnsibleFailJson, self.execute_module)
-        with self.assertRaises(AnsibleFailJson):
-            result = self.execute_module()
-            self.assertIn('Provided partition does not exist', result['msg'])
+        with self.assertRaises(AnsibleFailJson) as exc:
+            self.execute_module()
+        self.assertIn('Provided partition does not exist', exc.exception.args[0]['msg'])
+
+    def test_acos_config_no_refetch_without_changes(self):
+        self.conn.get_diff.return_value = {'config_diff': ''}
+        set_module_args(dict(lines=["ip dns primary 10.18.18.71"],
+                             backup=True))
+        self.execute_module()
+        self.assertEqual(self.get_config.call_count, 1)
+        self.assertEqual(self.run_commands.call_count, 0)
+        self.assertFalse(self.conn.edit_config.called)
+
+    def test_acos_config_single_fetch_after_push(self):
+        set_module_args(dict(lines=["ip dns primary 10.18.18.81"],
+                             backup=True, save_when="modified"))
+        self.execute_module()
+        self.assertEqual(self.get_config.call_count, 2)
+        commands = [x[0][1] for x in self.run_commands.call_args_list]
+        self.assertNotIn('show running-config', commands)
+        self.assertNotIn('show startup-config', commands)
+        self.assertEqual(self.conn.get_startup_fingerprint.call_count, 1)
 
     def test_acos_config_match_exact(self):
         lines = ["ip dns primary 10.18.18.81"]
@@ -241,3 +286,128 @@ class TestAcosConfigModule(TestAcosModule):
         self.conn.get_diff.assert_called_with(
             candidate='ip dns primary 10.18.18.81', diff_ignore_lines=None,
             diff_match='none', running=self.running_config)
+
+    def test_acos_config_partitions(self):
+        self.conn.get_diff.side_effect = [
+            {'config_diff': 'slb server web1 10.10.1.11'}, {'config_diff': ''}]
+        self.get_config.side_effect = [
+            self.running_config, self.running_config + '\nslb server web1 10.10.1.11',
+            self.running_config]
+        set_module_args(dict(partitions=dict(
+            tenant1=dict(lines=['slb server web1 10.10.1.11']),
+            tenant2=['slb server web2 10.10.1.12']), save_when='changed'))
+        result = self.execute_module(changed=True)
+
+        self.assertEqual(
+            [call[1]['partition'] for call in self.acos_connection.set_partition.call_args_list],
+            ['tenant1', 'tenant2'])
+        self.assertEqual(result['partitions'], {
+            'tenant1': {'changed': True, 'commands': ['slb server web1 10.10.1.11']},
+            'tenant2': {'changed': False, 'commands': []}})
+        self.assertEqual(result['commands'], ['active-partition tenant1', 'slb server web1 10.10.1.11'])
+        self.assertEqual(self.conn.edit_config.call_count, 1)
+        commands = [x[0][1] for x in self.run_commands.call_args_list]
+        self.assertEqual(commands, ['write memory\r'])
+
+    def test_acos_config_partitions_src(self):
+        self.conn.get_diff.return_value = {'config_diff': ''}
+        set_module_args(dict(partitions=dict(tenant1=dict(
+            src='slb server web1 10.10.1.11', before=['show version']))))
+        result = self.execute_module()
+        self.assertEqual(self.conn.get_diff.call_args[1]['candidate'], 'slb server web1 10.10.1.11')
+        self.assertEqual(result['partitions']['tenant1']['commands'], [])
+
+    def test_acos_config_partitions_with_partition(self):
+        set_module_args(dict(partition='tenant1', partitions=dict(tenant2=['ip dns primary 10.0.0.1'])))
+        result = self.execute_module(failed=True)
+        self.assertIn('mutually exclusive', result['msg'])
+
+    def test_acos_config_partitions_invalid(self):
+        set_module_args(dict(partitions=dict(tenant1=dict(lines=['ip dns primary 10.0.0.1'],
+                                                          src='ip dns primary 10.0.0.1'))))
+        result = self.execute_module(failed=True)
+        self.assertEqual(result['msg'], 'partitions.tenant1 requires one of lines or src')
+        self.assertFalse(self.acos_connection.set_partition.called)
+
+    def fetched_flags(self):
+        return [call[1].get('flags') for call in self.get_config.call_args_list]
+
+    def test_acos_config_scoped_fetch(self):
+        self.conn.get_diff.return_value = {'config_diff': ''}
+        set_module_args(dict(lines=['slb server s1 10.0.0.1', 'slb virtual-server vip1 10.0.1.1']))
+        self.execute_module()
+        self.assertEqual(self.fetched_flags(), [['| section slb server s1 10.0.0.1'],
+                                                ['| section slb virtual-server vip1 10.0.1.1']])
+
+    def test_acos_config_scoped_fetch_with_defaults(self):
+        self.conn.get_diff.return_value = {'config_diff': ''}
+        set_module_args(dict(lines=['slb server s1 10.0.0.1'], defaults=True))
+        self.execute_module()
+        self.assertEqual(self.fetched_flags(), [['with-default', '| section slb server s1 10.0.0.1'],
+                                                ['| section slb server s1 10.0.0.1']])
+
+    def test_acos_config_full_fetch(self):
+        self.conn.get_diff.return_value = {'config_diff': ''}
+        for args in (dict(lines=['no slb server s1']),
+                     dict(lines=['slb server s1 10.0.0.1'], backup=True),
+                     dict(lines=['slb server s1 10.0.0.1'], match='strict'),
+                     dict(lines=['slb server s1 10.0.0.1'], save_when='modified'),
+                     dict(lines=['slb server s1 10.0.0.1'], scoped_fetch=False),
+                     dict(lines=['slb server s%d 10.0.0.%d' % (i, i) for i in range(9)])):
+            self.get_config.reset_mock()
+            self.run_commands.return_value = ['']
+            set_module_args(args)
+            self.execute_module()
+            self.assertEqual(self.fetched_flags()[0], None, args)
+
+    def test_acos_config_scoped_fetch_not_supported(self):
+        # get_config falls back to the full config for every section
+        self.conn.get_diff.return_value = {'config_diff': ''}
+        set_module_args(dict(lines=['slb server s1 10.0.0.1', 'slb server s2 10.0.0.2']))
+        self.execute_module()
+        running = self.conn.get_diff.call_args[1]['running']
+        self.assertEqual(running, self.running_config)
+
+    def test_acos_config_verify_touched(self):
+        added = self.running_config + '\nslb server s1 10.0.0.1\n  port 80 tcp'
+        self.conn.get_diff.return_value = {'config_diff': 'slb server s1 10.0.0.1\nport 80 tcp'}
+        self.get_config.side_effect = [self.running_config, self.running_config, added]
+        set_module_args(dict(lines=['slb server s1 10.0.0.1', 'slb server s2 10.0.0.2']))
+        self.execute_module(changed=True)
+        self.assertEqual(self.fetched_flags(), [['| section slb server s1 10.0.0.1'],
+                                                ['| section slb server s2 10.0.0.2'],
+                                                ['| section slb server s1 10.0.0.1']])
+
+    def test_acos_config_verify_touched_additions_only(self):
+        # removed lines and lines ahead of the touched blocks are not changes
+        after = '\n  Building configuration...\nslb server server2 10.10.20.10\n!'
+        self.conn.get_diff.return_value = {'config_diff': 'slb server server2 10.10.20.10\nno health-check'}
+        self.get_config.side_effect = [self.running_config, after]
+        set_module_args(dict(lines=['slb server server2 10.10.20.10']))
+        self.execute_module(changed=False)
+        self.assertEqual(self.fetched_flags(), [['| section slb server server2 10.10.20.10'],
+                                                ['| section slb server server2 10.10.20.10']])
+
+    def test_acos_config_verify_touched_not_found(self):
+        # the device rewrote or silently dropped the object, verified in full
+        self.conn.get_diff.return_value = {'config_diff': 'slb server s1 10.0.0.1'}
+        set_module_args(dict(lines=['slb server s1 10.0.0.1'], scoped_fetch=False))
+        self.execute_module()
+        self.assertEqual(self.fetched_flags(), [None, ['| section slb server s1 10.0.0.1'], None])
+
+    def test_acos_config_verify_full(self):
+        self.conn.get_diff.return_value = {'config_diff': 'slb server s1 10.0.0.1'}
+        self.get_config.side_effect = [self.running_config,
+                                       self.running_config + '\nslb server s1 10.0.0.1']
+        set_module_args(dict(lines=['slb server s1 10.0.0.1'], scoped_fetch=False, verify='full'))
+        self.execute_module(changed=True)
+        self.assertEqual(self.fetched_flags(), [None, None])
+
+    def test_acos_config_verify_responses(self):
+        self.conn.get_diff.return_value = {'config_diff': 'slb server s1 10.0.0.1\nport 80 tcp'}
+        self.conn.edit_config.return_value = ['', 'Port 80 already exists']
+        set_module_args(dict(lines=['slb server s1 10.0.0.1'], verify='responses'))
+        with patch.object(acos_config.AnsibleModule, 'warn') as warn:
+            self.execute_module(changed=True)
+        self.assertEqual(len(self.fetched_flags()), 1)
+        warn.assert_called_once_with('port 80 tcp: Port 80 already exists')
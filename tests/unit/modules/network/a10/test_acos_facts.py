@@ -5,7 +5,17 @@
 from __future__ import (absolute_import, division, print_function)
 __metaclass__ = type
 
+import gc
+import tracemalloc
+
+from ansible.module_utils.connection import ConnectionError
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.acos import ConfigCache
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.facts.base import (
+    Interfaces, network_of, sorted_addresses)
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.parsers import (
+    InterfaceRecord, prefix_length)
 from ansible_collections.a10.acos_cli.plugins.modules import acos_facts
+from ansible_collections.a10.acos_cli.tests.unit.compat import unittest
 from ansible_collections.a10.acos_cli.tests.unit.compat.mock import patch
 from ansible_collections.a10.acos_cli.tests.unit.modules.utils import AnsibleFailJson
 from ansible_collections.a10.acos_cli.tests.unit.modules.utils import set_module_args
@@ -36,10 +46,22 @@ class TestAcosFactsModule(TestAcosModule):
             'network_api': 'cliconf'
         }
 
+        self.mock_acos_connection = patch(
+            'ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.acos.get_connection')
+        self.acos_connection = self.mock_acos_connection.start().return_value
+        self.fixtures = {}
+
+        self.mock_config_cache = patch(
+            'ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.acos._DEVICE_CONFIGS',
+            ConfigCache())
+        self.mock_config_cache.start()
+
     def tearDown(self):
         super(TestAcosFactsModule, self).tearDown()
+        self.mock_config_cache.stop()
         self.mock_run_commands.stop()
         self.mock_get_capabilities.stop()
+        self.mock_acos_connection.stop()
 
     def load_fixtures(self, commands=None):
         def load_from_file(*args, **kwargs):
@@ -48,7 +70,7 @@ class TestAcosFactsModule(TestAcosModule):
 
             for command in commands:
                 filename = str(command).replace(' | ', '_').replace(' ', '_')
-                output.append(load_fixture('acos_facts_%s' % filename))
+                output.append(load_fixture(self.fixtures.get(command, 'acos_facts_%s' % filename)))
             return output
 
         self.run_commands.side_effect = load_from_file
@@ -72,6 +94,26 @@ class TestAcosFactsModule(TestAcosModule):
                 'ansible_net_version'], '64-bit Advanced Core OS (ACOS) version 4.1.1-P9, build 105 (Sep-21-2018,22:25)'
         )
 
+    def test_acos_facts_hardware_appliance(self):
+        self.fixtures['show version'] = 'acos_facts_show_version_hardware'
+        set_module_args(dict(gather_subset='hardware'))
+        result = self.execute_module()
+        facts = result['ansible_facts']
+        self.assertEqual(facts['ansible_net_model'], 'Thunder Series Unified Application Service Gateway TH1030S')
+        self.assertEqual(facts['ansible_net_serialnum'], 'TH10300000000042')
+        self.assertEqual(facts['ansible_net_image'], '5.2.1-P3.70')
+        self.assertEqual(facts['ansible_net_memfree_mb'], '9816 Mbyte')
+
+    def test_acos_facts_commands_coalesced(self):
+        set_module_args(dict(gather_subset='all', concurrency=3))
+        result = self.execute_module()
+        self.assertEqual(self.run_commands.call_count, 1)
+        self.assertEqual(sorted(self.run_commands.call_args[1]['commands']),
+                         ['show interfaces', 'show license-info', 'show version'])
+        self.assertEqual(self.run_commands.call_args[1]['concurrency'], 3)
+        self.assertEqual(result['ansible_facts']['ansible_net_serialnum'], 'N/A')
+        self.assertEqual(result['ansible_facts']['ansible_net_memtotal_mb'], '8071 Mbyte')
+
     def test_acos_facts_hardware(self):
         set_module_args(dict(gather_subset='hardware'))
         result = self.execute_module()
@@ -124,9 +166,23 @@ class TestAcosFactsModule(TestAcosModule):
                 'ansible_net_interfaces']['Ethernet 2']['duplex']
         )
 
+    def test_acos_facts_interfaces_without_blank_line(self):
+        set_module_args(dict(gather_subset='interfaces'))
+        result = self.execute_module()
+        interfaces = result['ansible_facts']['ansible_net_interfaces']
+        self.assertEqual(interfaces['Loopback 1']['ipv4'],
+                         [{'address': '3.1.1.1', 'subnet': 24}])
+        self.assertEqual(interfaces['Trunk 10']['macaddress'], 'fa16.3e4b.10c2')
+        self.assertEqual(interfaces['Trunk 10']['mtu'], 1500)
+        self.assertEqual(interfaces['Ethernet 1']['name'], 'inter1')
+        self.assertIn('5.5.1.1', result['ansible_facts']['ansible_net_all_ipv4_addresses'])
+
     def test_acos_facts_config(self):
+        self.acos_connection.get_config.return_value = load_fixture('acos_facts_show_running-config')
         set_module_args(dict(gather_subset='config'))
         result = self.execute_module()
+        self.acos_connection.get_config.assert_called_once_with(source='running', flags=[])
+        self.assertIn('vlan 100', result['ansible_facts']['ansible_net_config'])
         self.assertEqual(
             result['ansible_facts']['ansible_net_api'], 'cliConf'
         )
@@ -138,20 +194,138 @@ class TestAcosFactsModule(TestAcosModule):
                 'ansible_facts']['ansible_net_config']
         )
 
-    @patch("ansible_collections.a10.acos_cli.plugins.modules.acos_facts.run_commands")
-    def test_acos_facts_in_existing_partition(self, mock_partition):
+    def test_acos_facts_in_existing_partition(self):
         set_module_args(dict(partition='my_partition', gather_subset='config'))
         self.execute_module()
-        second_args = [calls[0][1]
-                       for calls in mock_partition.call_args_list]
-        self.assertIn('active-partition my_partition', second_args)
-        self.assertTrue(mock_partition.called)
-
-    @patch("ansible_collections.a10.acos_cli.plugins.modules.acos_facts.run_commands")
-    def test_acos_facts_partition_does_not_exist(self, mock_partition):
-        fixture = [load_fixture("acos_facts_active-partition_my_partition_new")]
-        mock_partition.return_value = fixture
+        self.acos_connection.set_partition.assert_called_once_with(partition='my_partition')
+
+    def test_acos_facts_partition_does_not_exist(self):
+        self.acos_connection.set_partition.side_effect = ConnectionError(
+            load_fixture("acos_facts_active-partition_my_partition_new"))
         set_module_args(dict(partition='my_partition_new', gather_subset='config'))
-        with self.assertRaises(AnsibleFailJson):
+        with self.assertRaises(AnsibleFailJson) as exc:
+            self.execute_module()
+        self.assertIn('Provided partition does not exist', exc.exception.args[0]['msg'])
+        self.assertFalse(self.run_commands.called)
+
+    def test_acos_facts_lazy_subsets(self):
+        set_module_args(dict(gather_subset='all', lazy_subsets=True))
+        result = self.execute_module()
+        self.assertEqual(result['ansible_facts']['ansible_net_gather_subset'], ['default', 'hardware'])
+        self.assertEqual(sorted(self.run_commands.call_args[1]['commands']),
+                         ['show license-info', 'show version'])
+        self.assertNotIn('ansible_net_config', result['ansible_facts'])
+        self.assertFalse(self.acos_connection.get_config.called)
+
+    def test_acos_facts_lazy_subsets_named(self):
+        set_module_args(dict(gather_subset=['all', 'interfaces'], lazy_subsets=True))
+        result = self.execute_module()
+        self.assertEqual(result['ansible_facts']['ansible_net_gather_subset'],
+                         ['default', 'hardware', 'interfaces'])
+        self.assertIn('Ethernet 1', result['ansible_facts']['ansible_net_interfaces'])
+
+    def test_acos_facts_nothing_to_gather(self):
+        set_module_args(dict(gather_subset=['!all', '!min']))
+        result = self.execute_module()
+        self.assertEqual(result['ansible_facts']['ansible_net_gather_subset'], [])
+        self.assertNotIn('ansible_net_version', result['ansible_facts'])
+        self.assertFalse(self.run_commands.called)
+        self.assertFalse(self.acos_connection.set_partition.called)
+
+    def test_acos_facts_min_excluded(self):
+        for lazy_subsets in (False, True):
+            set_module_args(dict(gather_subset=['!min', 'hardware'], lazy_subsets=lazy_subsets))
             result = self.execute_module()
-            self.assertIn('Provided partition does not exist', result['msg'])
+            self.assertEqual(result['ansible_facts']['ansible_net_gather_subset'], ['default', 'hardware'])
+
+    def test_acos_facts_subset_timings(self):
+        self.acos_connection.get_perf.return_value = {}
+        set_module_args(dict(gather_subset='hardware', perf=True))
+        result = self.execute_module()
+        self.assertEqual(sorted(result['perf']['subsets']), ['commands', 'default', 'hardware'])
+        self.assertEqual(self.run_commands.call_count, 1)
+
+
+class FakeModule(object):
+
+    params = {}
+
+
+class TestAcosInterfacesFacts(unittest.TestCase):
+
+    def setUp(self):
+        output = load_fixture('acos_facts_show_interfaces')
+        self.mock_run_commands = patch(
+            'ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.facts.base.run_commands',
+            lambda module, commands, **kwargs: [output])
+        self.mock_run_commands.start()
+        self.mock_get_capabilities = patch(
+            'ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.facts.base.get_capabilities',
+            lambda module: {})
+        self.mock_get_capabilities.start()
+
+    def tearDown(self):
+        self.mock_run_commands.stop()
+        self.mock_get_capabilities.stop()
+
+    def gather(self):
+        interfaces = Interfaces(FakeModule())
+        interfaces.populate()
+        return interfaces.facts
+
+    def test_addresses_not_shared_between_hosts(self):
+        first = self.gather()
+        for host in range(50):
+            facts = self.gather()
+        self.assertEqual(facts['all_ipv4_addresses'], first['all_ipv4_addresses'])
+        self.assertEqual(facts['all_ipv6_addresses'], first['all_ipv6_addresses'])
+        self.assertEqual(len(facts['all_ipv4_addresses']), 7)
+
+    def test_addresses_sorted_and_unique(self):
+        facts = self.gather()
+        self.assertEqual(facts['all_ipv4_addresses'], [
+            '0.0.0.0', '1.2.1.1', '3.1.1.1', '5.5.1.1', '10.10.15.15', '10.43.2.34', '10.43.12.24'])
+        self.assertEqual(facts['all_ipv6_addresses'], [
+            '2001:db8:85a3::8a2e:370:7334', '3001:db8:85a3::8a2e:370:7334'])
+        self.assertNotIn('address_index', facts)
+
+    def test_address_index(self):
+        module = FakeModule()
+        module.params = dict(address_index=True)
+        interfaces = Interfaces(module)
+        interfaces.populate()
+        index = interfaces.facts['address_index']
+        self.assertEqual(index['10.43.12.0/24'], [{'interface': 'Ethernet 1', 'address': '10.43.12.24'}])
+        self.assertEqual(index['2001:c00::/22'][0]['address'], '2001:db8:85a3::8a2e:370:7334')
+        self.assertNotIn('0.0.0.0/0', index)
+
+    def test_prefix_length(self):
+        self.assertEqual(prefix_length('255.255.255.0'), 24)
+        self.assertEqual(prefix_length('0.0.0.0'), 0)
+        self.assertEqual(prefix_length('255.0.255.0'), 16)
+        self.assertEqual(network_of('10.1.2.3', 33), None)
+        self.assertEqual(sorted_addresses(['10.0.0.2', 'bad', '9.0.0.1', '10.0.0.2']),
+                         ['9.0.0.1', '10.0.0.2', 'bad'])
+
+    def test_interface_records_are_compact(self):
+        facts = self.gather()
+        record = facts['interfaces']['Ethernet 1']
+        self.assertIsInstance(record, InterfaceRecord)
+        self.assertFalse(hasattr(record, '__dict__'))
+        self.assertEqual(record.to_dict()['ipv4'][0], {'address': '10.43.12.24', 'subnet': 24})
+
+    def test_memory_does_not_grow_with_hosts(self):
+        def gather_hosts(count):
+            for host in range(count):
+                self.gather()
+            gc.collect()
+            return tracemalloc.get_traced_memory()[0]
+
+        tracemalloc.start()
+        try:
+            gather_hosts(10)
+            after_few = gather_hosts(10)
+            after_many = gather_hosts(500)
+        finally:
+            tracemalloc.stop()
+        self.assertLess(after_many - after_few, 64 * 1024)
@@ -0,0 +1,470 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: ©2024 A10 Networks, Inc. All rights reserved.
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import binascii
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10 import acos
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10 import backup
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.config import (
+    RunningConfigIndex, config_difference, config_fingerprint, config_saved_stamp)
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.config_store import ConfigStore
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.output import (
+    OutputCapture, output_filename)
+from ansible_collections.a10.acos_cli.plugins.module_utils.network.a10.parsers import (
+    get_parser, parse_output)
+from ansible_collections.a10.acos_cli.tests.unit.compat import unittest
+from ansible_collections.a10.acos_cli.tests.unit.compat.mock import MagicMock, patch
+from ansible_collections.a10.acos_cli.tests.unit.modules.network.a10.base import load_fixture
+from ansible_collections.ansible.netcommon.plugins.module_utils.network.common.config import (
+    NetworkConfig, dumps)
+
+
+class TestConfigCache(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        cache = acos.ConfigCache(max_entries=2)
+        cache.put('a', 'config a')
+        cache.put('b', 'config b')
+        cache.get('a')
+        cache.put('c', 'config c')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 'config a')
+        self.assertEqual(cache.get('c'), 'config c')
+
+    def test_byte_budget(self):
+        cache = acos.ConfigCache(max_bytes=10)
+        cache.put('a', '123456')
+        cache.put('b', '123456')
+        self.assertIsNone(cache.get('a'))
+        cache.put('c', 'x' * 11)
+        self.assertIsNone(cache.get('c'))
+        self.assertEqual(cache.stats()['bytes'], 6)
+
+    def test_stats(self):
+        cache = acos.ConfigCache()
+        cache.get('a')
+        cache.put('a', 'config')
+        cache.get('a')
+        cache.invalidate()
+        self.assertEqual(cache.stats(), dict(hits=1, misses=1, invalidations=1,
+                                             entries=0, bytes=0))
+
+
+class TestGetConfig(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = acos.ConfigCache()
+        self.mock_cache = patch.object(acos, '_DEVICE_CONFIGS', self.cache)
+        self.mock_cache.start()
+        self.mock_get_connection = patch.object(acos, 'get_connection')
+        self.connection = self.mock_get_connection.start().return_value
+        self.connection.get_config.side_effect = \
+            lambda source, flags: 'config %s %s' % (source, ' '.join(flags))
+        self.connection.run_commands.side_effect = \
+            lambda commands, check_rc: ['' for cmd in commands]
+        self.module = MagicMock(spec=['params', 'fail_json'])
+        self.module.params = {'partition': 'shared'}
+
+    def tearDown(self):
+        self.mock_cache.stop()
+        self.mock_get_connection.stop()
+
+    def test_get_config_cached(self):
+        acos.get_config(self.module)
+        self.assertEqual(acos.get_config(self.module), 'config running')
+        self.assertEqual(self.connection.get_config.call_count, 1)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_get_config_keyed_by_partition_and_source(self):
+        acos.get_config(self.module)
+        acos.get_config(self.module, source='startup')
+        acos.get_config(self.module, flags='with-default')
+        self.module.params['partition'] = 'my_partition'
+        acos.get_config(self.module)
+        self.assertEqual(self.connection.get_config.call_count, 4)
+
+    def test_get_config_follows_active_partition(self):
+        acos.get_config(self.module)
+        acos.run_commands(self.module, ['active-partition my_partition'])
+        acos.get_config(self.module)
+        self.assertEqual(self.connection.get_config.call_count, 2)
+        self.assertIn(('my_partition', 'running', ''), self.cache._entries)
+
+    def test_invalidated_by_load_config(self):
+        acos.get_config(self.module)
+        acos.load_config(self.module, ['ip dns primary 10.0.0.1'])
+        acos.get_config(self.module)
+        self.assertEqual(self.connection.get_config.call_count, 2)
+
+    def test_invalidated_by_config_commands(self):
+        acos.get_config(self.module)
+        acos.run_commands(self.module, ['show version'])
+        acos.get_config(self.module)
+        self.assertEqual(self.connection.get_config.call_count, 1)
+        acos.run_commands(self.module, ['write memory'])
+        acos.get_config(self.module)
+        self.assertEqual(self.connection.get_config.call_count, 2)
+
+    def test_get_config_revision(self):
+        self.connection.run_commands.side_effect = None
+        self.connection.run_commands.return_value = [
+            '!Configuration last updated at 10:00:00 IST Tue Feb 6 2024\n']
+        self.assertEqual(acos.get_config_revision(self.module),
+                         '!Configuration last updated at 10:00:00 IST Tue Feb 6 2024')
+        self.connection.run_commands.return_value = ['']
+        self.assertIsNone(acos.get_config_revision(self.module))
+
+    def test_is_read_only(self):
+        self.assertTrue(acos.is_read_only('show version'))
+        self.assertTrue(acos.is_read_only({'command': 'active-partition p1'}))
+        self.assertFalse(acos.is_read_only('write memory'))
+        self.assertFalse(acos.is_read_only('showx'))
+        self.assertFalse(acos.is_read_only({'command': 'show tech', 'prompt': 'Proceed?', 'answer': 'y'}))
+
+
+class TestConfigStore(unittest.TestCase):
+
+    key = ('10.0.0.1', 'shared', '')
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = ConfigStore(os.path.join(self.tmpdir, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_load_saved_config(self):
+        self.assertIsNone(self.store.load(self.key, 'rev1'))
+        self.store.save(self.key, 'rev1', 'hostname vThunder')
+        self.assertEqual(self.store.load(self.key, 'rev1'), 'hostname vThunder')
+        self.assertEqual(self.store.stats(), dict(hits=1, misses=1, writes=1))
+        self.assertEqual(os.listdir(self.store.path), [os.path.basename(self.store.filename(self.key))])
+
+    def test_revision_mismatch(self):
+        self.store.save(self.key, 'rev1', 'hostname vThunder')
+        self.assertIsNone(self.store.load(self.key, 'rev2'))
+        self.assertIsNone(self.store.load(('10.0.0.1', 'shared', 'with-default'), 'rev1'))
+
+    def test_unreadable_file(self):
+        os.makedirs(self.store.path)
+        with open(self.store.filename(self.key), 'wb') as f:
+            f.write(b'not gzip')
+        self.assertIsNone(self.store.load(self.key, 'rev1'))
+
+    def test_filename_is_safe(self):
+        filename = self.store.filename(('fe80::1/64', '../p1', ''))
+        self.assertEqual(os.path.dirname(filename), self.store.path)
+
+
+class TestWriteBackup(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.dest = os.path.join(self.tmpdir, 'backup', 'host_config')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_written_in_chunks(self):
+        contents = u'slb server s1 10.0.0.1 \u00e9\n' * 10000
+        with patch.object(backup, 'CHUNK_SIZE', 1000):
+            checksum, changed = backup.write_backup(self.dest, contents)
+        self.assertTrue(changed)
+        with open(self.dest, 'rb') as f:
+            data = f.read()
+        self.assertEqual(data.decode('utf-8'), contents.strip())
+        self.assertEqual(checksum, hashlib.sha1(data).hexdigest())
+        self.assertEqual(os.listdir(os.path.dirname(self.dest)), ['host_config'])
+
+    def test_sanitized(self):
+        contents = '\nBuilding configuration...\n!\nhostname vThunder\nend\n'
+        backup.write_backup(self.dest, contents, filters=[r'Building configuration\.\.\.\n'])
+        with open(self.dest) as f:
+            self.assertEqual(f.read(), '!\nhostname vThunder\nend')
+
+    def test_unchanged_file_kept(self):
+        for compress in (False, True):
+            checksum, changed = backup.write_backup(self.dest, 'hostname vThunder', compress=compress)
+            mtime = os.stat(self.dest).st_mtime
+            self.assertEqual(backup.write_backup(self.dest, 'hostname vThunder', compress=compress),
+                             (checksum, False))
+            self.assertEqual(os.stat(self.dest).st_mtime, mtime)
+            self.assertTrue(backup.write_backup(self.dest, 'hostname vThunder2', compress=compress)[1])
+
+
+class TestOutputCapture(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def capture(self, chunks, **kwargs):
+        capture = OutputCapture(**kwargs)
+        for chunk in chunks:
+            capture.write(chunk)
+        return capture.close()
+
+    def test_unlimited(self):
+        self.assertEqual(self.capture([b'line1\n', 'line2']),
+                         dict(stdout='line1\nline2', bytes=11, truncated=False))
+
+    def test_head_and_tail(self):
+        chunks = [b'0123456789'] * 3
+        self.assertEqual(self.capture(chunks, limit=15)['stdout'], '012345678901234')
+        result = self.capture(chunks, limit=15, keep='tail')
+        self.assertEqual(result['stdout'], '567890123456789')
+        self.assertEqual((result['bytes'], result['truncated']), (30, True))
+        self.assertEqual(self.capture(chunks, limit=0, keep='tail')['stdout'], '')
+
+    def test_path_keeps_whole_output(self):
+        path = output_filename(self.tmpdir, 'vthunder', 0, 'show log | include 10.0.0.1')
+        self.assertEqual(os.path.basename(path), 'vthunder_0_show_log___include_10.0.0.1.txt')
+        result = self.capture([b'0123456789'] * 3, limit=5, path=path)
+        self.assertEqual(result['path'], path)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'0123456789' * 3)
+        self.assertEqual(os.listdir(self.tmpdir), [os.path.basename(path)])
+
+    def test_reset_drops_partial_file(self):
+        path = os.path.join(self.tmpdir, 'out.txt')
+        capture = OutputCapture(path=path)
+        capture.write(b'partial')
+        capture.reset()
+        self.assertEqual(os.listdir(self.tmpdir), [])
+        capture.write(b'complete')
+        self.assertEqual(capture.close()['stdout'], 'complete')
+
+
+class TestParsers(unittest.TestCase):
+
+    def test_show_version(self):
+        version = parse_output('show version', load_fixture('acos_command_show_version'))
+        self.assertEqual((version['version'], version['build'], version['built']),
+                         ('4.1.1-P9', '105', 'Sep-21-2018,22:25'))
+        self.assertEqual(version['images']['hard_disk_primary'],
+                         dict(version='4.1.1-P9', build='105', default=True))
+        self.assertFalse(version['images']['hard_disk_secondary']['default'])
+        self.assertEqual((version['memory_total_mb'], version['memory_free_mb']), (8071, 3894))
+        self.assertEqual(version['uptime'], '33 days, 1 hour, 24 minutes')
+        self.assertEqual(version['virtualization'], 'KVM')
+        self.assertIsNone(parse_output('show version', '% Invalid input'))
+
+    def test_show_partition(self):
+        parsed = parse_output('show partition', load_fixture('acos_config_show_partition.cfg'))
+        self.assertEqual(parsed['total'], 7)
+        self.assertEqual(parsed['partitions'][4], dict(name='my_partition', id=6, type='L3V', parent=None,
+                                                       app_type=None, admin_count=0))
+
+    def test_show_interfaces(self):
+        interfaces = parse_output('show interfaces', load_fixture('acos_facts_show_interfaces'))
+        self.assertEqual(interfaces['Ethernet 1']['ipv4'][0], dict(address='10.43.12.24', subnet=24))
+        self.assertEqual(interfaces['Ethernet 1']['name'], 'inter1')
+
+    def test_show_slb_virtual_server(self):
+        vservers = parse_output('show slb virtual-server',
+                                load_fixture('acos_command_show_slb_virtual-server'))
+        self.assertEqual(sorted(vservers), ['vip1', 'vip2'])
+        vip1 = vservers['vip1']
+        self.assertEqual((vip1['state'], vip1['address'], vip1['total_connections']),
+                         ('A', '10.10.10.100', 48210))
+        self.assertEqual([port['port'] for port in vip1['ports']], [80, 443])
+        self.assertEqual(vip1['ports'][1]['conn_attempts'], 8098)
+        self.assertEqual(vip1['ports'][0]['service_groups'][0]['name'], 'sg-web')
+        self.assertEqual(vservers['vip2']['ports'][0]['service_groups'], [])
+
+    def test_lookup(self):
+        self.assertIs(get_parser('show  version'), get_parser('show version'))
+        self.assertIsNone(get_parser('show version | include ACOS'))
+        self.assertIsNone(parse_output('show running-config', 'hostname vThunder'))
+
+
+class TestStoredConfig(unittest.TestCase):
+
+    revision = '!Configuration last updated at 10:00:00 IST Tue Feb 6 2024'
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.mock_get_connection = patch.object(acos, 'get_connection')
+        self.connection = self.mock_get_connection.start().return_value
+        self.connection.get_option.return_value = '10.0.0.1'
+        self.connection.get_config.return_value = 'hostname vThunder'
+        self.connection.run_commands.side_effect = \
+            lambda commands, check_rc: [self.revision]
+
+    def tearDown(self):
+        self.mock_get_connection.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def run_module(self, flags=None):
+        module = MagicMock(spec=['params', 'fail_json', 'warn'])
+        module.params = {'partition': 'shared', 'config_cache': self.tmpdir}
+        with patch.object(acos, '_DEVICE_CONFIGS', acos.ConfigCache()):
+            return acos.get_config(module, flags=flags)
+
+    def test_reused_while_revision_unchanged(self):
+        self.assertEqual(self.run_module(), 'hostname vThunder')
+        self.assertEqual(self.run_module(), 'hostname vThunder')
+        self.assertEqual(self.connection.get_config.call_count, 1)
+        self.connection.get_option.assert_called_with('host')
+
+    def test_fetched_after_change(self):
+        self.run_module()
+        self.revision = '!Configuration last updated at 10:00:05 IST Tue Feb 6 2024'
+        self.connection.get_config.return_value = 'hostname vThunder2'
+        self.assertEqual(self.run_module(), 'hostname vThunder2')
+        self.assertEqual(self.run_module(), 'hostname vThunder2')
+        self.assertEqual(self.connection.get_config.call_count, 2)
+
+    def test_sections_not_stored(self):
+        self.run_module(flags=['| section slb server s1'])
+        self.run_module(flags=['| section slb server s1'])
+        self.assertEqual(self.connection.get_config.call_count, 2)
+        self.assertFalse(self.connection.run_commands.called)
+
+    def test_without_revision(self):
+        self.revision = ''
+        self.run_module()
+        self.run_module()
+        self.assertEqual(self.connection.get_config.call_count, 2)
+        self.assertEqual(os.listdir(self.tmpdir), [])
+
+
+class TestPerf(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_get_connection = patch.object(acos, 'get_connection')
+        self.connection = self.mock_get_connection.start().return_value
+        self.connection.get_perf.return_value = {
+            'calls': {'run_commands': {'calls': 1, 'seconds': 0.3, 'prompt_wait': 0.3,
+                                       'bytes': 30, 'round_trips': 2}},
+            'commands': [{'command': 'show version', 'seconds': 0.1, 'bytes': 20, 'session': 0},
+                         {'command': 'show hardware', 'seconds': 0.2, 'bytes': 10, 'session': 0}]}
+        self.connection.get_option.side_effect = {'host': 'vThunder'}.get
+        self.module = MagicMock(spec=['params', 'fail_json', 'warn', '_name'])
+        self.module.params = {'partition': 'shared', 'perf': False, 'perf_trace': None}
+        self.module._name = 'acos_command'
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.mock_get_connection.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def test_not_recorded_by_default(self):
+        acos.start_perf(self.module)
+        self.assertFalse(self.connection.start_perf.called)
+        self.assertIsNone(acos.collect_perf(self.module))
+
+    def test_collect_perf(self):
+        self.module.params['perf'] = True
+        acos.start_perf(self.module)
+        self.module._acos_connection.run_commands(commands=['show version'])
+        perf = acos.collect_perf(self.module)
+        self.assertTrue(self.connection.start_perf.called)
+        self.assertEqual(perf['rpc']['run_commands']['calls'], 1)
+        self.assertEqual(perf['round_trips'], 2)
+        self.assertEqual(perf['bytes'], 30)
+        self.assertEqual(perf['prompt_wait'], 0.3)
+        self.assertEqual(perf['slowest'][0]['command'], 'show hardware')
+        self.assertNotIn('commands', perf)
+
+    def test_perf_trace(self):
+        path = os.path.join(self.tmpdir, 'trace.json')
+        self.module.params['perf_trace'] = path
+        for run in range(2):
+            acos.start_perf(self.module)
+            acos.collect_perf(self.module)
+            del self.module._acos_connection
+        with open(path) as f:
+            traces = [json.loads(line) for line in f]
+        self.assertEqual(len(traces), 2)
+        self.assertEqual(traces[0]['host'], 'vThunder')
+        self.assertEqual(traces[0]['module'], 'acos_command')
+        self.assertEqual(len(traces[0]['commands']), 2)
+
+
+class TestConfigDifference(unittest.TestCase):
+
+    running = load_fixture('acos_running_config.cfg')
+
+    candidates = [
+        'ip dns primary 10.18.18.71',
+        'ip dns primary 10.18.18.81',
+        'interface ethernet 1\n name inter1\n enable\n ip address 10.0.0.1 255.255.255.0',
+        'vlan 100\n untagged ethernet 4\n router-interface ve 100',
+        'slb server s1 1.1.1.1\n port 80 tcp\n port 81 tcp',
+        'slb server s1 1.1.1.1 port 80 tcp',
+        'partition ssli_in id 1\nvlan 100\n untagged ethernet 4',
+    ]
+
+    def assert_same_difference(self, candidate, running, ignore_lines=None):
+        for match in ('line', 'strict', 'exact'):
+            candidate_obj = NetworkConfig(indent=1)
+            candidate_obj.load(candidate)
+            running_obj = NetworkConfig(indent=1, contents=running,
+                                        ignore_lines=ignore_lines)
+            expected = dumps(candidate_obj.difference(running_obj, match=match), 'commands')
+            result = dumps(config_difference(candidate_obj, running, match=match,
+                                             ignore_lines=ignore_lines), 'commands')
+            self.assertEqual(result, expected, (match, candidate))
+
+    def test_same_as_network_config(self):
+        for candidate in self.candidates:
+            self.assert_same_difference(candidate, self.running)
+
+    def test_same_for_exact_running_config(self):
+        self.assert_same_difference(self.running, self.running)
+
+    def test_same_with_unusual_layout(self):
+        running = '\n'.join([
+            '  port 80 tcp',
+            'slb server s1 1.1.1.1',
+            '  port 80 tcp',
+            '!comment',
+            '  port 81 tcp',
+            'slb server s1 1.1.1.1 port 82 tcp',
+            'slb server',
+            '  s1 1.1.1.1 port 83 tcp',
+        ])
+        for port in ('80', '81', '82', '83'):
+            self.assert_same_difference(
+                'slb server s1 1.1.1.1\n port %s tcp' % port, running)
+        self.assert_same_difference('port 80 tcp', running)
+
+    def test_same_with_ignore_lines(self):
+        self.assert_same_difference('ip dns primary 10.18.18.81\nvlan 100',
+                                    self.running, ignore_lines=['ip dns .*'])
+
+    def test_fingerprint_same_as_network_config(self):
+        configs = [self.running, '!header\n' + self.running + '\n\n  ', 'a {\n  b;\n}', '',
+                   self.running + '\nfingerprint-ignored 1']
+        for running in configs:
+            # ignore_lines are registered for the whole process
+            for ignore_lines in (None, ['fingerprint-ignored .*']):
+                expected = NetworkConfig(indent=1, contents=running, ignore_lines=ignore_lines).sha1
+                self.assertEqual(config_fingerprint(running, ignore_lines=ignore_lines),
+                                 binascii.hexlify(expected).decode())
+
+    def test_saved_stamp(self):
+        header = ('!Current configuration: 10 bytes\n'
+                  '!Configuration last updated at 10:00:05 IST Tue Feb 6 2024\n'
+                  '!Configuration last saved at 10:00:00 IST Tue Feb 6 2024\n')
+        self.assertEqual(config_saved_stamp(header + self.running), '10:00:00 IST Tue Feb 6 2024')
+        self.assertIsNone(config_saved_stamp(self.running))
+
+    def test_index_blocks(self):
+        index = RunningConfigIndex(self.running)
+        self.assertIn('vlan 100', index.blocks)
+        self.assertEqual(index.keys_for('vlan 100 untagged ethernet 4'), ['vlan 100'])
+        self.assertEqual(index.subset(['vlan 100']).split('\n')[:3],
+                         ['vlan 100', '  untagged ethernet 4', '  router-interface ve 100'])
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright: ©2024 A10 Networks, Inc. All rights reserved.
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import re
+
+from ansible_collections.a10.acos_cli.plugins.terminal.acos import (
+    StderrMatcher, TerminalModule, TERMINAL_STDERR_PATTERNS)
+from ansible_collections.a10.acos_cli.tests.unit.compat import unittest
+from ansible_collections.a10.acos_cli.tests.unit.modules.network.a10.base import load_fixture
+
+
+class TestAcosTerminal(unittest.TestCase):
+
+    responses = [
+        (b"vThunder(config)#ip dns primary 1.1.1.x\n% Error: invalid ip\n", 'error'),
+        (b"%Bad secret\n", 'bad_secret'),
+        (b"login\n Bad passwords\n", 'bad_passwords'),
+        (b"% Invalid Input detected at '^' marker.\n", 'invalid_input'),
+        (b"% Ambiguous command\n", 'incomplete_command'),
+        (b"Connection timed out; remote host not responding\n", 'connection_timed_out'),
+        (b"Template my_template not found\n", 'not_found'),
+        (b"'x' returned error code: 2\n", 'returned_error_code'),
+        (b"BAD MASK\n", 'bad_mask'),
+        (b"% 10.0.0.1/24 overlaps with 10.0.0.2/24\n", 'overlaps'),
+        (b"Server Error: Unable to create server\n", 'error_message'),
+        (b"% Informational: Server already exists\n", 'informational'),
+        (b"Command authorization failed\n", 'authorization_failed'),
+        (b"Duplicate entry\n", 'duplicate'),
+        (b"Object specified does not exist \n", 'object_does_not_exist'),
+        (b"This field cannot be modified at runtime \n", 'runtime_field'),
+        (b"There exists an open session\r\n", 'open_session'),
+    ]
+
+    def setUp(self):
+        self.matcher = TerminalModule.terminal_stderr_re[0]
+        self.separate = [re.compile(pattern, flags)
+                         for name, pattern, flags, keywords in TERMINAL_STDERR_PATTERNS]
+
+    def test_single_matcher(self):
+        self.assertEqual(len(TerminalModule.terminal_stderr_re), 1)
+        self.assertIsInstance(self.matcher, StderrMatcher)
+
+    def test_reports_fired_pattern(self):
+        for response, name in self.responses:
+            match = self.matcher.search(b"vThunder#show x\n" + response + b"vThunder#")
+            self.assertIsNotNone(match, response)
+            self.assertEqual(match.lastgroup, name, response)
+
+    def test_same_result_as_separate_patterns(self):
+        outputs = [response for response, name in self.responses]
+        outputs += [load_fixture(name).encode() for name in (
+            'acos_facts_show_interfaces', 'acos_command_show_version',
+            'acos_command_show_hardware', 'acos_running_config.cfg')]
+        outputs += [b"0 input errors,  0 CRC\n", b"Error:", b"Duplicate",
+                    b"not found", b"x not found", b"%Error"]
+        for output in outputs:
+            expected = any(regex.search(output) for regex in self.separate)
+            self.assertEqual(self.matcher.search(output) is not None, expected, output)